@@ -7,25 +7,132 @@ import json
 from pathlib import Path
 import tempfile
 import base64
+import importlib.util
+import math
+from urllib.parse import urlparse
 
-async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False):
+# Installed in every document before page scripts run: records the gap between
+# consecutive requestAnimationFrame callbacks and every long task (>50 ms)
+PERFORMANCE_INIT_SCRIPT = """
+(() => {
+  const perf = window.__perf = { frames: [], longTasks: [] };
+  let last = null;
+  const onFrame = (now) => {
+    if (last !== null && perf.frames.length < 100000) perf.frames.push(now - last);
+    last = now;
+    requestAnimationFrame(onFrame);
+  };
+  requestAnimationFrame(onFrame);
+  try {
+    new PerformanceObserver((list) => {
+      for (const entry of list.getEntries()) {
+        perf.longTasks.push({ start: entry.startTime, duration: entry.duration });
+      }
+    }).observe({ type: 'longtask', buffered: true });
+  } catch (e) {
+    perf.longTasksUnsupported = true;
+  }
+})();
+"""
+
+# A frame is counted as dropped when it takes longer than 1.5 frames at 60 Hz
+DROPPED_FRAME_MS = 1000 / 60 * 1.5
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), math.ceil(fraction * len(sorted_values))))
+    return round(sorted_values[rank - 1], 2)
+
+
+def summarize_performance(perf, api_requests, seconds):
+    """Frame timing, long task and API request summary for one script run"""
+    frames = sorted(perf.get("frames", []))
+    long_tasks = perf.get("longTasks", [])
+    total_api = sum(api_requests.values())
+    return {
+        "seconds": round(seconds, 2),
+        "frames": {
+            "count": len(frames),
+            "fps": round(len(frames) / (sum(frames) / 1000), 1) if frames else None,
+            "p50_ms": percentile(frames, 0.50),
+            "p95_ms": percentile(frames, 0.95),
+            "p99_ms": percentile(frames, 0.99),
+            "max_ms": round(frames[-1], 2) if frames else None,
+            "dropped": sum(1 for frame in frames if frame > DROPPED_FRAME_MS),
+        },
+        "long_tasks": {
+            "count": len(long_tasks),
+            "total_ms": round(sum(task["duration"] for task in long_tasks), 2),
+            "max_ms": round(max((task["duration"] for task in long_tasks), default=0), 2),
+            "supported": not perf.get("longTasksUnsupported", False),
+        },
+        "api_requests": {
+            "total": total_api,
+            "per_minute": round(total_api / seconds * 60, 1) if seconds else None,
+            "by_endpoint": dict(sorted(api_requests.items(), key=lambda item: -item[1])),
+        },
+    }
+
+
+def check_budget(performance, budget):
+    """List of budget violations, e.g. {"max_api_requests": {"POST /api/scores/update": 5}}"""
+    violations = []
+    for endpoint, limit in (budget.get("max_api_requests") or {}).items():
+        if endpoint == "*":
+            count = performance["api_requests"]["total"]
+        else:
+            count = performance["api_requests"]["by_endpoint"].get(endpoint, 0)
+        if count > limit:
+            violations.append(f"{endpoint}: {count} API requests (budget {limit})")
+    frame_p95 = performance["frames"]["p95_ms"]
+    if "max_frame_p95_ms" in budget and frame_p95 is not None and frame_p95 > budget["max_frame_p95_ms"]:
+        violations.append(f"frame time p95 {frame_p95} ms (budget {budget['max_frame_p95_ms']} ms)")
+    if "max_long_tasks" in budget and performance["long_tasks"]["count"] > budget["max_long_tasks"]:
+        violations.append(
+            f"{performance['long_tasks']['count']} long tasks (budget {budget['max_long_tasks']})"
+        )
+    return violations
+
+
+def build_test_script(script: str) -> str:
+    """Wrap a script body in an async run_test(page, output_dir) function"""
+    # Decode script if base64 encoded
+    if script.startswith('base64:'):
+        script = base64.b64decode(script[7:]).decode('utf-8')
+
+    # Add proper indentation to the script
+    indented_script = ""
+    for line in script.split('\n'):
+        if line.strip():
+            indented_script += "    " + line + "\n"
+        else:
+            indented_script += "\n"
+
+    return f"""async def run_test(page, output_dir):
+{indented_script}"""
+
+
+async def run_script_in_browser(browser, url: str, script: str, output_dir: str = ".screenshots",
+                                capture_logs: bool = False, collect_performance: bool = False,
+                                budget: dict = None, run_name: str = None):
     """
-    Executes a Playwright script and captures outputs.
+    Runs one script in its own browser context (isolated cookies, storage and cache).
     """
-    # Create output directory
-    
     automation_output_dir = 'automation_output'
 
     os.makedirs(output_dir, exist_ok=True)
     os.makedirs(automation_output_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir = Path(automation_output_dir) / timestamp
+    run_dir = Path(automation_output_dir) / (run_name or timestamp)
     run_dir.mkdir(exist_ok=True)
 
     screenshot_dir = Path(output_dir)
     screenshot_dir.mkdir(exist_ok=True)
-    
+
     result = {
         "status": "success",
         "data": {
@@ -36,136 +143,269 @@ async def execute_playwright_script(url: str, script: str, output_dir: str = ".s
         }
     }
 
+    context = await browser.new_context()
+    api_requests = {}
+    if collect_performance:
+        await context.add_init_script(PERFORMANCE_INIT_SCRIPT)
+
+        def count_request(request):
+            path = urlparse(request.url).path
+            if path.startswith("/api/"):
+                key = f"{request.method} {path}"
+                api_requests[key] = api_requests.get(key, 0) + 1
+
+        context.on("request", count_request)
+    page = await context.new_page()
+
+    # Store console logs if requested
+    console_logs = []
+    if capture_logs:
+        page.on("console", lambda msg: console_logs.append(f"{msg.type}: {msg.text}"))
+
+    script_path = None
+    started = asyncio.get_running_loop().time()
+    try:
+        # Navigate to URL first
+        await page.goto(url, wait_until="networkidle", timeout=30000)
+
+        test_script = build_test_script(script)
+
+        # Write the test script to a file for debugging
+        with open(run_dir / "test_script.py", "w") as f:
+            f.write(test_script)
+
+        # Save script to temp file for execution
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+            f.write(test_script)
+            script_path = f.name
+
+        # Import and execute the script (unique module name per run, runs may overlap)
+        spec = importlib.util.spec_from_file_location(f"dynamic_script_{run_dir.name}", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        # Run the test
+        output = await module.run_test(page, str(run_dir))
+        if output is not None:
+            result["data"]["output"] = output
+
+        if collect_performance:
+            perf = await page.evaluate("window.__perf || {}")
+            elapsed = asyncio.get_running_loop().time() - started
+            performance = summarize_performance(perf, api_requests, elapsed)
+            result["data"]["performance"] = performance
+            violations = check_budget(performance, budget or {})
+            if violations:
+                result["status"] = "error"
+                result["data"]["error"] = "Performance budget exceeded"
+                result["data"]["budget_violations"] = violations
+
+        # Take a screenshot if none were taken
+        screenshot_files = [f for pattern in ('*.png', '*.jpg', '*.jpeg') for f in run_dir.glob(pattern)]
+        if not screenshot_files:
+            final_screenshot = run_dir / f"final_{timestamp}.png"
+            await page.screenshot(
+                path=str(final_screenshot),
+                full_page=True,
+                type="jpeg",
+                quality=50
+            )
+            result["data"]["screenshots"].append(str(final_screenshot))
+
+            # Save additional screenshot to .screenshot folder
+            await page.screenshot(
+                path=str(screenshot_dir / "screenshot.jpeg"),
+                full_page=True,
+                type="jpeg",
+                quality=50
+            )
+        else:
+            result["data"]["screenshots"].extend(str(f) for f in screenshot_files)
+
+        # Save console logs if captured
+        if capture_logs and console_logs:
+            log_path = run_dir / f"console_{timestamp}.log"
+            with open(log_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(console_logs))
+            result["data"]["console_logs"].append(str(log_path))
+
+    except Exception as e:
+        result["status"] = "error"
+        result["data"]["error"] = f"Script error: {str(e)}"
+        # The page may have crashed with the script; a missing screenshot must not hide the error
+        try:
+            error_screenshot = run_dir / f"error_{timestamp}.png"
+            await page.screenshot(
+                path=str(error_screenshot),
+                full_page=True,
+                type="jpeg",
+                quality=50
+            )
+            result["data"]["screenshots"].append(str(error_screenshot))
+
+            # Save additional screenshot to .screenshot folder
+            await page.screenshot(
+                path=str(screenshot_dir / "screenshot.jpeg"),
+                full_page=True,
+                type="jpeg",
+                quality=50
+            )
+        except Exception:
+            pass
+
+    finally:
+        if script_path and os.path.exists(script_path):
+            os.unlink(script_path)
+        try:
+            await context.close()
+        except Exception:
+            pass  # Browser already gone; the result above still stands
+
+    return result
+
+
+async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False,
+                                    collect_performance: bool = False, budget: dict = None):
+    """
+    Executes a Playwright script and captures outputs.
+    """
     try:
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
-            
-            # Store console logs if requested
-            console_logs = []
-            if capture_logs:
-                page.on("console", lambda msg: console_logs.append(f"{msg.type}: {msg.text}"))
-            
             try:
-                # Navigate to URL first
-                await page.goto(url, wait_until="networkidle", timeout=30000)
-                
-                # Decode script if base64 encoded
-                if script.startswith('base64:'):
-                    script = base64.b64decode(script[7:]).decode('utf-8')
-                
-                # Add proper indentation to the script
-                indented_script = ""
-                for line in script.split('\n'):
-                    if line.strip():
-                        indented_script += "    " + line + "\n"
-                    else:
-                        indented_script += "\n"
-                
-                # Create test script with proper indentation
-                test_script = f"""async def run_test(page, output_dir):
-{indented_script}"""
-
-                # Write the test script to a file for debugging
-                test_script_path = run_dir / "test_script.py"
-                with open(test_script_path, "w") as f:
-                    f.write(test_script)
-
-                # Save script to temp file for execution
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    f.write(test_script)
-                    script_path = f.name
-
-                # Import and execute the script
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("dynamic_script", script_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                # Run the test
-                output = await module.run_test(page, str(run_dir))
-                if output is not None:
-                    result["data"]["output"] = output
-                
-                # Take a screenshot if none were taken
-                screenshot_files = list(run_dir.glob('*.{png,jpg,jpeg}'))
-                if not screenshot_files:
-                    final_screenshot = run_dir / f"final_{timestamp}.png"
-                    await page.screenshot(
-                        path=str(final_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                    result["data"]["screenshots"].append(str(final_screenshot))
-
-                    # Save additional screenshot to .screenshot folder
-                    await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                else:
-                    result["data"]["screenshots"].extend(str(f) for f in screenshot_files)
-
-                # Save console logs if captured
-                if capture_logs and console_logs:
-                    log_path = run_dir / f"console_{timestamp}.log"
-                    with open(log_path, "w", encoding="utf-8") as f:
-                        f.write("\n".join(console_logs))
-                    result["data"]["console_logs"].append(str(log_path))
-
-            except Exception as e:
-                result["status"] = "error"
-                result["data"]["error"] = f"Script error: {str(e)}"
-                error_screenshot = run_dir / f"error_{timestamp}.png"
-                await page.screenshot(
-                        path=str(error_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                result["data"]["screenshots"].append(str(error_screenshot))
-
-                # Save additional screenshot to .screenshot folder
-                await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-            
+                return await run_script_in_browser(
+                    browser, url, script, output_dir, capture_logs, collect_performance, budget
+                )
             finally:
-                if os.path.exists(script_path):
-                    os.unlink(script_path)
                 await browser.close()
+    except Exception as e:
+        return {
+            "status": "error",
+            "data": {"screenshots": [], "console_logs": [], "error": f"Setup error: {str(e)}", "output": None}
+        }
+
+
+class BrowserPool:
+    """
+    Warm Chromium processes shared by many scripts; every script still gets its own context.
+    """
+
+    def __init__(self, playwright, browsers: int = 1, parallel: int = 4):
+        self.playwright = playwright
+        self.size = max(1, browsers)
+        self.browsers = []
+        self._slots = asyncio.Semaphore(max(1, parallel))
+        self._next = 0
+
+    async def start(self):
+        self.browsers = await asyncio.gather(*(
+            self.playwright.chromium.launch(headless=True) for _ in range(self.size)
+        ))
+
+    async def close(self):
+        await asyncio.gather(*(browser.close() for browser in self.browsers), return_exceptions=True)
+        self.browsers = []
 
+    async def run(self, *args, **kwargs):
+        async with self._slots:
+            # Spread contexts over the browser processes round-robin
+            browser = self.browsers[self._next % self.size]
+            self._next += 1
+            return await run_script_in_browser(browser, *args, **kwargs)
+
+
+async def execute_playwright_scripts(url: str, scripts, output_dir: str = ".screenshots", capture_logs: bool = False,
+                                     parallel: int = 4, browsers: int = 1, collect_performance: bool = False,
+                                     budget: dict = None):
+    """
+    Executes many scripts against a warm browser pool, up to `parallel` at a time.
+    """
+    run_prefix = datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        async with async_playwright() as p:
+            pool = BrowserPool(p, browsers, parallel)
+            await pool.start()
+            try:
+                # One crashed page or context must not discard the other scripts' results
+                outcomes = await asyncio.gather(*(
+                    pool.run(url, script, output_dir, capture_logs, collect_performance, budget,
+                             run_name=f"{run_prefix}_{index:03d}")
+                    for index, script in enumerate(scripts)
+                ), return_exceptions=True)
+            finally:
+                await pool.close()
     except Exception as e:
-        result["status"] = "error"
-        result["data"]["error"] = f"Setup error: {str(e)}"
+        return {"status": "error", "error": f"Setup error: {str(e)}", "results": []}
+
+    results = [
+        {
+            "status": "error",
+            "data": {"screenshots": [], "console_logs": [], "error": f"Browser error: {str(outcome)}", "output": None}
+        } if isinstance(outcome, BaseException) else outcome
+        for outcome in outcomes
+    ]
+
+    failed = sum(1 for result in results if result["status"] != "success")
+    return {"status": "success" if not failed else "error", "failed": failed, "results": list(results)}
 
-    return result
 
 def main():
     parser = argparse.ArgumentParser(description="Execute Playwright automation script")
     parser.add_argument("url", help="URL to automate")
-    parser.add_argument("--script", required=True, help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix)")
+    parser.add_argument("--script", action="append", default=[],
+                        help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix); "
+                             "repeat to run several scripts in parallel")
+    parser.add_argument("--script-file", action="append", default=[],
+                        help="File containing a script body; may be repeated")
     parser.add_argument("--output", "-o", default=".screenshots",
                         help="Output directory for screenshots and logs")
     parser.add_argument("--capture-logs", action="store_true", help="Capture console logs")
-    
+    parser.add_argument("--parallel", type=int, default=4, help="Scripts run at the same time when given several")
+    parser.add_argument("--browsers", type=int, default=1,
+                        help="Chromium processes kept warm when given several scripts")
+    parser.add_argument("--performance", action="store_true",
+                        help="Collect requestAnimationFrame frame times, long tasks and API request counts")
+    parser.add_argument("--budget", help="JSON file with limits: max_api_requests {endpoint: n}, "
+                                         "max_frame_p95_ms, max_long_tasks (implies --performance)")
+
     args = parser.parse_args()
-    
-    result = asyncio.run(execute_playwright_script(
-        args.url,
-        args.script,
-        args.output,
-        args.capture_logs
-    ))
-    
+
+    scripts = list(args.script)
+    for path in args.script_file:
+        with open(path) as f:
+            scripts.append(f.read())
+    if not scripts:
+        parser.error("at least one --script or --script-file is required")
+
+    budget = None
+    if args.budget:
+        with open(args.budget) as f:
+            budget = json.load(f)
+    collect_performance = args.performance or budget is not None
+
+    if len(scripts) == 1:
+        result = asyncio.run(execute_playwright_script(
+            args.url,
+            scripts[0],
+            args.output,
+            args.capture_logs,
+            collect_performance,
+            budget
+        ))
+    else:
+        result = asyncio.run(execute_playwright_scripts(
+            args.url,
+            scripts,
+            args.output,
+            args.capture_logs,
+            args.parallel,
+            args.browsers,
+            collect_performance,
+            budget
+        ))
+
     print(json.dumps(result))
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
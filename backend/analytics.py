@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Tuple
+
+import numpy as np
+
+from storage import DayCounts
+
+PERCENTILES = (50, 75, 90, 95, 99)
+EPOCH = datetime(1970, 1, 1)  # Stored datetimes are naive UTC
+
+
+def count_arrays(tallies: DayCounts) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten per-day score tallies (of any games) into (epoch day, score, count) arrays"""
+    size = sum(len(counts) for counts in tallies.values())
+    days = np.fromiter(((day - EPOCH).days for (_, day), counts in tallies.items() for _ in counts),
+                       dtype=np.int64, count=size)
+    scores = np.fromiter((score for counts in tallies.values() for score in counts), dtype=np.int64, count=size)
+    counts = np.fromiter((count for counts in tallies.values() for count in counts.values()),
+                         dtype=np.int64, count=size)
+    return days, scores, counts
+
+
+def _weighted_percentiles(scores: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """np.percentile (linear) of the scores as if each were repeated `count` times"""
+    distinct, inverse = np.unique(scores, return_inverse=True)
+    cumulative = np.cumsum(np.bincount(inverse, weights=counts))
+    positions = (cumulative[-1] - 1) * np.asarray(PERCENTILES) / 100
+    lower = np.floor(positions)
+    below = distinct[np.searchsorted(cumulative, lower, side="right")]
+    above = distinct[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side="right")]
+    return below + (positions - lower) * (above - below)
+
+
+def summarize_score_counts(days: np.ndarray, scores: np.ndarray, counts: np.ndarray, bins: int = 20) -> dict:
+    """Histogram, percentiles and per-day activity from per-day score counts.
+
+    Each (day, score) pair stands for `count` score events, and the results
+    are the same as over the expanded list of events. Work grows with the
+    number of distinct scores per day rather than with the number of events.
+    """
+    if counts.sum() == 0:
+        return {
+            "total_scores": 0,
+            "histogram": {"counts": [], "edges": []},
+            "percentiles": {},
+            "daily_activity": [],
+        }
+
+    total = int(counts.sum())
+    histogram, edges = np.histogram(scores, bins=bins, weights=counts)
+    percentile_values = _weighted_percentiles(scores, counts)
+
+    active_days, day_index = np.unique(days, return_inverse=True)
+    per_day_count = np.bincount(day_index, weights=counts)
+    per_day_sum = np.bincount(day_index, weights=scores * counts)
+    per_day_max = np.full(active_days.size, np.iinfo(np.int64).min)
+    np.maximum.at(per_day_max, day_index, scores)
+
+    return {
+        "total_scores": total,
+        "mean": float((scores * counts).sum() / total),
+        "min": int(scores.min()),
+        "max": int(scores.max()),
+        "histogram": {"counts": histogram.astype(np.int64).tolist(), "edges": edges.tolist()},
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, percentile_values)},
+        "daily_activity": [
+            {
+                "day": np.datetime_as_string(np.datetime64(int(day), "D")),
+                "scores": int(per_day_count[index]),
+                "mean_score": float(per_day_sum[index] / per_day_count[index]),
+                "max_score": int(per_day_max[index]),
+            }
+            for index, day in enumerate(active_days)
+        ],
+    }
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+# Sentinel returned by ResponseCache.get on a miss (None is a valid cached value)
+MISS = object()
+# A new bus cursor re-reads messages this recent: ObjectIds from different
+# workers are not ordered within a second, or at all across clock skew
+RESUME_WINDOW = timedelta(seconds=30)
+# Delivered locally when the bus reconnects after an error, as messages may have been missed
+RESYNC = {"type": "resync"}
+
+
+class ResponseCache:
+    """In-process TTL cache whose entries are grouped by tag for bulk eviction"""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def get(self, tag: str, key: str = "") -> Any:
+        entry = self._entries.get((tag, key))
+        if entry is None:
+            return MISS
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._discard(tag, key)
+            return MISS
+        self._entries.move_to_end((tag, key))
+        return value
+
+    def set(self, tag: str, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[(tag, key)] = (expires_at, value)
+        self._entries.move_to_end((tag, key))
+        self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            (old_tag, old_key), _ = self._entries.popitem(last=False)
+            self._tags.get(old_tag, set()).discard(old_key)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry stored under the given tags"""
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                self._entries.pop((tag, key), None)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def _discard(self, tag: str, key: str):
+        self._entries.pop((tag, key), None)
+        self._tags.get(tag, set()).discard(key)
+
+
+class LocalInvalidationBus:
+    """Single-process pub/sub: messages are delivered straight to local subscribers"""
+
+    def __init__(self):
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: List[Callable[[dict], None]] = []
+
+    def subscribe(self, handler: Callable[[dict], None]):
+        self._handlers.append(handler)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict):
+        self._deliver(message)
+
+    def _deliver(self, message: dict):
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                print(f"⚠️ Invalidation handler failed: {e}")
+
+
+class MongoInvalidationBus(LocalInvalidationBus):
+    """Cross-process bus backed by a capped collection tailed by every worker.
+
+    Tailable cursors work on standalone servers as well as replica sets, so
+    the bus does not depend on change streams being available. Messages are
+    applied locally at publish time; each worker skips its own echoes. When
+    a cursor dies it is reopened over the last RESUME_WINDOW of messages,
+    skipping the ids already handled.
+    """
+
+    def __init__(self, db, collection_name: str = "cache_invalidations",
+                 size_bytes: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.collection = db[collection_name]
+        self._task: Optional[asyncio.Task] = None
+        # Message ids already handled within the resume window, oldest first
+        self._seen: "OrderedDict[ObjectId, None]" = OrderedDict()
+
+    async def start(self):
+        try:
+            await self.db.create_collection(
+                self.collection_name, capped=True, size=self.size_bytes
+            )
+        except CollectionInvalid:
+            pass  # Another worker created it first
+        # Only messages published after this worker came up are relevant
+        self._seen.clear()
+        async for doc in self.collection.find(self._recent(), {"_id": 1}):
+            self._seen[doc["_id"]] = None
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, message: dict):
+        self._deliver(message)
+        await self.collection.insert_one({
+            "origin": self.worker_id,
+            "message": message,
+        })
+
+    @staticmethod
+    def _recent() -> dict:
+        return {"_id": {"$gte": ObjectId.from_datetime(datetime.utcnow() - RESUME_WINDOW)}}
+
+    def _remember(self, doc_id) -> bool:
+        """False if doc_id was already handled; ids older than the resume window are forgotten"""
+        if doc_id in self._seen:
+            return False
+        self._seen[doc_id] = None
+        cutoff = datetime.utcnow() - RESUME_WINDOW
+        while self._seen:
+            oldest = next(iter(self._seen))
+            if oldest.generation_time.replace(tzinfo=None) >= cutoff:
+                break
+            del self._seen[oldest]
+        return True
+
+    async def _tail(self):
+        lost = False
+        while True:
+            # Capped collections are read in insertion order; _id order is not the same thing
+            cursor = self.collection.find(self._recent(), cursor_type=CursorType.TAILABLE_AWAIT,
+                                          sort=[("$natural", 1)])
+            try:
+                # Keep the cursor while it lives: try_next returns None after an idle awaitData wait
+                while cursor.alive:
+                    doc = await cursor.try_next()
+                    if lost:
+                        # Messages may have aged out of the resume window while the server was unreachable
+                        self._deliver(dict(RESYNC))
+                        lost = False
+                    if doc is None or not self._remember(doc["_id"]):
+                        continue
+                    if doc.get("origin") != self.worker_id:
+                        self._deliver(doc["message"])
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                print(f"⚠️ Invalidation bus cursor lost, retrying: {e}")
+                lost = True
+            # Tailable cursors die on an empty collection; back off briefly
+            await asyncio.sleep(0.5)
+
+
+def create_invalidation_bus(db):
+    """Pick the bus from CACHE_BUS: "mongo" for multi-worker deployments, else local"""
+    if os.environ.get("CACHE_BUS", "local").lower() == "mongo":
+        return MongoInvalidationBus(db)
+    return LocalInvalidationBus()
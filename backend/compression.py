@@ -0,0 +1,200 @@
+"""Response compression negotiated per request, with per-route size thresholds.
+
+Picks zstd, brotli or gzip from Accept-Encoding (zstd and brotli only when
+the optional `zstandard` / `brotli` packages are installed). Bodies under
+the route's threshold are sent as-is, since compressing a few hundred bytes
+saves nothing on the wire. Compressed bodies of cacheable routes are kept
+in an LRU keyed by encoding and body digest, so an unchanged catalog or
+leaderboard is compressed once. Large bodies are compressed in a worker
+thread so the event loop keeps serving other requests.
+"""
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml")
+# Responses are buffered up to this size to be compressed; bigger ones stream through untouched
+MAX_BUFFER = 8 * 1024 * 1024
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=5)
+
+
+def _zstd(data: bytes) -> bytes:
+    # Compressor objects are not thread-safe; they are cheap to create
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def available_encodings() -> Dict[str, Callable[[bytes], bytes]]:
+    """Supported encodings in server preference order"""
+    encodings = {}
+    if zstandard is not None:
+        encodings["zstd"] = _zstd
+    if brotli is not None:
+        encodings["br"] = _brotli
+    encodings["gzip"] = _gzip
+    return encodings
+
+
+def negotiate(accept_encoding: str, supported: Iterable[str]) -> Optional[str]:
+    """Best supported coding for an Accept-Encoding header; ties go to server preference"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in supported:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered HTTP responses.
+
+    route_thresholds maps path prefixes to the smallest body worth
+    compressing (None disables compression for that prefix); the longest
+    matching prefix wins, otherwise default_min_size applies.
+    """
+
+    def __init__(self, app, route_thresholds: Optional[Dict[str, Optional[int]]] = None,
+                 default_min_size: int = 1024, cacheable_prefixes: Tuple[str, ...] = (),
+                 thread_threshold: int = 64 * 1024, cache_entries: int = 256):
+        self.app = app
+        self.route_thresholds = sorted((route_thresholds or {}).items(), key=lambda item: -len(item[0]))
+        self.default_min_size = default_min_size
+        self.cacheable_prefixes = cacheable_prefixes
+        self.thread_threshold = thread_threshold
+        self.cache_entries = cache_entries
+        self.encoders = available_encodings()
+        self._cache: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    def min_size(self, path: str) -> Optional[int]:
+        for prefix, threshold in self.route_thresholds:
+            if path.startswith(prefix):
+                return threshold
+        return self.default_min_size
+
+    async def compress(self, encoding: str, body: bytes, cacheable: bool) -> bytes:
+        key = None
+        if cacheable:
+            key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        encoder = self.encoders[encoding]
+        if len(body) >= self.thread_threshold:
+            compressed = await asyncio.to_thread(encoder, body)
+        else:
+            compressed = encoder(body)
+
+        if key is not None:
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return compressed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        min_size = self.min_size(path)
+        accept = next((value for name, value in scope.get("headers", []) if name == b"accept-encoding"), b"")
+        encoding = negotiate(accept.decode("latin-1"), self.encoders) if min_size is not None else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        cacheable = path.startswith(self.cacheable_prefixes) if self.cacheable_prefixes else False
+        responder = _CompressingResponder(self, send, encoding, min_size, cacheable)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Buffers one response, then sends it compressed or untouched"""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str, min_size: int, cacheable: bool):
+        self.middleware = middleware
+        self.downstream = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.cacheable = cacheable
+        self.start: Optional[dict] = None
+        self.chunks: List[bytes] = []
+        self.buffered = 0
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"")
+            if (b"content-encoding" in headers or message["status"] < 200 or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        self.chunks.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered > MAX_BUFFER:
+            # Too big to hold in memory: stream it out as it comes
+            self.passthrough = True
+            await self.downstream(self.start)
+            await self.downstream({"type": "http.response.body", "body": b"".join(self.chunks), "more_body": True})
+            return
+        if more_body:
+            return
+
+        body = b"".join(self.chunks)
+        headers = [(name, value) for name, value in self.start.get("headers", [])]
+        if len(body) >= self.min_size:
+            body = await self.middleware.compress(self.encoding, body, self.cacheable)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers.append((b"content-encoding", self.encoding.encode("ascii")))
+            headers.append((b"content-length", str(len(body)).encode("ascii")))
+        # The response varies on Accept-Encoding whether or not this one was compressed
+        vary = [value for name, value in headers if name.lower() == b"vary"]
+        if not any(b"accept-encoding" in value.lower() or value.strip() == b"*" for value in vary):
+            headers.append((b"vary", b"Accept-Encoding"))
+        await self.downstream({**self.start, "headers": headers})
+        await self.downstream({"type": "http.response.body", "body": body})
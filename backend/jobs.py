@@ -0,0 +1,130 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+# (job name, payload, attempt number)
+Job = Tuple[str, dict, int]
+BatchHandler = Callable[[List[dict]], Awaitable[None]]
+
+
+class JobQueue:
+    """Bounded in-process queue for side effects that should not delay a response.
+
+    Handlers are registered per job name and always receive a batch of
+    payloads. Failed batches are retried with exponential backoff; jobs still
+    queued, in flight or waiting for a retry at shutdown are spilled to a
+    MongoDB collection and re-queued on the next start. Delivery is
+    at-least-once, so handlers should be idempotent.
+    """
+
+    def __init__(self, spill_collection, maxsize: int = 10000, batch_size: int = 200,
+                 workers: int = 2, max_attempts: int = 5, base_delay: float = 0.2,
+                 drain_timeout: float = 5.0):
+        self.spill_collection = spill_collection
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.drain_timeout = drain_timeout
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize)
+        self._handlers: Dict[str, BatchHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Dict[int, List[Job]] = {}
+        self._retrying: Dict[asyncio.Task, List[Job]] = {}
+
+    def register(self, name: str, handler: BatchHandler):
+        self._handlers[name] = handler
+
+    async def enqueue(self, name: str, payload: dict):
+        """Queue a job; waits only if the queue is full (backpressure)"""
+        if name not in self._handlers:
+            raise ValueError(f"No handler registered for job '{name}'")
+        await self._queue.put((name, payload, 0))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        # Pick up whatever earlier processes spilled on shutdown. Each job is
+        # claimed with find_one_and_delete, so when several workers start
+        # together every spilled job is re-queued by exactly one of them.
+        restored = 0
+        while True:
+            doc = await self.spill_collection.find_one_and_delete({})
+            if doc is None:
+                break
+            if doc["name"] in self._handlers:
+                await self._queue.put((doc["name"], doc["payload"], doc.get("attempt", 0)))
+                restored += 1
+        if restored:
+            print(f"✅ Re-queued {restored} spilled background jobs")
+
+    async def stop(self):
+        """Drain for up to drain_timeout seconds, then spill the remainder to MongoDB"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        # Snapshot before cancelling: cancelled tasks remove their own bookkeeping
+        leftovers: List[Job] = []
+        for batch in [*self._in_flight.values(), *self._retrying.values()]:
+            leftovers.extend(batch)
+        tasks = [*self._tasks, *self._retrying]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        while not self._queue.empty():
+            leftovers.append(self._queue.get_nowait())
+        self._tasks, self._in_flight, self._retrying = [], {}, {}
+
+        if leftovers:
+            await self.spill_collection.insert_many([
+                {"name": name, "payload": payload, "attempt": attempt}
+                for name, payload, attempt in leftovers
+            ])
+            print(f"⚠️ Spilled {len(leftovers)} background jobs to MongoDB")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._in_flight[worker_id] = batch
+            try:
+                by_name: Dict[str, List[Job]] = {}
+                for job in batch:
+                    by_name.setdefault(job[0], []).append(job)
+                for name, jobs in by_name.items():
+                    try:
+                        await self._handlers[name]([payload for _, payload, _ in jobs])
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self._schedule_retry(name, jobs, e)
+            finally:
+                self._in_flight.pop(worker_id, None)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _schedule_retry(self, name: str, jobs: List[Job], error: Exception):
+        attempt = max(job[2] for job in jobs) + 1
+        if attempt >= self.max_attempts:
+            print(f"❌ Dropping {len(jobs)} '{name}' jobs after {attempt} attempts: {error}")
+            return
+        delay = self.base_delay * (2 ** (attempt - 1)) * (1 + random.random())
+        retry_jobs = [(job_name, payload, attempt) for job_name, payload, _ in jobs]
+        task = asyncio.create_task(self._requeue_later(retry_jobs, delay))
+        self._retrying[task] = retry_jobs
+        task.add_done_callback(self._retry_done)
+        print(f"⚠️ '{name}' batch failed ({error}); retry {attempt} in {delay:.2f}s")
+
+    def _retry_done(self, task: asyncio.Task):
+        self._retrying.pop(task, None)
+
+    async def _requeue_later(self, jobs: List[Job], delay: float):
+        await asyncio.sleep(delay)
+        for job in jobs:
+            await self._queue.put(job)
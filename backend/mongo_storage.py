@@ -0,0 +1,422 @@
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from storage import (
+    DayCounts, PageAfter, Storage, StorageConflict, WindowBests, create_memory_storage, day_score_counts
+)
+
+# Raw score events are kept long enough to rebuild the longest (monthly) window
+SCORE_EVENT_RETENTION_SECONDS = int(os.environ.get("SCORE_EVENT_RETENTION_DAYS", "35")) * 24 * 3600
+# Client telemetry histograms expire this long after their window started
+TELEMETRY_RETENTION_SECONDS = int(os.environ.get("TELEMETRY_RETENTION_DAYS", "30")) * 24 * 3600
+
+
+def _keyset_query(base_filter: dict, score_field: str, id_field: str, after: PageAfter) -> dict:
+    """Match entries strictly after (score, id) in score desc, id asc order.
+
+    The (score, id) pair is unique, so pages never overlap or skip ties, and
+    every page is a single index range scan however deep it is.
+    """
+    query = dict(base_filter)
+    if after is not None:
+        last_score, last_id = after
+        query["$or"] = [
+            {score_field: {"$lt": last_score}},
+            {score_field: last_score, id_field: {"$gt": last_id}}
+        ]
+    return query
+
+
+class MongoUserRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        try:
+            await self.collection.create_index("id", unique=True)
+            # Users created by score submissions before registration may have no email
+            await self.collection.create_index(
+                "email", unique=True, partialFilterExpression={"email": {"$type": "string"}}
+            )
+        except OperationFailure as e:
+            print(f"⚠️ Could not create unique user indexes (duplicates in existing data?): {e}")
+
+    async def ensure_leaderboard_index(self, game_id: str):
+        """Keyset pagination index for one game's all-time leaderboard"""
+        score_field = f"high_scores.{game_id}"
+        await self.collection.create_index(
+            [(score_field, -1), ("id", 1)],
+            partialFilterExpression={score_field: {"$exists": True}}
+        )
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": user_id}, {"_id": 0})
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email}, {"_id": 0})
+
+    async def insert(self, user: dict):
+        try:
+            await self.collection.insert_one(dict(user))
+        except DuplicateKeyError:
+            raise StorageConflict(f"User {user['id']} already exists")
+
+    async def list(self, limit: int) -> List[dict]:
+        return await self.collection.find({}, {"_id": 0}).to_list(limit)
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def raise_high_score(self, user_id: str, game_id: str, score: int, defaults: dict) -> Optional[dict]:
+        update = {"$setOnInsert": defaults}
+        if score > 0:
+            update["$max"] = {f"high_scores.{game_id}": score}
+        # One round trip raises the stored high score if beaten and returns the previous one
+        try:
+            return await self.collection.find_one_and_update(
+                {"id": user_id},
+                update,
+                projection={"_id": 0, "username": 1, f"high_scores.{game_id}": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            raise StorageConflict(f"User {user_id} conflicts with an existing user")
+
+    async def high_score_page(self, game_id: str, limit: int, after: PageAfter = None) -> List[dict]:
+        score_field = f"high_scores.{game_id}"
+        query = _keyset_query({score_field: {"$exists": True}}, score_field, "id", after)
+        users = await self.collection.find(
+            query, {"_id": 0, "id": 1, "username": 1, score_field: 1}
+        ).sort([(score_field, -1), ("id", 1)]).limit(limit).to_list(limit)
+        return [
+            {"user_id": user["id"], "username": user.get("username"), "score": user["high_scores"][game_id]}
+            for user in users
+        ]
+
+    async def iter_high_scores(self) -> AsyncIterator[Tuple[str, Optional[str], dict]]:
+        async for user in self.collection.find({}, {"_id": 0, "id": 1, "username": 1, "high_scores": 1}):
+            yield user["id"], user.get("username"), user.get("high_scores") or {}
+
+
+class MongoGameRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        try:
+            await self.collection.create_index("id", unique=True)
+        except OperationFailure as e:
+            print(f"⚠️ Could not create unique game index (duplicates in existing data?): {e}")
+
+    async def get(self, game_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": game_id}, {"_id": 0})
+
+    async def insert(self, game: dict):
+        try:
+            await self.collection.insert_one(dict(game))
+        except DuplicateKeyError:
+            raise StorageConflict(f"Game {game['id']} already exists")
+
+    async def list_active(self, limit: int) -> List[dict]:
+        return await self.collection.find({"is_active": True}, {"_id": 0}).to_list(limit)
+
+    async def count_active(self) -> int:
+        return await self.collection.count_documents({"is_active": True})
+
+
+class MongoSaveRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        # One save per slot; also makes slot lookups and conditional replaces indexed
+        keys = [("user_id", 1), ("game_id", 1), ("slot_number", 1)]
+        try:
+            await self.collection.create_index(keys, unique=True)
+        except OperationFailure as e:
+            # Saves written before the index existed can hold duplicate slots
+            print(f"⚠️ Could not create unique save slot index (duplicate slots in existing data?): {e}")
+            await self.collection.create_index(keys)
+
+    async def get_slot(self, user_id: str, game_id: str, slot_number: int,
+                       fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        projection = {"_id": 0}
+        if fields is not None:
+            projection.update({field: 1 for field in fields})
+        return await self.collection.find_one(
+            {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}, projection
+        )
+
+    async def list_slots(self, user_id: str, game_id: str) -> List[dict]:
+        return await self.collection.find(
+            {"user_id": user_id, "game_id": game_id}, {"_id": 0}
+        ).sort("slot_number", 1).to_list(10)
+
+    async def insert(self, save: dict):
+        try:
+            await self.collection.insert_one(dict(save))
+        except DuplicateKeyError:
+            raise StorageConflict("Save slot already exists")
+
+    async def replace(self, save: dict, expected_version: Optional[int]) -> bool:
+        # Legacy saves without a version match {"version": None}
+        result = await self.collection.replace_one(
+            {
+                "user_id": save["user_id"],
+                "game_id": save["game_id"],
+                "slot_number": save["slot_number"],
+                "version": expected_version
+            },
+            save
+        )
+        return result.matched_count > 0
+
+    async def delete_slot(self, user_id: str, game_id: str, slot_number: int) -> bool:
+        result = await self.collection.delete_one(
+            {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}
+        )
+        return result.deleted_count > 0
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+
+class MongoSaveHistoryRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("user_id", 1), ("game_id", 1), ("slot_number", 1), ("version", -1)], unique=True
+        )
+
+    async def append(self, entries: List[dict]):
+        try:
+            await self.collection.insert_many([dict(entry) for entry in entries])
+        except BulkWriteError:
+            raise StorageConflict("Save version is already recorded")
+
+    async def latest(self, user_id: str, game_id: str, slot_number: int) -> Optional[dict]:
+        return await self.collection.find_one(
+            {"user_id": user_id, "game_id": game_id, "slot_number": slot_number},
+            {"_id": 0, "version": 1, "base_version": 1},
+            sort=[("version", -1)]
+        )
+
+    async def list_versions(self, user_id: str, game_id: str, slot_number: int) -> List[dict]:
+        return await self.collection.find(
+            {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}, {"_id": 0, "data": 0}
+        ).sort("version", -1).to_list(None)
+
+    async def chain(self, user_id: str, game_id: str, slot_number: int, version: int) -> List[dict]:
+        slot = {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}
+        entry = await self.collection.find_one({**slot, "version": version}, {"_id": 0, "base_version": 1})
+        if entry is None:
+            return []
+        return await self.collection.find(
+            {**slot, "version": {"$gte": entry["base_version"], "$lte": version}}, {"_id": 0}
+        ).sort("version", 1).to_list(None)
+
+    async def prune(self, user_id: str, game_id: str, slot_number: int, oldest_kept: int) -> int:
+        slot = {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}
+        entry = await self.collection.find_one({**slot, "version": oldest_kept}, {"_id": 0, "base_version": 1})
+        floor = entry["base_version"] if entry else oldest_kept
+        result = await self.collection.delete_many({**slot, "version": {"$lt": floor}})
+        return result.deleted_count
+
+    async def delete_slot(self, user_id: str, game_id: str, slot_number: int) -> int:
+        result = await self.collection.delete_many(
+            {"user_id": user_id, "game_id": game_id, "slot_number": slot_number}
+        )
+        return result.deleted_count
+
+
+class MongoScoreRepository:
+    def __init__(self, db):
+        self.db = db
+        self.events = db.score_events  # Append-only log of every accepted score
+        self.window_scores = db.window_scores  # Best score per user per leaderboard window
+        self.day_counts = db.score_day_counts  # Events per score per game and day, for analytics
+
+    async def ensure_indexes(self):
+        # Time-series score log with TTL retention (plain collection + TTL index before MongoDB 5.0)
+        try:
+            await self.db.create_collection(
+                "score_events",
+                timeseries={"timeField": "created_at", "metaField": "meta", "granularity": "seconds"},
+                expireAfterSeconds=SCORE_EVENT_RETENTION_SECONDS
+            )
+        except CollectionInvalid:
+            pass  # Already created
+        except OperationFailure:
+            await self.events.create_index("created_at", expireAfterSeconds=SCORE_EVENT_RETENTION_SECONDS)
+        try:
+            await self.events.create_index("event_id")
+        except OperationFailure:
+            pass  # MongoDB 5.0 time-series collections only index time and meta fields
+
+        await self.window_scores.create_index(
+            [("game_id", 1), ("window", 1), ("bucket", 1), ("user_id", 1)], unique=True
+        )
+        await self.window_scores.create_index(
+            [("game_id", 1), ("window", 1), ("bucket", 1), ("score", -1), ("user_id", 1)]
+        )
+        await self.window_scores.create_index("expires_at", expireAfterSeconds=0)
+        await self.day_counts.create_index([("game_id", 1), ("day", 1)], unique=True)
+        await self.day_counts.create_index("expires_at", expireAfterSeconds=0)
+
+    async def record_events(self, events: List[dict]):
+        # Time-series collections have no unique indexes, so a retried batch
+        # skips the events an earlier attempt already inserted
+        ids = [event["event_id"] for event in events]
+        logged = {
+            doc["event_id"]
+            async for doc in self.events.find(
+                {"event_id": {"$in": ids}, "created_at": {"$gte": min(event["created_at"] for event in events)}},
+                {"_id": 0, "event_id": 1}
+            )
+        } if events else set()
+        missing = [event for event in events if event["event_id"] not in logged]
+        if not missing:
+            return
+        try:
+            await self.events.insert_many([
+                {
+                    "created_at": event["created_at"],
+                    "meta": {"game_id": event["game_id"], "user_id": event["user_id"]},
+                    "event_id": event["event_id"],
+                    "score": event["score"]
+                }
+                for event in missing
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Tally the events that did get in: a retry will skip them as logged
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            await self._add_day_counts([event for index, event in enumerate(missing) if index not in failed])
+            raise
+        await self._add_day_counts(missing)
+
+    async def _add_day_counts(self, events: List[dict]):
+        operations = [
+            UpdateOne(
+                {"game_id": game_id, "day": day},
+                {
+                    "$inc": {f"counts.{score}": count for score, count in counts.items()},
+                    "$setOnInsert": {"expires_at": day + timedelta(seconds=SCORE_EVENT_RETENTION_SECONDS)}
+                },
+                upsert=True
+            )
+            for (game_id, day), counts in day_score_counts(events).items()
+        ]
+        if operations:
+            await self.day_counts.bulk_write(operations, ordered=False)
+
+    async def raise_window_scores(self, bests: WindowBests) -> bool:
+        operations = [
+            UpdateOne(
+                {"game_id": game_id, "window": window, "bucket": bucket, "user_id": user_id},
+                {
+                    "$max": {"score": entry["score"]},
+                    "$setOnInsert": {"username": entry["username"], "expires_at": entry["expires_at"]}
+                },
+                upsert=True
+            )
+            for (game_id, window, bucket, user_id), entry in bests.items()
+        ]
+        if not operations:
+            return False
+        result = await self.window_scores.bulk_write(operations, ordered=False)
+        return bool(result.modified_count or result.upserted_count)
+
+    async def window_page(self, game_id: str, window: str, bucket: str, limit: int,
+                          after: PageAfter = None) -> List[dict]:
+        query = _keyset_query({"game_id": game_id, "window": window, "bucket": bucket}, "score", "user_id", after)
+        return await self.window_scores.find(
+            query, {"_id": 0, "user_id": 1, "username": 1, "score": 1}
+        ).sort([("score", -1), ("user_id", 1)]).limit(limit).to_list(limit)
+
+    async def daily_score_counts(self, since: datetime, game_id: Optional[str] = None) -> DayCounts:
+        query = {"day": {"$gte": since.replace(hour=0, minute=0, second=0, microsecond=0)}}
+        if game_id:
+            query["game_id"] = game_id
+        return {
+            (doc["game_id"], doc["day"]): {int(score): count for score, count in doc["counts"].items()}
+            async for doc in self.day_counts.find(query, {"_id": 0, "game_id": 1, "day": 1, "counts": 1})
+        }
+
+
+class MongoTelemetryRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("metric", 1), ("game_id", 1), ("window_start", 1)], unique=True
+        )
+        await self.collection.create_index("window_start", expireAfterSeconds=TELEMETRY_RETENTION_SECONDS)
+
+    async def add_histograms(self, documents: List[dict]):
+        # $inc merges flushes of the same window from every worker
+        operations = [
+            UpdateOne(
+                {"metric": document["metric"], "game_id": document["game_id"],
+                 "window_start": document["window_start"]},
+                {
+                    "$inc": {
+                        **{f"counts.{index}": count for index, count in document["counts"].items()},
+                        "sum": document["sum"]
+                    },
+                    "$setOnInsert": {"window_seconds": document["window_seconds"]}
+                },
+                upsert=True
+            )
+            for document in documents
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def histograms(self, game_id: Optional[str], metric: str, since: datetime) -> List[dict]:
+        query = {"metric": metric, "window_start": {"$gte": since}}
+        if game_id:
+            query["game_id"] = game_id
+        return await self.collection.find(query, {"_id": 0}).sort("window_start", 1).to_list(None)
+
+
+class MongoReplaySeedRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("user_id", 1), ("game_id", 1), ("seed", 1)])
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def issue(self, seed: dict):
+        await self.collection.insert_one(dict(seed))
+
+    async def consume(self, user_id: str, game_id: str, seed: int, now: datetime) -> Optional[dict]:
+        # The TTL monitor runs about once a minute, so expiry is checked here too
+        return await self.collection.find_one_and_delete(
+            {"user_id": user_id, "game_id": game_id, "seed": seed, "expires_at": {"$gt": now}},
+            projection={"_id": 0}
+        )
+
+
+def create_storage(db) -> Storage:
+    """Pick the backend from STORAGE_BACKEND: "memory" for tests and benchmarks, else MongoDB"""
+    if os.environ.get("STORAGE_BACKEND", "mongo").lower() == "memory":
+        return create_memory_storage()
+    return Storage(
+        MongoUserRepository(db.users),
+        MongoGameRepository(db.games),
+        MongoSaveRepository(db.game_states),
+        MongoSaveHistoryRepository(db.game_state_history),
+        MongoScoreRepository(db),
+        MongoTelemetryRepository(db.telemetry_histograms),
+        MongoReplaySeedRepository(db.replay_seeds),
+        db.pending_jobs,
+    )
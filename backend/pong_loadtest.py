@@ -0,0 +1,115 @@
+"""Headless bot load test for the multiplayer Pong match service.
+
+Runs a RoomScheduler in-process with bot players in every room (bots decode
+each snapshot and answer with an input, like a real client would) and reports
+tick jitter, tick cost and how many rooms one core can sustain.
+
+    python pong_loadtest.py --rooms 200 --seconds 10
+    python pong_loadtest.py --find-max
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Optional, Tuple
+
+from pong_match import (
+    BALL_SIZE,
+    PADDLE_HEIGHT,
+    PongPlayer,
+    PongRoom,
+    RoomScheduler,
+    decode_snapshot,
+)
+
+# Leave this much of each tick free when estimating capacity
+TICK_BUDGET_FRACTION = 0.8
+
+
+class BotPlayer(PongPlayer):
+    """Player that consumes snapshots synchronously and steers toward the ball"""
+
+    def __init__(self, rng: random.Random):
+        super().__init__(None, user_id="bot")
+        self.rng = rng
+        self.values: Optional[Tuple[int, ...]] = None
+        self.seq = 0
+        self.bytes_received = 0
+        self.messages = 0
+
+    def send(self, message) -> bool:
+        if isinstance(message, bytes):
+            self.bytes_received += len(message)
+            self.messages += 1
+            _, self.values = decode_snapshot(message, self.values)
+            self._react()
+        return True
+
+    def _react(self):
+        paddle_y = self.values[self.side] / 8
+        ball_y = self.values[3] / 8
+        target = ball_y + BALL_SIZE / 2 - PADDLE_HEIGHT / 2 + self.rng.uniform(-15, 15)
+        direction = 0 if abs(target - paddle_y) < 5 else (1 if target > paddle_y else -1)
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.push_input(self.seq, direction)
+
+
+async def run_load(rooms: int, seconds: float, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    bots = []
+
+    def new_room(_finished=None):
+        left, right = BotPlayer(rng), BotPlayer(rng)
+        bots.extend((left, right))
+        scheduler.add_room(PongRoom(left, right, seed=rng.randrange(2 ** 32)))
+
+    # Finished matches are replaced straight away to keep the load constant
+    scheduler = RoomScheduler(max_rooms=rooms, stats_window=int(seconds * 60), on_finished=new_room)
+    for _ in range(rooms):
+        new_room()
+
+    scheduler.start()
+    await asyncio.sleep(seconds)
+    await scheduler.stop()
+
+    stats = scheduler.stats()
+    per_room_ms = stats["tick_cost_ms"]["mean"] / rooms if rooms else 0.0
+    budget_ms = scheduler.interval * 1000 * TICK_BUDGET_FRACTION
+    stats["tick_budget_ms"] = scheduler.interval * 1000
+    stats["per_room_ms"] = per_room_ms
+    stats["max_rooms_per_core"] = int(budget_ms / per_room_ms) if per_room_ms else None
+    stats["bytes_per_room_per_second"] = sum(bot.bytes_received for bot in bots) / 2 / rooms / seconds
+    return stats
+
+
+async def find_max(seconds: float, seed: int) -> dict:
+    """Double the room count until ticks overrun the budget, then report the last good run"""
+    rooms, best = 50, None
+    while True:
+        stats = await run_load(rooms, seconds, seed)
+        print(f"{rooms:>6} rooms: tick p99 {stats['tick_cost_ms']['p99']:.2f} ms, "
+              f"jitter p99 {stats['jitter_ms']['p99']:.2f} ms")
+        overrun = stats["tick_cost_ms"]["p99"] > stats["tick_budget_ms"] * TICK_BUDGET_FRACTION
+        if overrun:
+            return best or stats
+        best = stats
+        rooms *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Pong match scheduler with headless bots")
+    parser.add_argument("--rooms", type=int, default=100, help="Concurrent rooms to simulate")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to run")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for bots and serves")
+    parser.add_argument("--find-max", action="store_true", help="Search for the largest sustainable room count")
+    args = parser.parse_args()
+
+    if args.find_max:
+        stats = asyncio.run(find_max(args.seconds, args.seed))
+    else:
+        stats = asyncio.run(run_load(args.rooms, args.seconds, args.seed))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import asyncio
+import json
+import random
+import struct
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+# Same playfield and physics as frontend/src/games/PongGame.js
+CANVAS_WIDTH = 400
+CANVAS_HEIGHT = 300
+PADDLE_WIDTH = 8
+PADDLE_HEIGHT = 40
+BALL_SIZE = 8
+PADDLE_SPEED = 5
+INITIAL_BALL_SPEED = 3
+MAX_BALL_SPEED = 8
+WINNING_SCORE = 10
+
+TICK_RATE = 60           # Simulation steps per second
+SNAPSHOT_EVERY = 2       # Broadcast every other tick (30 Hz)
+KEYFRAME_EVERY = 30      # A full snapshot every 30 broadcasts (once a second)
+INPUT_BUFFER_SIZE = 8    # Inputs buffered per player; older ones are dropped
+
+WAITING, PLAYING, FINISHED, ABANDONED = range(4)
+LEFT, RIGHT = 0, 1
+
+# Snapshot fields: name, struct code, fixed-point scale
+SNAPSHOT_FIELDS = (
+    ("left_y", "h", 8),
+    ("right_y", "h", 8),
+    ("ball_x", "h", 8),
+    ("ball_y", "h", 8),
+    ("ball_vx", "h", 256),
+    ("ball_vy", "h", 256),
+    ("left_score", "B", 1),
+    ("right_score", "B", 1),
+    ("status", "B", 1),
+    ("left_ack", "H", 1),
+    ("right_ack", "H", 1),
+)
+FULL_SNAPSHOT, DELTA_SNAPSHOT = 0, 1
+SNAPSHOT_HEADER = struct.Struct("<BI")  # kind, tick
+DELTA_MASK = struct.Struct("<H")        # one bit per changed field
+FULL_BODY = struct.Struct("<" + "".join(code for _, code, _ in SNAPSHOT_FIELDS))
+FIELD_STRUCTS = [struct.Struct("<" + code) for _, code, _ in SNAPSHOT_FIELDS]
+# Client input: sequence number, paddle direction (-1 up, 0 stop, 1 down)
+INPUT_MESSAGE = struct.Struct("<Hb")
+
+
+def encode_snapshot(tick: int, values: Tuple[int, ...], previous: Optional[Tuple[int, ...]]) -> bytes:
+    """Full snapshot when previous is None, otherwise only the fields that changed"""
+    if previous is None:
+        return SNAPSHOT_HEADER.pack(FULL_SNAPSHOT, tick) + FULL_BODY.pack(*values)
+    mask = 0
+    parts = []
+    for i, (value, old) in enumerate(zip(values, previous)):
+        if value != old:
+            mask |= 1 << i
+            parts.append(FIELD_STRUCTS[i].pack(value))
+    return SNAPSHOT_HEADER.pack(DELTA_SNAPSHOT, tick) + DELTA_MASK.pack(mask) + b"".join(parts)
+
+
+def decode_snapshot(data: bytes, previous: Optional[Tuple[int, ...]]) -> Tuple[int, Tuple[int, ...]]:
+    """Inverse of encode_snapshot; deltas are applied on top of previous"""
+    kind, tick = SNAPSHOT_HEADER.unpack_from(data)
+    offset = SNAPSHOT_HEADER.size
+    if kind == FULL_SNAPSHOT:
+        return tick, FULL_BODY.unpack_from(data, offset)
+    if previous is None:
+        raise ValueError("Delta snapshot received before a full snapshot")
+    (mask,) = DELTA_MASK.unpack_from(data, offset)
+    offset += DELTA_MASK.size
+    values = list(previous)
+    for i, field_struct in enumerate(FIELD_STRUCTS):
+        if mask & (1 << i):
+            (values[i],) = field_struct.unpack_from(data, offset)
+            offset += field_struct.size
+    return tick, tuple(values)
+
+
+def snapshot_to_dict(values: Tuple[int, ...]) -> dict:
+    """Undo the fixed-point scaling, e.g. for rendering"""
+    return {name: value / scale for (name, _, scale), value in zip(SNAPSHOT_FIELDS, values)}
+
+
+class PongPlayer:
+    """A connected player: buffered inputs in, queued snapshots out.
+
+    `sink` is an async callable that delivers bytes (snapshots) or str (JSON
+    control messages) to the client; it is drained by a dedicated task so a
+    slow socket never blocks the simulation. Subclasses that consume messages
+    directly (bots) pass no sink and override send().
+    """
+
+    def __init__(self, sink: Optional[Callable[[Union[bytes, str]], Awaitable[None]]], user_id: str = "demo-user",
+                 outbox_size: int = 32, closer: Optional[Callable[[int], Awaitable[None]]] = None):
+        self.user_id = user_id
+        self.room: Optional["PongRoom"] = None
+        self.side: Optional[int] = None
+        self.inputs: deque = deque(maxlen=INPUT_BUFFER_SIZE)
+        self._sink = sink
+        self._closer = closer  # Closes the client's connection with a close code
+        # bytes and str are delivered; an int is a close code, sent after what was queued before it
+        self._outbox: "asyncio.Queue[Union[bytes, str, int]]" = asyncio.Queue(outbox_size)
+        self._sender: Optional[asyncio.Task] = asyncio.create_task(self._send_loop()) if sink else None
+
+    def push_input(self, seq: int, direction: int):
+        self.inputs.append((seq, max(-1, min(1, direction))))
+
+    def send(self, message: Union[bytes, str, int]) -> bool:
+        """Queue a message; False (and the outbox is emptied) if the client fell behind"""
+        try:
+            self._outbox.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self._outbox.empty():
+                self._outbox.get_nowait()
+            return False
+
+    def notify(self, message: dict):
+        self.send(json.dumps(message))
+
+    def disconnect(self, code: int):
+        """Close the connection with `code` once the messages already queued are delivered"""
+        if self._closer is None:
+            return
+        if self._sender is None or not self.send(code):
+            asyncio.create_task(self._closer(code))
+
+    async def _send_loop(self):
+        try:
+            while True:
+                message = await self._outbox.get()
+                if isinstance(message, int):
+                    await self._closer(message)
+                    return
+                await self._sink(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # Socket closed; the receive side cleans up
+
+    def close(self):
+        if self._sender:
+            self._sender.cancel()
+            self._sender = None
+
+
+class PongRoom:
+    """One head-to-head match, advanced one fixed tick at a time by the scheduler"""
+
+    def __init__(self, left: PongPlayer, right: PongPlayer, room_id: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.room_id = room_id or uuid.uuid4().hex[:12]
+        self.players: List[Optional[PongPlayer]] = [left, right]
+        for side, player in enumerate(self.players):
+            player.room, player.side = self, side
+        self.random = random.Random(seed)
+
+        self.paddle_y = [CANVAS_HEIGHT / 2 - PADDLE_HEIGHT / 2] * 2
+        self.direction = [0, 0]
+        self.acks = [0, 0]
+        self.scores = [0, 0]
+        self.ball_speed = INITIAL_BALL_SPEED
+        self.ball_x = CANVAS_WIDTH / 2
+        self.ball_y = CANVAS_HEIGHT / 2
+        self.ball_vx = INITIAL_BALL_SPEED
+        self.ball_vy = INITIAL_BALL_SPEED
+        self.status = PLAYING
+        self.tick = 0
+
+        self._broadcasts = 0
+        self._last_values: Optional[Tuple[int, ...]] = None
+        self._force_keyframe = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (FINISHED, ABANDONED)
+
+    def player_left(self, side: int):
+        self.players[side] = None
+        if not self.finished:
+            self.status = ABANDONED
+
+    def step(self):
+        """Advance the simulation by one tick"""
+        if self.finished:
+            return
+        for side, player in enumerate(self.players):
+            # Consume one buffered input per tick; hold the last direction otherwise
+            if player is not None and player.inputs:
+                self.acks[side], self.direction[side] = player.inputs.popleft()
+            self.paddle_y[side] = min(max(self.paddle_y[side] + self.direction[side] * PADDLE_SPEED, 0),
+                                      CANVAS_HEIGHT - PADDLE_HEIGHT)
+
+        self.ball_x += self.ball_vx
+        self.ball_y += self.ball_vy
+
+        if self.ball_y <= 0 or self.ball_y >= CANVAS_HEIGHT - BALL_SIZE:
+            self.ball_vy = -self.ball_vy
+
+        if (self.ball_vx < 0 and self.ball_x <= PADDLE_WIDTH
+                and self._overlaps_paddle(LEFT)):
+            self._bounce(LEFT)
+        elif (self.ball_vx > 0 and self.ball_x + BALL_SIZE >= CANVAS_WIDTH - PADDLE_WIDTH
+                and self._overlaps_paddle(RIGHT)):
+            self._bounce(RIGHT)
+
+        if self.ball_x < 0:
+            self._point(RIGHT)
+        elif self.ball_x > CANVAS_WIDTH:
+            self._point(LEFT)
+
+        self.tick += 1
+
+    def _overlaps_paddle(self, side: int) -> bool:
+        return (self.ball_y + BALL_SIZE >= self.paddle_y[side]
+                and self.ball_y <= self.paddle_y[side] + PADDLE_HEIGHT)
+
+    def _bounce(self, side: int):
+        self.ball_vx = -self.ball_vx
+        # Angle depends on where the ball hits the paddle
+        hit = (self.ball_y + BALL_SIZE / 2 - self.paddle_y[side] - PADDLE_HEIGHT / 2) / (PADDLE_HEIGHT / 2)
+        self.ball_vy = hit * self.ball_speed
+
+    def _point(self, side: int):
+        self.scores[side] += 1
+        self.ball_speed = min(self.ball_speed + 0.2, MAX_BALL_SPEED)
+        direction = 1 if side == LEFT else -1  # Serve towards the player who conceded
+        self.ball_x = CANVAS_WIDTH / 2
+        self.ball_y = CANVAS_HEIGHT / 2
+        self.ball_vx = self.ball_speed * direction
+        self.ball_vy = (self.random.random() - 0.5) * self.ball_speed
+        if max(self.scores) >= WINNING_SCORE:
+            self.status = FINISHED
+
+    def quantized(self) -> Tuple[int, ...]:
+        return (
+            round(self.paddle_y[LEFT] * 8),
+            round(self.paddle_y[RIGHT] * 8),
+            round(self.ball_x * 8),
+            round(self.ball_y * 8),
+            round(self.ball_vx * 256),
+            round(self.ball_vy * 256),
+            self.scores[LEFT],
+            self.scores[RIGHT],
+            self.status,
+            self.acks[LEFT] & 0xFFFF,
+            self.acks[RIGHT] & 0xFFFF,
+        )
+
+    def snapshot(self) -> Optional[bytes]:
+        """Encoded snapshot for this tick, or None between broadcast ticks.
+
+        Encoded once and shared by both players. WebSockets are ordered and
+        reliable, so deltas are taken against the previous broadcast.
+        """
+        if self.tick % SNAPSHOT_EVERY and not self.finished:
+            return None
+        values = self.quantized()
+        keyframe = self._force_keyframe or self._broadcasts % KEYFRAME_EVERY == 0
+        data = encode_snapshot(self.tick, values, None if keyframe else self._last_values)
+        self._last_values = values
+        self._broadcasts += 1
+        self._force_keyframe = False
+        return data
+
+    def broadcast(self, data: bytes):
+        for player in self.players:
+            if player is not None and not player.send(data):
+                # That player's outbox was flushed; resync everyone with a keyframe
+                self._force_keyframe = True
+
+
+class RoomScheduler:
+    """Runs every room in the process from one fixed-tick asyncio loop.
+
+    Each tick steps all rooms and broadcasts their snapshots, so many matches
+    share one timer instead of each sleeping on its own. Wake-up jitter and
+    per-tick cost are recorded for the load test and the stats endpoint.
+    """
+
+    def __init__(self, max_rooms: int = 500, tick_rate: int = TICK_RATE, stats_window: int = 600,
+                 on_finished: Optional[Callable[[PongRoom], None]] = None):
+        self.max_rooms = max_rooms
+        self.interval = 1 / tick_rate
+        self.on_finished = on_finished
+        self.rooms: Dict[str, PongRoom] = {}
+        self.jitter: deque = deque(maxlen=stats_window)
+        self.tick_cost: deque = deque(maxlen=stats_window)
+        self.ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def add_room(self, room: PongRoom) -> bool:
+        if len(self.rooms) >= self.max_rooms:
+            return False
+        self.rooms[room.room_id] = room
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            woke = loop.time()
+            self.jitter.append(woke - next_tick)
+            if woke - next_tick > 5 * self.interval:
+                next_tick = woke  # Hopelessly behind: skip ticks instead of bursting
+            self.run_tick()
+            self.tick_cost.append(loop.time() - woke)
+
+    def run_tick(self):
+        for room in list(self.rooms.values()):
+            room.step()
+            data = room.snapshot()
+            if data is not None:
+                room.broadcast(data)
+            if room.finished:
+                del self.rooms[room.room_id]
+                if self.on_finished:
+                    self.on_finished(room)
+        self.ticks += 1
+
+    def stats(self) -> dict:
+        def percentile(samples, q):
+            if not samples:
+                return 0.0
+            ordered = sorted(samples)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        mean_cost = sum(self.tick_cost) / len(self.tick_cost) if self.tick_cost else 0.0
+        utilisation = mean_cost / self.interval
+        return {
+            "rooms": len(self.rooms),
+            "ticks": self.ticks,
+            "jitter_ms": {
+                "p50": percentile(self.jitter, 0.5) * 1000,
+                "p99": percentile(self.jitter, 0.99) * 1000,
+                "max": max(self.jitter, default=0.0) * 1000,
+            },
+            "tick_cost_ms": {
+                "mean": mean_cost * 1000,
+                "p99": percentile(self.tick_cost, 0.99) * 1000,
+            },
+            "utilisation": utilisation,
+        }
+
+
+class PongMatchmaker:
+    """Pairs waiting players into rooms on the local scheduler"""
+
+    def __init__(self, scheduler: RoomScheduler):
+        self.scheduler = scheduler
+        self.scheduler.on_finished = self._room_finished
+        self._waiting: Optional[PongPlayer] = None
+
+    def join(self, player: PongPlayer) -> Optional[PongRoom]:
+        if self._waiting is None or self._waiting is player:
+            self._waiting = player
+            player.notify({"type": "waiting"})
+            return None
+        opponent, self._waiting = self._waiting, None
+        room = PongRoom(opponent, player)
+        if not self.scheduler.add_room(room):
+            for member in (opponent, player):
+                member.room = member.side = None
+                member.notify({"type": "full"})
+                member.disconnect(1013)  # Try again later: the player is not kept waiting
+            return None
+        for member in (opponent, player):
+            member.notify({"type": "matched", "room_id": room.room_id, "side": member.side,
+                           "tick_rate": round(1 / self.scheduler.interval)})
+        return room
+
+    def _room_finished(self, room: PongRoom):
+        for player in room.players:
+            if player is not None:
+                player.notify({"type": "finished", "scores": room.scores,
+                               "abandoned": room.status == ABANDONED})
+
+    def leave(self, player: PongPlayer):
+        if self._waiting is player:
+            self._waiting = None
+        elif player.room is not None and player.side is not None:
+            player.room.player_left(player.side)
+        player.close()
@@ -0,0 +1,200 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Scores are counted in buckets of BUCKET_WIDTH points; everything from
+# BUCKET_WIDTH * BUCKETS up shares the last bucket
+BUCKET_WIDTH = 10
+BUCKETS = 1 << 16
+
+# (-score, user_id, username): ascending order is the leaderboard order
+Entry = Tuple[int, str, Optional[str]]
+
+
+class FenwickTree:
+    """Counts per slot with O(log n) prefix sums and position search"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts: List[int]) -> "FenwickTree":
+        """Build in O(n) rather than n separate adds"""
+        tree = cls(len(counts))
+        tree._tree[1:] = counts
+        for index in range(1, tree.size + 1):
+            parent = index + (index & -index)
+            if parent <= tree.size:
+                tree._tree[parent] += tree._tree[index]
+        return tree
+
+    def add(self, slot: int, delta: int):
+        index = slot + 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, slot: int) -> int:
+        """Sum of the counts in slots [0, slot)"""
+        total = 0
+        while slot > 0:
+            total += self._tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def find(self, position: int) -> int:
+        """Slot holding the 0-based position-th counted item, in slot order"""
+        slot = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            if slot + step <= self.size and self._tree[slot + step] <= position:
+                slot += step
+                position -= self._tree[slot]
+            step >>= 1
+        return slot
+
+
+class ScoreBoard:
+    """One game's high scores: a Fenwick tree of bucket counts over sorted buckets.
+
+    Ranks add up the buckets above a score in O(log BUCKETS) and bisect
+    within its bucket, so a board costs one tuple per player plus a fixed
+    count array, and is built from a single sort.
+    """
+
+    def __init__(self):
+        self._tree = FenwickTree(BUCKETS)
+        self._buckets: Dict[int, List[Entry]] = {}
+        self._scores: Dict[str, int] = {}
+
+    @staticmethod
+    def _bucket(score: int) -> int:
+        return min(max(score, 0) // BUCKET_WIDTH, BUCKETS - 1)
+
+    @classmethod
+    def from_entries(cls, entries: List[Entry]) -> "ScoreBoard":
+        """Board from one entry per user (the list is sorted in place)"""
+        board = cls()
+        entries.sort()
+        counts = [0] * BUCKETS
+        for entry in entries:
+            bucket = cls._bucket(-entry[0])
+            board._buckets.setdefault(bucket, []).append(entry)
+            board._scores[entry[1]] = -entry[0]
+            counts[bucket] += 1
+        board._tree = FenwickTree.from_counts(counts)
+        return board
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def update(self, user_id: str, score: int, username: Optional[str]) -> bool:
+        current = self._scores.get(user_id)
+        if current is not None and score <= current:
+            return False
+        if current is not None:
+            bucket = self._buckets[self._bucket(current)]
+            del bucket[bisect_left(bucket, (-current, user_id))]
+            self._tree.add(self._bucket(current), -1)
+        insort(self._buckets.setdefault(self._bucket(score), []), (-score, user_id, username))
+        self._tree.add(self._bucket(score), 1)
+        self._scores[user_id] = score
+        return True
+
+    def position(self, user_id: str) -> Optional[int]:
+        """0-based leaderboard position of user_id"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        bucket = self._bucket(score)
+        above = len(self._scores) - self._tree.prefix(bucket + 1)
+        return above + bisect_left(self._buckets[bucket], (-score, user_id))
+
+    def slice(self, start: int, stop: int) -> List[Entry]:
+        """Entries in positions [start, stop), one Fenwick search per bucket visited"""
+        start, stop = max(start, 0), min(stop, len(self._scores))
+        entries: List[Entry] = []
+        while start < stop:
+            # Buckets run low to high score, positions high to low
+            bucket = self._tree.find(len(self._scores) - 1 - start)
+            above = len(self._scores) - self._tree.prefix(bucket + 1)
+            chunk = self._buckets[bucket][start - above:stop - above]
+            entries.extend(chunk)
+            start += len(chunk)
+        return entries
+
+
+class RankIndex:
+    """Per-game order-statistic index over users' high scores.
+
+    Entries sort by score descending, then user_id ascending, which is the
+    same order the leaderboard uses, so ranks are stable under ties.
+    """
+
+    def __init__(self):
+        self._boards: Dict[str, ScoreBoard] = {}
+        # Updates seen while a reload is reading the database, re-applied on top of it
+        self._during_reload: Optional[List[tuple]] = None
+
+    @staticmethod
+    def build(scores: Iterable[Tuple[str, str, int, Optional[str]]]) -> Dict[str, ScoreBoard]:
+        """Boards from (game_id, user_id, score, username) rows; CPU-bound, run it off the event loop"""
+        entries: Dict[str, List[Entry]] = {}
+        for game_id, user_id, score, username in scores:
+            entries.setdefault(game_id, []).append((-score, user_id, username))
+        return {game_id: ScoreBoard.from_entries(game_entries) for game_id, game_entries in entries.items()}
+
+    def begin_reload(self):
+        """Start recording updates; call before reading the scores passed to finish_reload"""
+        self._during_reload = []
+
+    def finish_reload(self, boards: Dict[str, ScoreBoard]):
+        """Swap in freshly built boards and re-apply updates made while they were read"""
+        pending, self._during_reload = self._during_reload or [], None
+        self._boards = boards
+        for update in pending:
+            self.update(*update)
+
+    def cancel_reload(self):
+        """Stop recording after a failed reload; the current boards stay"""
+        self._during_reload = None
+
+    def update(self, game_id: str, user_id: str, score: int, username: Optional[str] = None) -> bool:
+        """Record a high score; lower or equal scores are ignored. Returns True if it changed."""
+        if self._during_reload is not None:
+            self._during_reload.append((game_id, user_id, score, username))
+        board = self._boards.get(game_id)
+        if board is None:
+            board = self._boards[game_id] = ScoreBoard()
+        return board.update(user_id, score, username)
+
+    def total(self, game_id: str) -> int:
+        board = self._boards.get(game_id)
+        return len(board) if board else 0
+
+    def top(self, game_id: str, limit: int, offset: int = 0) -> List[dict]:
+        board = self._boards.get(game_id)
+        if not board:
+            return []
+        return [self._entry(offset + i, entry) for i, entry in enumerate(board.slice(offset, offset + limit))]
+
+    def rank(self, game_id: str, user_id: str, neighbours: int = 1) -> Optional[dict]:
+        """Rank of a user plus up to `neighbours` players directly above and below"""
+        board = self._boards.get(game_id)
+        position = board.position(user_id) if board else None
+        if position is None:
+            return None
+        first = max(position - neighbours, 0)
+        entries = [self._entry(first + i, entry)
+                   for i, entry in enumerate(board.slice(first, position + neighbours + 1))]
+        me = entries[position - first]
+        return {
+            **me,
+            "total_players": len(board),
+            "above": entries[:position - first],
+            "below": entries[position - first + 1:],
+        }
+
+    @staticmethod
+    def _entry(position: int, entry: Entry) -> dict:
+        return {"rank": position + 1, "user_id": entry[1], "username": entry[2], "score": -entry[0]}
@@ -0,0 +1,150 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+from ranking import RankIndex
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+class LeaderboardSubscriber:
+    """One WebSocket connection with its own bounded outbox and sender task"""
+
+    def __init__(self, websocket: WebSocket, outbox_size: int):
+        self.websocket = websocket
+        self.game_ids: Set[str] = set()
+        self._outbox: "asyncio.Queue[str]" = asyncio.Queue(outbox_size)
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def offer(self, encoded: str) -> bool:
+        """Queue a pre-encoded message; False if the client is too far behind"""
+        try:
+            self._outbox.put_nowait(encoded)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _send_loop(self):
+        try:
+            while True:
+                await self.websocket.send_text(await self._outbox.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # Connection went away; the receive loop will notice and clean up
+
+    async def close(self, code: int = 1000):
+        self._sender.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class LeaderboardHub:
+    """Pushes top-K leaderboard snapshots and rank-change deltas to WebSocket clients.
+
+    Every update is JSON-encoded once per game and the same string is queued
+    for each subscriber, so fan-out cost is one serialization per change.
+    Clients that fall a full outbox behind are disconnected and can resync
+    by reconnecting, which sends a fresh snapshot.
+    """
+
+    def __init__(self, rank_index: RankIndex, top_k: int = 10, outbox_size: int = 64, max_games: int = 16):
+        self.rank_index = rank_index
+        self.top_k = top_k
+        self.outbox_size = outbox_size
+        self.max_games = max_games  # Subscriptions one connection may hold
+        self._subscribers: Dict[str, Set[LeaderboardSubscriber]] = {}
+        self._top: Dict[str, List[dict]] = {}
+        self._snapshots: Dict[str, str] = {}
+
+    def connect(self, websocket: WebSocket) -> LeaderboardSubscriber:
+        return LeaderboardSubscriber(websocket, self.outbox_size)
+
+    def disconnect(self, subscriber: LeaderboardSubscriber):
+        for game_id in subscriber.game_ids:
+            self._subscribers.get(game_id, set()).discard(subscriber)
+        subscriber.game_ids.clear()
+
+    def subscribe(self, subscriber: LeaderboardSubscriber, game_id: str) -> bool:
+        """Start sending game_id's board; False if the connection already holds max_games"""
+        if game_id in subscriber.game_ids:
+            return True
+        if len(subscriber.game_ids) >= self.max_games:
+            return False
+        subscriber.game_ids.add(game_id)
+        self._subscribers.setdefault(game_id, set()).add(subscriber)
+        if not subscriber.offer(self._snapshot(game_id)):
+            self._drop(subscriber)
+        return True
+
+    def unsubscribe(self, subscriber: LeaderboardSubscriber, game_id: str):
+        subscriber.game_ids.discard(game_id)
+        self._subscribers.get(game_id, set()).discard(subscriber)
+
+    def reject(self, subscriber: LeaderboardSubscriber, detail: str):
+        """Tell the client a request was refused; the connection stays open"""
+        if not subscriber.offer(_encode({"type": "error", "detail": detail})):
+            self._drop(subscriber)
+
+    def notify(self, game_id: str, user_id: str):
+        """Called after the rank index accepted a new high score for user_id"""
+        previous = self._current_top(game_id)
+        position = self.rank_index.rank(game_id, user_id, neighbours=0)
+        was_listed = any(entry["user_id"] == user_id for entry in previous)
+        if not was_listed and (position is None or position["rank"] > self.top_k):
+            return  # Change happened below the visible board
+
+        top = self.rank_index.top(game_id, self.top_k)
+        self._top[game_id] = top
+        self._snapshots.pop(game_id, None)
+
+        previous_by_user = {entry["user_id"]: entry for entry in previous}
+        listed = {entry["user_id"] for entry in top}
+        changes = [entry for entry in top if previous_by_user.get(entry["user_id"]) != entry]
+        removed = [user for user in previous_by_user if user not in listed]
+        if not changes and not removed:
+            return
+
+        subscribers = self._subscribers.get(game_id)
+        if not subscribers:
+            return
+        encoded = _encode({"type": "delta", "game_id": game_id, "changes": changes, "removed": removed})
+        for subscriber in list(subscribers):
+            if not subscriber.offer(encoded):
+                self._drop(subscriber)
+
+    def resync(self):
+        """Called after the rank index was reloaded: resend boards that changed as snapshots"""
+        for game_id, previous in list(self._top.items()):
+            top = self.rank_index.top(game_id, self.top_k)
+            if top == previous:
+                continue
+            self._top[game_id] = top
+            self._snapshots.pop(game_id, None)
+            encoded = self._snapshot(game_id)
+            for subscriber in list(self._subscribers.get(game_id, ())):
+                if not subscriber.offer(encoded):
+                    self._drop(subscriber)
+
+    def _current_top(self, game_id: str) -> List[dict]:
+        if game_id not in self._top:
+            self._top[game_id] = self.rank_index.top(game_id, self.top_k)
+        return self._top[game_id]
+
+    def _snapshot(self, game_id: str) -> str:
+        encoded: Optional[str] = self._snapshots.get(game_id)
+        if encoded is None:
+            encoded = _encode({"type": "snapshot", "game_id": game_id, "leaderboard": self._current_top(game_id)})
+            self._snapshots[game_id] = encoded
+        return encoded
+
+    def _drop(self, subscriber: LeaderboardSubscriber):
+        self.disconnect(subscriber)
+        # 1013: try again later; the client reconnects and gets a fresh snapshot
+        asyncio.create_task(subscriber.close(code=1013))
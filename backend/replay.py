@@ -0,0 +1,311 @@
+"""Headless Snake and Tetris rules for re-simulating submitted games.
+
+A replay is (seed, inputs, ticks). The seed drives a mulberry32 generator,
+which clients implement in a few lines of JavaScript, in place of
+Math.random. `inputs` is a compact event string: comma-separated entries of
+<ticks since previous event><code>, e.g. "12U,18L,3R". `ticks` is how many
+steps were played in total.
+
+Snake: one tick per game-loop step (150 ms); codes U/D/L/R change direction.
+Tetris: one tick per 100 ms; codes L/R move, D soft-drops, U rotates, H
+hard-drops; gravity fires every max(1, 11 - level) ticks, matching the
+browser's max(100, 1000 - (level - 1) * 100) ms drop interval.
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+MAX_REPLAY_TICKS = 200_000
+EVENT_PATTERN = re.compile(r"(\d+)([A-Z])")
+M32 = 0xFFFFFFFF
+
+
+def mulberry32(seed: int) -> Callable[[], float]:
+    """Same sequence as the usual JavaScript mulberry32, as floats in [0, 1)"""
+    state = seed & M32
+
+    def next_random() -> float:
+        nonlocal state
+        state = (state + 0x6D2B79F5) & M32
+        t = ((state ^ (state >> 15)) * (state | 1)) & M32
+        t = ((t + (((t ^ (t >> 7)) * (t | 61)) & M32)) & M32) ^ t
+        return ((t ^ (t >> 14)) & M32) / 4294967296
+
+    return next_random
+
+
+def parse_inputs(inputs: str, allowed: str) -> List[Tuple[int, str]]:
+    """Decode "12U,18L" into absolute (tick, code) events"""
+    events = []
+    tick = 0
+    for entry in filter(None, inputs.split(",")):
+        match = EVENT_PATTERN.fullmatch(entry.strip())
+        if not match or match.group(2) not in allowed:
+            raise ValueError(f"Invalid replay event: {entry!r}")
+        tick += int(match.group(1))
+        events.append((tick, match.group(2)))
+    return events
+
+
+def encode_inputs(events: Sequence[Tuple[int, str]]) -> str:
+    """Inverse of parse_inputs"""
+    parts = []
+    previous = 0
+    for tick, code in events:
+        parts.append(f"{tick - previous}{code}")
+        previous = tick
+    return ",".join(parts)
+
+
+class SnakeGame:
+    """Port of frontend/src/games/SnakeGame.js"""
+
+    WIDTH, HEIGHT = 20, 15
+    CODES = "UDLR"
+    TICK_SECONDS = 0.15
+
+    def __init__(self, seed: int):
+        self.random = mulberry32(seed)
+        self.snake = [(10, 10)]
+        # startGame() draws the first food too, before any tick
+        self.food = self._random_food()
+        self.direction = (0, -1)
+        self.score = 0
+        self.game_over = False
+
+    def _random_food(self) -> Tuple[int, int]:
+        # generateFood(): x is drawn before y
+        return int(self.random() * 20), int(self.random() * 15)
+
+    def apply(self, code: str):
+        dx, dy = self.direction
+        if code == "U" and dy == 0:
+            self.direction = (0, -1)
+        elif code == "D" and dy == 0:
+            self.direction = (0, 1)
+        elif code == "L" and dx == 0:
+            self.direction = (-1, 0)
+        elif code == "R" and dx == 0:
+            self.direction = (1, 0)
+
+    def tick(self):
+        head = (self.snake[0][0] + self.direction[0], self.snake[0][1] + self.direction[1])
+        # As in the browser, the tail has not moved yet when checking self-collision
+        if not (0 <= head[0] < self.WIDTH and 0 <= head[1] < self.HEIGHT) or head in self.snake:
+            self.game_over = True
+            return
+        self.snake.insert(0, head)
+        if head == self.food:
+            self.score += 10
+            self.food = self._random_food()
+        else:
+            self.snake.pop()
+
+
+TETRIS_PIECES = {
+    "I": ((0, 0, 0, 0), (1, 1, 1, 1), (0, 0, 0, 0), (0, 0, 0, 0)),
+    "O": ((1, 1), (1, 1)),
+    "T": ((0, 1, 0), (1, 1, 1), (0, 0, 0)),
+    "S": ((0, 1, 1), (1, 1, 0), (0, 0, 0)),
+    "Z": ((1, 1, 0), (0, 1, 1), (0, 0, 0)),
+    "J": ((1, 0, 0), (1, 1, 1), (0, 0, 0)),
+    "L": ((0, 0, 1), (1, 1, 1), (0, 0, 0)),
+}
+PIECE_NAMES = tuple(TETRIS_PIECES)
+
+
+class TetrisGame:
+    """Port of frontend/src/games/TetrisGame.js"""
+
+    WIDTH, HEIGHT = 10, 20
+    CODES = "LRDUH"
+    TICK_SECONDS = 0.1
+
+    def __init__(self, seed: int):
+        self.random = mulberry32(seed)
+        self.board = [[0] * self.WIDTH for _ in range(self.HEIGHT)]
+        self.piece = self._random_piece()
+        self.next_piece = self._random_piece()
+        self.x, self.y = self.WIDTH // 2 - 1, 0
+        self.score = 0
+        self.lines = 0
+        self.level = 1
+        self.game_over = False
+        self._since_gravity = 0
+
+    def _random_piece(self):
+        return TETRIS_PIECES[PIECE_NAMES[int(self.random() * len(PIECE_NAMES))]]
+
+    def _fits(self, shape, x: int, y: int) -> bool:
+        for row_index, row in enumerate(shape):
+            for col_index, cell in enumerate(row):
+                if cell:
+                    board_x, board_y = x + col_index, y + row_index
+                    if board_x < 0 or board_x >= self.WIDTH or board_y >= self.HEIGHT:
+                        return False
+                    if board_y >= 0 and self.board[board_y][board_x]:
+                        return False
+        return True
+
+    def _move(self, dx: int, dy: int):
+        if self._fits(self.piece, self.x + dx, self.y + dy):
+            self.x += dx
+            self.y += dy
+        elif dy > 0:
+            self._lock()
+
+    def _lock(self):
+        for row_index, row in enumerate(self.piece):
+            for col_index, cell in enumerate(row):
+                if cell and self.y + row_index >= 0:
+                    self.board[self.y + row_index][self.x + col_index] = 1
+        remaining = [row for row in self.board if 0 in row]
+        cleared = self.HEIGHT - len(remaining)
+        self.board = [[0] * self.WIDTH for _ in range(cleared)] + remaining
+        self.lines += cleared
+        self.score += cleared * 100 * self.level + 10
+        if self.y <= 0:
+            self.game_over = True
+            return
+        self.level = self.lines // 10 + 1
+        self.piece, self.next_piece = self.next_piece, self._random_piece()
+        self.x, self.y = self.WIDTH // 2 - 1, 0
+        self._since_gravity = 0
+
+    def apply(self, code: str):
+        if code == "L":
+            self._move(-1, 0)
+        elif code == "R":
+            self._move(1, 0)
+        elif code == "D":
+            self._move(0, 1)
+        elif code == "U":
+            rotated = tuple(tuple(column)[::-1] for column in zip(*self.piece))
+            if self._fits(rotated, self.x, self.y):
+                self.piece = rotated
+        elif code == "H":
+            while self._fits(self.piece, self.x, self.y + 1):
+                self.y += 1
+            self._lock()
+
+    def tick(self):
+        self._since_gravity += 1
+        if self._since_gravity >= max(1, 11 - self.level):
+            self._since_gravity = 0
+            self._move(0, 1)
+
+
+REPLAY_GAMES = {
+    "snake-game": SnakeGame,
+    "tetris-game": TetrisGame,
+}
+
+
+def simulate(game_id: str, seed: int, inputs: str, ticks: int) -> int:
+    """Re-play a game and return the score it actually reaches"""
+    game_class = REPLAY_GAMES.get(game_id)
+    if game_class is None:
+        raise ValueError(f"Replays are not supported for {game_id}")
+    if not 0 <= ticks <= MAX_REPLAY_TICKS:
+        raise ValueError(f"Replay length must be between 0 and {MAX_REPLAY_TICKS} ticks")
+    events = parse_inputs(inputs, game_class.CODES)
+    game = game_class(seed)
+    next_event = 0
+    # Events at tick t happen before that tick's step; events at `ticks` end the game
+    for tick in range(ticks + 1):
+        while next_event < len(events) and events[next_event][0] <= tick and not game.game_over:
+            game.apply(events[next_event][1])
+            next_event += 1
+        if game.game_over or tick == ticks:
+            break
+        game.tick()
+        if game.game_over:
+            break
+    return game.score
+
+
+def simulate_batch(replays: List[Tuple[str, int, str, int]]) -> List[Optional[int]]:
+    """Worker entry point: simulated score per replay, None for malformed ones"""
+    results = []
+    for game_id, seed, inputs, ticks in replays:
+        try:
+            results.append(simulate(game_id, seed, inputs, ticks))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+class ReplayVerifier:
+    """Re-simulates replays in a process pool, in batches, off the event loop.
+
+    Requests queue up for at most `max_wait` seconds (or until `batch_size`
+    arrive); each batch is split into one chunk per worker process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 64, max_wait: float = 0.01):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: "asyncio.Queue" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        # Spawned (not forked) workers: the server process runs threads and an event loop
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def verify(self, game_id: str, seed: int, inputs: str, ticks: int) -> Optional[int]:
+        """Simulated score of a replay, or None if the replay is malformed"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((game_id, seed, inputs, ticks), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._process(batch))
+
+    async def _process(self, batch):
+        loop = asyncio.get_running_loop()
+        chunk_size = max(1, -(-len(batch) // self.workers))
+        chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self._pool, simulate_batch, [replay for replay, _ in chunk])
+                for chunk in chunks
+            ))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for chunk, chunk_results in zip(chunks, results):
+            for (_, future), score in zip(chunk, chunk_results):
+                if not future.done():
+                    future.set_result(score)
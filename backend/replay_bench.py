@@ -0,0 +1,136 @@
+"""Throughput benchmark for score replay verification.
+
+Generates bot-played Snake and Tetris replays, then measures replays per
+second on one core, through a bare process pool, and end to end through
+ReplayVerifier's batching.
+
+    python replay_bench.py --replays 2000 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from replay import ReplayVerifier, SnakeGame, TetrisGame, encode_inputs, simulate, simulate_batch
+
+Replay = Tuple[str, int, str, int]
+
+
+def play_snake(seed: int, max_ticks: int, rng: random.Random) -> Tuple[Replay, int]:
+    """Greedy bot: head for the food, avoid walls and its own body"""
+    game = SnakeGame(seed)
+    events = []
+    moves = {"U": (0, -1), "D": (0, 1), "L": (-1, 0), "R": (1, 0)}
+    tick = 0
+    while tick < max_ticks and not game.game_over:
+        head = game.snake[0]
+        safe = []
+        for code, (dx, dy) in moves.items():
+            if (dx, dy) == (-game.direction[0], -game.direction[1]):
+                continue
+            nxt = (head[0] + dx, head[1] + dy)
+            if 0 <= nxt[0] < game.WIDTH and 0 <= nxt[1] < game.HEIGHT and nxt not in game.snake:
+                distance = abs(nxt[0] - game.food[0]) + abs(nxt[1] - game.food[1])
+                safe.append((distance + rng.random(), code))
+        if safe:
+            code = min(safe)[1]
+            if moves[code] != game.direction:
+                game.apply(code)
+                events.append((tick, code))
+        game.tick()
+        tick += 1
+    return ("snake-game", seed, encode_inputs(events), tick), game.score
+
+
+def play_tetris(seed: int, max_ticks: int, rng: random.Random) -> Tuple[Replay, int]:
+    """Random bot: rotate, shift and hard-drop each piece, then wait a little"""
+    game = TetrisGame(seed)
+    events = []
+    tick = 0
+    while tick < max_ticks and not game.game_over:
+        codes = ["U"] * rng.randint(0, 3) + [rng.choice("LR")] * rng.randint(0, 5) + ["H"]
+        for code in codes:
+            game.apply(code)
+            events.append((tick, code))
+            if game.game_over:
+                break
+        for _ in range(rng.randint(1, 3)):
+            if game.game_over:
+                break
+            game.tick()
+            tick += 1
+    return ("tetris-game", seed, encode_inputs(events), tick), game.score
+
+
+def generate(count: int, seed: int, max_ticks: int) -> Tuple[List[Replay], List[int]]:
+    rng = random.Random(seed)
+    replays, scores = [], []
+    for i in range(count):
+        player = play_snake if i % 2 == 0 else play_tetris
+        replay, score = player(rng.randrange(2 ** 32), max_ticks, rng)
+        replays.append(replay)
+        scores.append(score)
+    return replays, scores
+
+
+def bench_serial(replays: List[Replay]) -> float:
+    start = time.perf_counter()
+    for replay in replays:
+        simulate(*replay)
+    return len(replays) / (time.perf_counter() - start)
+
+
+def bench_pool(replays: List[Replay], workers: int, chunk_size: int) -> float:
+    chunks = [replays[i:i + chunk_size] for i in range(0, len(replays), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(simulate_batch, chunks[:workers]))  # Warm up the workers
+        start = time.perf_counter()
+        list(pool.map(simulate_batch, chunks))
+        elapsed = time.perf_counter() - start
+    return len(replays) / elapsed
+
+
+async def bench_verifier(replays: List[Replay], workers: int) -> float:
+    verifier = ReplayVerifier(workers=workers)
+    verifier.start()
+    try:
+        await asyncio.gather(*(verifier.verify(*replay) for replay in replays[:workers]))
+        start = time.perf_counter()
+        await asyncio.gather(*(verifier.verify(*replay) for replay in replays))
+        return len(replays) / (time.perf_counter() - start)
+    finally:
+        await verifier.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark replay verification throughput")
+    parser.add_argument("--replays", type=int, default=1000, help="Number of replays to verify")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size")
+    parser.add_argument("--max-ticks", type=int, default=3000, help="Length cap for generated games")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    replays, scores = generate(args.replays, args.seed, args.max_ticks)
+    assert [simulate(*replay) for replay in replays] == scores, "Replays do not reproduce bot scores"
+
+    serial = bench_serial(replays)
+    pooled = bench_pool(replays, args.workers, chunk_size=64)
+    verifier = asyncio.run(bench_verifier(replays, args.workers))
+    print(json.dumps({
+        "replays": len(replays),
+        "mean_ticks": sum(replay[3] for replay in replays) / len(replays),
+        "workers": args.workers,
+        "serial_replays_per_second": serial,
+        "pool_replays_per_second": pooled,
+        "pool_replays_per_second_per_core": pooled / args.workers,
+        "verifier_replays_per_second": verifier,
+        "verifier_replays_per_second_per_core": verifier / args.workers,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
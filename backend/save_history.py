@@ -0,0 +1,169 @@
+"""Per-slot save history stored as snapshots plus delta chains.
+
+Every save of a slot adds a history entry for its version. Every
+snapshot_interval versions the entry is a full snapshot of game_data; in
+between it is a delta from the previous version, so restoring any version
+applies at most snapshot_interval - 1 deltas to its snapshot.
+
+Deltas are lists of structural ops on the JSON document rather than byte
+diffs, so they are stored as plain BSON and stay small for the way the
+games change between saves:
+
+    ["set", path, value]        replace the value at path ([] is the root)
+    ["del", path]               remove a dict key
+    ["shift", path, heads, n]   prepend heads to the list at path, drop n from its end
+
+A Snake move is one shift (new head in, tail out), a Tetris lock is a few
+cell sets on the board. Paths are lists of dict keys and list indices.
+"""
+import copy
+import json
+from typing import List, Optional
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+# Offsets fully compared when looking for a shift (a Snake save matches on the first)
+MAX_SHIFT_CANDIDATES = 4
+
+
+def encoded_size(value) -> int:
+    """Compact JSON size in bytes, used to pick the cheaper encoding"""
+    return len(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def _same(old, new) -> bool:
+    """Equal as JSON: unlike ==, 1 and True (or 1 and 1.0) differ"""
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return old.keys() == new.keys() and all(_same(value, new[key]) for key, value in old.items())
+    if isinstance(old, list):
+        return len(old) == len(new) and all(_same(mine, theirs) for mine, theirs in zip(old, new))
+    return old == new
+
+
+def _shift(old: list, new: list) -> Optional[tuple]:
+    """(heads, dropped) if new is old with items pushed on the front and popped off the end.
+
+    Only offsets where old's first and last kept items line up are compared
+    in full, and at most MAX_SHIFT_CANDIDATES of them, so lists of repeated
+    items cost O(n) rather than O(n^2).
+    """
+    if not old:
+        return None
+    tried = 0
+    for pushed in range(max(1, len(new) - len(old)), len(new)):
+        kept = len(new) - pushed
+        if not (_same(new[pushed], old[0]) and _same(new[-1], old[kept - 1])):
+            continue
+        if _same(new[pushed:], old[:kept]):
+            return new[:pushed], len(old) - kept
+        tried += 1
+        if tried >= MAX_SHIFT_CANDIDATES:
+            break
+    return None
+
+
+def diff(old, new, path: Optional[list] = None) -> List[list]:
+    """Ops turning old into new"""
+    path = path or []
+    if _same(old, new):
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [["del", path + [key]] for key in old if key not in new]
+        for key, value in new.items():
+            if key in old:
+                ops.extend(diff(old[key], value, path + [key]))
+            else:
+                ops.append(["set", path + [key], value])
+        return ops
+
+    replace = [["set", path, new]]
+    if isinstance(old, list) and isinstance(new, list):
+        candidates = [replace]
+        shifted = _shift(old, new)
+        if shifted is not None:
+            candidates.append([["shift", path, shifted[0], shifted[1]]])
+        if len(old) == len(new):
+            candidates.append([op for index, (mine, theirs) in enumerate(zip(old, new))
+                               for op in diff(mine, theirs, path + [index])])
+        return min(candidates, key=encoded_size)
+    return replace
+
+
+def apply_delta(data: dict, delta: List[list]) -> dict:
+    """New document with the ops applied; data is left untouched"""
+    result = copy.deepcopy(data)
+    for op in delta:
+        kind, path = op[0], op[1]
+        if kind == "set" and not path:
+            result = copy.deepcopy(op[2])
+            continue
+        parent = result
+        for key in path[:-1]:
+            parent = parent[key]
+        if kind == "set":
+            parent[path[-1]] = copy.deepcopy(op[2])
+        elif kind == "del":
+            del parent[path[-1]]
+        elif kind == "shift":
+            target = parent[path[-1]] if path else result
+            heads, dropped = op[2], op[3]
+            target[:] = copy.deepcopy(heads) + target[:len(target) - dropped]
+        else:
+            raise ValueError(f"Unknown delta op: {kind}")
+    return result
+
+
+def _entry(save: dict, kind: str, base_version: int, data) -> dict:
+    return {
+        "user_id": save["user_id"],
+        "game_id": save["game_id"],
+        "slot_number": save["slot_number"],
+        "version": save.get("version") or 1,
+        "base_version": base_version,  # Snapshot this entry's chain starts from
+        "kind": kind,
+        "data": data,
+        "size": encoded_size(data),
+        "score": save.get("score"),
+        "name": save.get("name"),
+        "saved_at": save.get("saved_at"),
+        "content_hash": save.get("content_hash"),
+    }
+
+
+def history_entries(save: dict, previous: Optional[dict], latest: Optional[dict],
+                    snapshot_interval: int) -> List[dict]:
+    """Entries to append after `save` replaced `previous` (None for a new slot).
+
+    latest is the newest stored entry's version and base_version. A previous
+    save with no history yet (written before history existed, or whose entry
+    was lost) is recorded as a snapshot first, so it can still be restored.
+    """
+    version = save["version"]
+    entries = []
+    if previous is not None and (latest is None or latest["version"] != version - 1):
+        latest = None
+        if (previous.get("version") or 1) == version - 1:
+            entries.append(_entry(previous, SNAPSHOT, version - 1, previous["game_data"]))
+            latest = {"version": version - 1, "base_version": version - 1}
+
+    if previous is not None and latest is not None and version - latest["base_version"] < snapshot_interval:
+        delta = diff(previous["game_data"], save["game_data"])
+        # A delta as big as the document saves nothing; start a new chain instead
+        if encoded_size(delta) < encoded_size(save["game_data"]):
+            entries.append(_entry(save, DELTA, latest["base_version"], delta))
+            return entries
+    entries.append(_entry(save, SNAPSHOT, version, save["game_data"]))
+    return entries
+
+
+def reconstruct(chain: List[dict]) -> dict:
+    """game_data of the last entry of a chain: its snapshot followed by consecutive deltas"""
+    if not chain or chain[0]["kind"] != SNAPSHOT:
+        raise ValueError("History chain must start with a snapshot")
+    data = copy.deepcopy(chain[0]["data"])
+    for entry in chain[1:]:
+        data = apply_delta(data, entry["data"])
+    return data
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+# Calendar windows served by the leaderboard, in UTC
+WINDOWS = ("daily", "weekly", "monthly")
+
+
+def window_bounds(window: str, when: datetime) -> Tuple[datetime, datetime]:
+    """Start (inclusive) and end (exclusive) of the window containing `when`"""
+    day = datetime(when.year, when.month, when.day)
+    if window == "daily":
+        return day, day + timedelta(days=1)
+    if window == "weekly":
+        start = day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+        return start, start + timedelta(days=7)
+    if window == "monthly":
+        start = day.replace(day=1)
+        if start.month == 12:
+            return start, start.replace(year=start.year + 1, month=1)
+        return start, start.replace(month=start.month + 1)
+    raise ValueError(f"Unknown leaderboard window: {window}")
+
+
+def window_bucket(window: str, when: datetime) -> str:
+    """Stable label of the window containing `when`, e.g. 2024-05-17, 2024-W20, 2024-05"""
+    if window == "daily":
+        return when.strftime("%Y-%m-%d")
+    if window == "weekly":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if window == "monthly":
+        return when.strftime("%Y-%m")
+    raise ValueError(f"Unknown leaderboard window: {window}")
+
+
+def window_buckets(when: datetime) -> Dict[str, Tuple[str, datetime]]:
+    """Bucket label and end time of every window containing `when`"""
+    return {window: (window_bucket(window, when), window_bounds(window, when)[1]) for window in WINDOWS}
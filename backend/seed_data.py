@@ -0,0 +1,233 @@
+"""Fill MongoDB with production-sized synthetic data for benchmarking.
+
+    python seed_data.py --users 1000000 --workers 8
+    python seed_data.py --drop          # remove everything this script inserted
+
+Generates users with realistic per-game high scores and Snake/Tetris saves
+shaped like the frontend's getGameState(), in batches inserted with
+insert_many from a pool of worker processes. Every batch draws from its own
+generator seeded with (seed, batch number), so a given --seed produces the
+same data whatever the worker count, and rerunning it only inserts what is
+missing (duplicates are skipped). All documents carry "synthetic": True.
+
+Settings: MONGO_URL (default mongodb://localhost:27017), database nokia_games.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+
+TETRIS_PIECES = {
+    "I": [[0, 0, 0, 0], [1, 1, 1, 1], [0, 0, 0, 0], [0, 0, 0, 0]],
+    "O": [[1, 1], [1, 1]],
+    "T": [[0, 1, 0], [1, 1, 1], [0, 0, 0]],
+    "S": [[0, 1, 1], [1, 1, 0], [0, 0, 0]],
+    "Z": [[1, 1, 0], [0, 1, 1], [0, 0, 0]],
+    "J": [[1, 0, 0], [1, 1, 1], [0, 0, 0]],
+    "L": [[0, 0, 1], [1, 1, 1], [0, 0, 0]],
+}
+# Share of players who have a score in each game, and median / cap of that score
+GAME_PROFILES = {
+    "snake-game": (0.7, 120, 3000),
+    "tetris-game": (0.5, 900, 60000),
+    "pong-game": (0.3, 40, 100),
+}
+SAVE_GAMES = ("snake-game", "tetris-game")
+DUPLICATE_KEY = 11000
+
+_client = None
+
+
+def snake_state(rng: random.Random, score: int) -> dict:
+    """SnakeGame.getGameState() for a snake that has eaten score / 10 times"""
+    length = score // 10 + 1
+    x, y = rng.randrange(20), rng.randrange(15)
+    body = [{"x": x, "y": y}]
+    occupied = {(x, y)}
+    while len(body) < length:
+        options = [
+            (x + dx, y + dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+            if 0 <= x + dx < 20 and 0 <= y + dy < 15 and (x + dx, y + dy) not in occupied
+        ]
+        if not options:
+            break
+        x, y = rng.choice(options)
+        body.append({"x": x, "y": y})
+        occupied.add((x, y))
+    heading = rng.choice([{"x": 0, "y": -1}, {"x": 0, "y": 1}, {"x": -1, "y": 0}, {"x": 1, "y": 0}])
+    return {
+        "snake": body,
+        "food": {"x": rng.randrange(20), "y": rng.randrange(15)},
+        "direction": heading,
+        "score": score,
+        "gameRunning": False,
+        "gameOver": False,
+    }
+
+
+def tetris_state(rng: random.Random, score: int) -> dict:
+    """TetrisGame.getGameState(): 20x10 board with a partly filled stack"""
+    lines = score // 150
+    stack_height = rng.randint(2, 12)
+    board = [[0] * 10 for _ in range(20 - stack_height)]
+    for _ in range(stack_height):
+        row = [1 if rng.random() < 0.75 else 0 for _ in range(10)]
+        row[rng.randrange(10)] = 0  # Full rows would have been cleared
+        board.append(row)
+    current, upcoming = rng.choice(list(TETRIS_PIECES)), rng.choice(list(TETRIS_PIECES))
+    return {
+        "board": board,
+        "currentPiece": {"shape": TETRIS_PIECES[current], "type": current},
+        "currentPosition": {"x": rng.randrange(7), "y": rng.randrange(20 - stack_height)},
+        "nextPiece": {"shape": TETRIS_PIECES[upcoming], "type": upcoming},
+        "score": score,
+        "lines": lines,
+        "level": lines // 10 + 1,
+        "gameRunning": False,
+        "gameOver": False,
+    }
+
+
+def game_score(rng: random.Random, game_id: str) -> int:
+    """Long-tailed score: most players are near the median, a few are far above"""
+    _, median, cap = GAME_PROFILES[game_id]
+    return min(cap, max(10, int(rng.lognormvariate(0, 1) * median) // 10 * 10))
+
+
+def content_hash(game_data: dict) -> str:
+    """Same canonical hash as server.content_hash, so unchanged-save detection works on this data"""
+    canonical = json.dumps(game_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def generate_batch(seed: int, batch: int, batch_size: int, total_users: int,
+                   saves_per_user: float, now: datetime) -> Tuple[List[dict], List[dict]]:
+    """Users [batch * batch_size, ...) and their saves"""
+    rng = random.Random(f"{seed}:{batch}")
+    users, saves = [], []
+    for number in range(batch * batch_size, min(total_users, (batch + 1) * batch_size)):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        high_scores = {
+            game_id: game_score(rng, game_id)
+            for game_id, (played, _, _) in GAME_PROFILES.items()
+            if rng.random() < played
+        }
+        created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        users.append({
+            "id": user_id,
+            "username": f"Player{number}",
+            "email": f"player{number}@synthetic.nokia.com",
+            "password_hash": "synthetic",
+            "is_admin": False,
+            "created_at": created_at,
+            "high_scores": high_scores,
+            "synthetic": True,
+        })
+
+        # Most players keep a save or two, a few fill many slots; never two saves in one slot
+        save_count = min(20, round(rng.expovariate(1 / saves_per_user))) if saves_per_user > 0 else 0
+        slots = rng.sample([(game_id, slot) for game_id in SAVE_GAMES for slot in range(1, 11)], save_count)
+        for game_id, slot in slots:
+            score = rng.randint(0, high_scores.get(game_id, 100) // 10) * 10
+            game_data = snake_state(rng, score) if game_id == "snake-game" else tetris_state(rng, score)
+            saves.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "user_id": user_id,
+                "game_id": game_id,
+                "slot_number": slot,
+                "game_data": game_data,
+                "score": score,
+                "saved_at": created_at + timedelta(seconds=rng.randrange(max(1, int((now - created_at).total_seconds())))),
+                "name": f"Save Slot {slot}",
+                "version": rng.randint(1, 5),
+                "content_hash": content_hash(game_data),
+                "synthetic": True,
+            })
+    return users, saves
+
+
+def insert_new(collection, docs: List[dict]) -> int:
+    """insert_many that skips documents already present (a rerun with the same seed); returns inserted count"""
+    if not docs:
+        return 0
+    try:
+        return len(collection.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+def insert_batch(mongo_url: str, seed: int, batch: int, batch_size: int, total_users: int,
+                 saves_per_user: float, now: datetime) -> Tuple[int, int]:
+    """Worker entry point: generate one batch and insert what is not there yet"""
+    global _client
+    if _client is None:
+        _client = MongoClient(mongo_url)  # One connection pool per worker process
+    db = _client.nokia_games
+    users, saves = generate_batch(seed, batch, batch_size, total_users, saves_per_user, now)
+    return insert_new(db.users, users), insert_new(db.game_states, saves)
+
+
+def drop_synthetic(mongo_url: str):
+    db = MongoClient(mongo_url).nokia_games
+    users = db.users.delete_many({"synthetic": True}).deleted_count
+    saves = db.game_states.delete_many({"synthetic": True}).deleted_count
+    print(f"✅ Removed {users} synthetic users and {saves} synthetic saves")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insert synthetic users and saves for benchmarking")
+    parser.add_argument("--users", type=int, default=100000, help="Number of users to create")
+    parser.add_argument("--saves-per-user", type=float, default=1.5, help="Mean save slots per user")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Users per insert_many batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel worker processes")
+    parser.add_argument("--seed", type=int, default=1, help="Seed; the same seed generates the same data")
+    parser.add_argument("--drop", action="store_true", help="Delete previously generated data and exit")
+    args = parser.parse_args()
+
+    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    if args.drop:
+        drop_synthetic(mongo_url)
+        return
+
+    # The API creates these on startup too; reruns rely on them to skip existing documents
+    db = MongoClient(mongo_url).nokia_games
+    db.users.create_index("id", unique=True)
+    db.users.create_index("email", unique=True, partialFilterExpression={"email": {"$type": "string"}})
+    db.game_states.create_index([("user_id", 1), ("game_id", 1), ("slot_number", 1)], unique=True)
+
+    # Midnight today, so reruns with the same seed on the same day insert identical documents
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    batches = -(-args.users // args.batch_size)
+    users_done = saves_done = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(insert_batch, mongo_url, args.seed, batch, args.batch_size,
+                        args.users, args.saves_per_user, now)
+            for batch in range(batches)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            users, saves = future.result()
+            users_done += users
+            saves_done += saves
+            if done % max(1, batches // 20) == 0 or done == batches:
+                elapsed = time.perf_counter() - started
+                print(f"{users_done:>10} users, {saves_done:>10} saves "
+                      f"({(users_done + saves_done) / elapsed:,.0f} docs/s)")
+    print(f"✅ Inserted {users_done} users and {saves_done} saves in {time.perf_counter() - started:.1f}s")
+    print("⚠️ Restart the API so the rank index is rebuilt from the new users")
+
+
+if __name__ == "__main__":
+    main()
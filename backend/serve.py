@@ -0,0 +1,64 @@
+"""Production entry point: serves the API from several uvicorn worker processes.
+
+    python serve.py
+
+Settings come from the environment:
+    WEB_CONCURRENCY       number of worker processes (default: CPU count)
+    PORT                  listen port (default: 8001)
+    PONG_PORT             port of the dedicated Pong match process (default: 8002)
+    UVICORN_BACKLOG       listen socket backlog (default: 2048)
+    UVICORN_KEEP_ALIVE    keep-alive timeout in seconds (default: 15)
+
+With more than one worker the cache invalidation bus is switched to MongoDB
+so that writes on one worker evict stale cache entries on all of them.
+
+Pong matches live in the memory of the process that paired the players, so
+/api/ws/pong is served by one extra single-worker process on PONG_PORT
+(nginx routes it there) and the API workers refuse it. Otherwise two players
+would usually be accepted by different workers and wait for each other forever.
+"""
+import multiprocessing
+import os
+
+import uvicorn
+
+
+def uvicorn_options(port: int, workers: int) -> dict:
+    return {
+        "host": os.environ.get("HOST", "0.0.0.0"),
+        "port": port,
+        "workers": workers,
+        "loop": "uvloop",
+        "http": "httptools",
+        "backlog": int(os.environ.get("UVICORN_BACKLOG", "2048")),
+        "timeout_keep_alive": int(os.environ.get("UVICORN_KEEP_ALIVE", "15")),
+        "access_log": False,
+        "proxy_headers": True,
+        "forwarded_allow_ips": "127.0.0.1",
+    }
+
+
+def serve_pong():
+    """The one process that accepts Pong players, so every pair meets"""
+    os.environ["PONG_ENABLED"] = "1"
+    uvicorn.run("server:app", **uvicorn_options(int(os.environ.get("PONG_PORT", "8002")), workers=1))
+
+
+def main():
+    workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Workers size their replay process pools from this
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1:
+        # Workers inherit the environment, so they all join the same bus
+        os.environ.setdefault("CACHE_BUS", "mongo")
+
+    # Daemonic, so it is stopped (with SIGTERM, shutting down cleanly) when the API exits
+    pong = multiprocessing.Process(target=serve_pong, name="pong", daemon=True)
+    pong.start()
+
+    os.environ["PONG_ENABLED"] = "0"
+    uvicorn.run("server:app", **uvicorn_options(int(os.environ.get("PORT", "8001")), workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 import json
+import hashlib
+import secrets
+import asyncio
+import base64
+import struct
+import zlib
+
+from analytics import count_arrays, summarize_score_counts
+from cache import MISS, ResponseCache, create_invalidation_bus
+from compression import CompressionMiddleware
+from jobs import JobQueue
+from mongo_storage import SCORE_EVENT_RETENTION_SECONDS, TELEMETRY_RETENTION_SECONDS, create_storage
+from pong_match import INPUT_MESSAGE, PongMatchmaker, PongPlayer, RoomScheduler
+from ranking import RankIndex
+from replay import REPLAY_GAMES, ReplayVerifier
+from realtime import LeaderboardHub
+from save_history import encoded_size, history_entries, reconstruct
+from score_windows import WINDOWS, window_bucket, window_buckets
+from storage import StorageConflict
+from telemetry import LAYOUT_VERSION, METRIC_BOUNDS, TelemetryAggregator, TelemetryError, merge_stored
 
 # Initialize FastAPI app
 app = FastAPI(title="Nokia Games Platform API", version="1.0.0")
@@ -21,6 +41,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (zstd/br/gzip as negotiated); thresholds in bytes of JSON
+app.add_middleware(
+    CompressionMiddleware,
+    route_thresholds={
+        "/api/game-states/": 256,  # Save documents and slot listings
+        "/api/admin/users": 512,
+        "/api/games": 512,
+        "/api/scores/leaderboard/": 512,
+        "/api/health": None,
+    },
+    default_min_size=1024,
+    # Served from the response cache, so the same body is compressed once per encoding
+    cacheable_prefixes=("/api/games", "/api/scores/leaderboard/"),
+    thread_threshold=int(os.environ.get("COMPRESSION_THREAD_THRESHOLD", str(64 * 1024)))
+)
+
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 client = AsyncIOMotorClient(MONGO_URL)
@@ -45,6 +81,8 @@ class GameState(BaseModel):
     score: int
     saved_at: datetime
     name: Optional[str] = None  # User-given name for the save
+    version: int = 1  # Incremented on every write, used for If-Match checks
+    content_hash: Optional[str] = None  # SHA-256 of canonical game_data
 
 class Game(BaseModel):
     id: str
@@ -62,6 +100,13 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class VerifiedScoreRequest(BaseModel):
+    game_id: str
+    score: int
+    seed: int  # Seed of the mulberry32 generator, from /api/scores/replay-seed
+    inputs: str  # Compact input log, see replay.py
+    ticks: int  # Game steps played
+
 class SaveGameRequest(BaseModel):
     game_id: str
     slot_number: int
@@ -69,14 +114,123 @@ class SaveGameRequest(BaseModel):
     score: int
     name: Optional[str] = None
 
-# Database collections
-users_collection = db.users
-games_collection = db.games
-game_states_collection = db.game_states
+# Users, games, saves and scores; STORAGE_BACKEND=memory swaps MongoDB for an in-process store
+storage = create_storage(db)
+
+# Window aggregates linger a little past the end of their window before expiring
+WINDOW_GRACE = timedelta(days=1)
+# Largest leaderboard page a client can request; bigger limits are clamped
+MAX_LEADERBOARD_PAGE = 100
+# Admin analytics are recomputed at most once per bucket of this many seconds
+ANALYTICS_BUCKET_SECONDS = int(os.environ.get("ANALYTICS_BUCKET_SECONDS", "300"))
+# Save history: a full snapshot every N versions (deltas in between), and how many versions to keep per slot
+SAVE_SNAPSHOT_INTERVAL = int(os.environ.get("SAVE_SNAPSHOT_INTERVAL", "10"))
+SAVE_HISTORY_VERSIONS = int(os.environ.get("SAVE_HISTORY_VERSIONS", "50"))
+# Largest game_data accepted in a save, as compact JSON (Snake and Tetris states are about 1 KB)
+MAX_SAVE_DATA_BYTES = int(os.environ.get("MAX_SAVE_DATA_BYTES", str(256 * 1024)))
+
+# Response cache shared by read-heavy endpoints. Writes publish invalidations on
+# the bus so every worker evicts the matching entries, not just the writer.
+response_cache = ResponseCache(ttl=float(os.environ.get("CACHE_TTL_SECONDS", "30")))
+invalidation_bus = create_invalidation_bus(db)
+
+# In-memory order-statistic index of high scores per game, kept in sync on
+# every worker through "score" messages on the bus and rebuilt periodically
+rank_index = RankIndex()
+# Pushes top-K changes to WebSocket subscribers; fed from the same score messages
+leaderboard_hub = LeaderboardHub(
+    rank_index,
+    top_k=int(os.environ.get("LIVE_LEADERBOARD_SIZE", "10")),
+    max_games=int(os.environ.get("LIVE_LEADERBOARD_MAX_GAMES", "16"))
+)
+
+# Each worker's rank index is rebuilt from the database this often, to repair any
+# score message it missed; 0 turns the periodic rebuild off
+RANK_RESYNC_SECONDS = float(os.environ.get("RANK_RESYNC_SECONDS", "900"))
+rank_reload_lock = asyncio.Lock()
+rank_resync_task: Optional[asyncio.Task] = None
+
+async def reload_rank_index():
+    """Rebuild the rank index from the stored high scores, off the event loop"""
+    if rank_reload_lock.locked():
+        return  # A rebuild is already reading the scores
+    async with rank_reload_lock:
+        rank_index.begin_reload()
+        try:
+            rows = []
+            async for user_id, username, high_scores in storage.users.iter_high_scores():
+                rows.extend((game_id, user_id, score, username) for game_id, score in high_scores.items())
+            boards = await asyncio.to_thread(RankIndex.build, rows)
+        except Exception as e:
+            rank_index.cancel_reload()
+            print(f"⚠️ Could not rebuild the rank index: {e}")
+            return
+        rank_index.finish_reload(boards)
+        leaderboard_hub.resync()
+
+async def resync_rank_index_periodically():
+    while True:
+        await asyncio.sleep(RANK_RESYNC_SECONDS)
+        await reload_rank_index()
+
+def handle_bus_message(message: dict):
+    """Apply a message received from the bus"""
+    if message.get("type") == "invalidate":
+        response_cache.invalidate(*message.get("tags", []))
+    elif message.get("type") == "score":
+        if rank_index.update(message["game_id"], message["user_id"], message["score"], message.get("username")):
+            leaderboard_hub.notify(message["game_id"], message["user_id"])
+        response_cache.invalidate(f"leaderboard:{message['game_id']}")
+    elif message.get("type") == "resync":
+        # The bus may have dropped score messages while it was disconnected
+        asyncio.create_task(reload_rank_index())
+
+invalidation_bus.subscribe(handle_bus_message)
+
+# Online Pong: one fixed-tick scheduler per worker process hosts all its matches
+pong_scheduler = RoomScheduler(max_rooms=int(os.environ.get("PONG_MAX_ROOMS", "500")))
+pong_matchmaker = PongMatchmaker(pong_scheduler)
+# Matchmaking is per process: under serve.py only the dedicated Pong process accepts players
+PONG_ENABLED = os.environ.get("PONG_ENABLED", "1") == "1"
+
+# Replays of Snake/Tetris scores are re-simulated in a process pool before acceptance.
+# With REQUIRE_VERIFIED_SCORES=1 those games only take scores through /api/scores/verified,
+# replayed from a seed issued by /api/scores/replay-seed.
+# Replay processes per API worker: by default the CPUs are shared among the WEB_CONCURRENCY workers
+REPLAY_WORKERS = int(os.environ.get("REPLAY_WORKERS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", "1"))
+)
+replay_verifier = ReplayVerifier(workers=REPLAY_WORKERS)
+REQUIRE_VERIFIED_SCORES = os.environ.get("REQUIRE_VERIFIED_SCORES", "0") == "1"
+# Replays must use a seed the server issued for that user and game, once, within this many seconds
+REPLAY_SEED_TTL_SECONDS = int(os.environ.get("REPLAY_SEED_TTL_SECONDS", "3600"))
+MAX_REPLAY_INPUT_LENGTH = 1_000_000
+
+# Secondary writes (score event log, windowed leaderboards) run in the background;
+# anything unfinished at shutdown is spilled to pending_jobs and resumed on start
+job_queue = JobQueue(storage.pending_jobs, maxsize=int(os.environ.get("JOB_QUEUE_SIZE", "10000")))
+
+# Client performance histograms are merged in memory and flushed every few seconds
+telemetry = TelemetryAggregator(
+    storage.telemetry.add_histograms,
+    window_seconds=int(os.environ.get("TELEMETRY_WINDOW_SECONDS", "60")),
+    flush_interval=float(os.environ.get("TELEMETRY_FLUSH_SECONDS", "10"))
+)
+# Compressed and decompressed size limits for one telemetry batch
+MAX_TELEMETRY_BODY = 64 * 1024
+MAX_TELEMETRY_DECOMPRESSED = 1024 * 1024
+
+async def invalidate_cache(*tags: str):
+    """Evict cache entries for the given tags on all workers"""
+    await invalidation_bus.publish({"type": "invalidate", "tags": list(tags)})
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the database with default data"""
+    global rank_resync_task
+    await invalidation_bus.start()
+    await storage.ensure_indexes()
+
     # Create default games
     default_games = [
         {
@@ -103,9 +257,13 @@ async def startup_event():
     ]
     
     for game in default_games:
-        existing_game = await games_collection.find_one({"id": game["id"]})
+        existing_game = await storage.games.get(game["id"])
         if not existing_game:
-            await games_collection.insert_one(game)
+            try:
+                await storage.games.insert(game)
+            except StorageConflict:
+                continue  # Another worker created it first
+            await invalidate_cache("games")
             print(f"✅ {game['name']} game initialized in database")
     
     # Create default users
@@ -131,11 +289,39 @@ async def startup_event():
     ]
     
     for user in default_users:
-        existing_user = await users_collection.find_one({"email": user["email"]})
+        existing_user = await storage.users.find_by_email(user["email"])
         if not existing_user:
-            await users_collection.insert_one(user)
+            try:
+                await storage.users.insert(user)
+            except StorageConflict:
+                continue  # Another worker created it first
             print(f"✅ {user['username']} user created: {user['email']} / {user['password_hash']}")
 
+    # Keyset pagination indexes for the all-time leaderboards, one per game
+    for game in default_games:
+        await storage.users.ensure_leaderboard_index(game["id"])
+
+    await job_queue.start()
+    if PONG_ENABLED:
+        pong_scheduler.start()
+    telemetry.start()
+    replay_verifier.start()
+
+    await reload_rank_index()
+    if RANK_RESYNC_SECONDS > 0:
+        rank_resync_task = asyncio.create_task(resync_rank_index_periodically())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush background work and stop listeners"""
+    if rank_resync_task:
+        rank_resync_task.cancel()
+    await pong_scheduler.stop()
+    await replay_verifier.stop()
+    await telemetry.stop()
+    await job_queue.stop()
+    await invalidation_bus.stop()
+
 # ==================== HEALTH CHECK ====================
 @app.get("/api/health")
 async def health_check():
@@ -157,24 +343,33 @@ def serialize_doc(doc):
 @app.get("/api/games")
 async def get_games():
     """Get all active games"""
-    games = await games_collection.find({"is_active": True}).to_list(100)
+    cached = response_cache.get("games", "active")
+    if cached is not MISS:
+        return cached
+    games = await storage.games.list_active(100)
     games = serialize_doc(games)
+    response_cache.set("games", "active", {"games": games})
     return {"games": games}
 
 @app.get("/api/games/{game_id}")
 async def get_game(game_id: str):
     """Get specific game details"""
-    game = await games_collection.find_one({"id": game_id})
+    cached = response_cache.get("games", game_id)
+    if cached is not MISS:
+        return cached
+    game = await storage.games.get(game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    return serialize_doc(game)
+    game = serialize_doc(game)
+    response_cache.set("games", game_id, game)
+    return game
 
 # ==================== USER ENDPOINTS ====================
 @app.post("/api/users/register")
 async def register_user(user_data: UserRegistration):
     """Register a new user"""
     # Check if user already exists
-    existing_user = await users_collection.find_one({"email": user_data.email})
+    existing_user = await storage.users.find_by_email(user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
@@ -189,7 +384,11 @@ async def register_user(user_data: UserRegistration):
         "high_scores": {}
     }
     
-    await users_collection.insert_one(new_user)
+    try:
+        await storage.users.insert(new_user)
+    except StorageConflict:
+        # Registered concurrently with the same email
+        raise HTTPException(status_code=400, detail="User already exists")
     
     # Return user without password
     new_user = serialize_doc(new_user)
@@ -199,7 +398,7 @@ async def register_user(user_data: UserRegistration):
 @app.post("/api/users/login")
 async def login_user(login_data: UserLogin):
     """Login user"""
-    user = await users_collection.find_one({"email": login_data.email})
+    user = await storage.users.find_by_email(login_data.email)
     if not user or user["password_hash"] != login_data.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -211,7 +410,7 @@ async def login_user(login_data: UserLogin):
 @app.get("/api/users/{user_id}/profile")
 async def get_user_profile(user_id: str):
     """Get user profile"""
-    user = await users_collection.find_one({"id": user_id})
+    user = await storage.users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -221,141 +420,599 @@ async def get_user_profile(user_id: str):
     return user
 
 # ==================== GAME STATE ENDPOINTS ====================
+def content_hash(game_data: dict) -> str:
+    """Canonical SHA-256 of game_data (key order and whitespace do not matter)"""
+    canonical = json.dumps(game_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Parse an If-Match header carrying a slot version ("3", "\"3\"" or W/"3")"""
+    if if_match is None:
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a save slot version number")
+
+async def record_save_history(save_data: dict, previous_save: Optional[dict]):
+    """Append the new version to the slot's history and trim it to SAVE_HISTORY_VERSIONS"""
+    user_id, game_id, slot_number = save_data["user_id"], save_data["game_id"], save_data["slot_number"]
+    latest = await storage.save_history.latest(user_id, game_id, slot_number)
+    # Diffing is CPU work proportional to the save size; keep it off the event loop
+    entries = await asyncio.to_thread(history_entries, save_data, previous_save, latest, SAVE_SNAPSHOT_INTERVAL)
+    try:
+        await storage.save_history.append(entries)
+    except StorageConflict as e:
+        # The save itself is written; only its history entry is missing
+        print(f"⚠️ Could not record save history: {e}")
+        return
+    if entries[-1]["kind"] == "snapshot":
+        # Older chains only become prunable when a new one starts
+        await storage.save_history.prune(
+            user_id, game_id, slot_number, save_data["version"] - SAVE_HISTORY_VERSIONS + 1
+        )
+
 @app.post("/api/game-states/save")
-async def save_game_state(save_request: SaveGameRequest, user_id: str = "demo-user"):
-    """Save game state to a specific slot"""
+async def save_game_state(save_request: SaveGameRequest, response: Response, user_id: str = "demo-user",
+                          if_match: Optional[str] = Header(None)):
+    """Save game state to a specific slot
+
+    Saves whose content matches what is already stored are acknowledged without
+    a write. Pass If-Match with the slot version last seen (0 for an empty slot)
+    to reject the save if another client has written the slot since.
+    """
     # Validate slot number
     if not 1 <= save_request.slot_number <= 10:
         raise HTTPException(status_code=400, detail="Slot number must be between 1 and 10")
+    if encoded_size(save_request.game_data) > MAX_SAVE_DATA_BYTES:
+        raise HTTPException(status_code=413, detail="Game data is too large")
     
-    # Check if slot already has a save
-    existing_save = await game_states_collection.find_one({
+    slot_filter = {
         "user_id": user_id,
         "game_id": save_request.game_id,
         "slot_number": save_request.slot_number
-    })
+    }
+    # Check if slot already has a save (only the fields needed to compare)
+    existing_save = await storage.saves.get_slot(
+        user_id, save_request.game_id, save_request.slot_number,
+        fields=("id", "version", "content_hash", "score", "name", "saved_at")
+    )
+    current_version = (existing_save.get("version") or 1) if existing_save else 0
+    
+    expected_version = parse_if_match(if_match)
+    if expected_version is not None and expected_version != current_version:
+        raise HTTPException(
+            status_code=412,
+            detail=f"Save slot {save_request.slot_number} is at version {current_version}, not {expected_version}"
+        )
+    
+    name = save_request.name or f"Save Slot {save_request.slot_number}"
+    data_hash = content_hash(save_request.game_data)
+    
+    if (existing_save
+            and existing_save.get("content_hash") == data_hash
+            and existing_save.get("score") == save_request.score
+            and existing_save.get("name") == name):
+        # Identical to what is stored: skip the write entirely
+        save_data = {
+            **slot_filter,
+            **existing_save,
+            "version": current_version,
+            "game_data": save_request.game_data,
+        }
+        response.headers["ETag"] = f'"{current_version}"'
+        return {
+            "message": f"Game in slot {save_request.slot_number} is unchanged",
+            "unchanged": True,
+            "save_data": serialize_doc(save_data)
+        }
     
     save_data = {
-        "id": str(uuid.uuid4()),
+        "id": existing_save["id"] if existing_save else str(uuid.uuid4()),
         "user_id": user_id,
         "game_id": save_request.game_id,
         "slot_number": save_request.slot_number,
         "game_data": save_request.game_data,
         "score": save_request.score,
         "saved_at": datetime.utcnow(),
-        "name": save_request.name or f"Save Slot {save_request.slot_number}"
+        "name": name,
+        "version": current_version + 1,
+        "content_hash": data_hash
     }
     
+    previous_save = None
     if existing_save:
-        # Update existing save
-        await game_states_collection.replace_one(
-            {"_id": existing_save["_id"]}, 
-            save_data
+        # The state being overwritten, which the history delta is computed from
+        previous = await storage.saves.get_slot(
+            user_id, save_request.game_id, save_request.slot_number, fields=("game_data", "version")
         )
+        if previous and previous.get("version") == existing_save.get("version"):
+            previous_save = {**slot_filter, **existing_save, **previous}
+        # Update existing save, but only if nobody wrote it since we read it
+        # (legacy saves without a version match on the missing field)
+        replaced = await storage.saves.replace(save_data, expected_version=existing_save.get("version"))
+        if not replaced:
+            raise HTTPException(status_code=409, detail="Save slot was modified by another client")
         message = f"Game saved to slot {save_request.slot_number} (overwritten)"
     else:
-        # Create new save
-        await game_states_collection.insert_one(save_data)
+        # Create new save; the unique slot index catches a concurrent first save
+        try:
+            await storage.saves.insert(save_data)
+        except StorageConflict:
+            raise HTTPException(status_code=409, detail="Save slot was modified by another client")
         message = f"Game saved to slot {save_request.slot_number}"
     
-    return {"message": message, "save_data": serialize_doc(save_data)}
+    await record_save_history(save_data, previous_save)
+    response.headers["ETag"] = f'"{save_data["version"]}"'
+    return {"message": message, "unchanged": False, "save_data": serialize_doc(save_data)}
 
 @app.get("/api/game-states/{user_id}/{game_id}")
 async def get_user_game_states(user_id: str, game_id: str):
     """Get all saved states for a user and game"""
-    saves = await game_states_collection.find({
-        "user_id": user_id,
-        "game_id": game_id
-    }).sort("slot_number", 1).to_list(10)
+    saves = await storage.saves.list_slots(user_id, game_id)
     
     return {"saves": serialize_doc(saves)}
 
 @app.get("/api/game-states/{user_id}/{game_id}/{slot_number}")
-async def load_game_state(user_id: str, game_id: str, slot_number: int):
+async def load_game_state(user_id: str, game_id: str, slot_number: int, response: Response):
     """Load specific game state"""
     if not 1 <= slot_number <= 10:
         raise HTTPException(status_code=400, detail="Slot number must be between 1 and 10")
     
-    save = await game_states_collection.find_one({
-        "user_id": user_id,
-        "game_id": game_id,
-        "slot_number": slot_number
-    })
+    save = await storage.saves.get_slot(user_id, game_id, slot_number)
     
     if not save:
         raise HTTPException(status_code=404, detail="Save not found")
     
+    response.headers["ETag"] = f'"{save.get("version") or 1}"'
     return serialize_doc(save)
 
-@app.delete("/api/game-states/{user_id}/{game_id}/{slot_number}")
-async def delete_game_state(user_id: str, game_id: str, slot_number: int):
-    """Delete specific game state"""
+@app.get("/api/game-states/{user_id}/{game_id}/{slot_number}/versions")
+async def list_save_versions(user_id: str, game_id: str, slot_number: int):
+    """List the stored versions of a save slot, newest first"""
     if not 1 <= slot_number <= 10:
         raise HTTPException(status_code=400, detail="Slot number must be between 1 and 10")
     
-    result = await game_states_collection.delete_one({
+    versions = await storage.save_history.list_versions(user_id, game_id, slot_number)
+    return {
+        "versions": [
+            {
+                "version": entry["version"],
+                "kind": entry["kind"],
+                "size": entry["size"],
+                "score": entry.get("score"),
+                "name": entry.get("name"),
+                "saved_at": entry.get("saved_at")
+            }
+            for entry in serialize_doc(versions)
+        ]
+    }
+
+async def load_save_version(user_id: str, game_id: str, slot_number: int, version: int) -> dict:
+    """Rebuild one version from its snapshot and the deltas after it"""
+    if not 1 <= slot_number <= 10:
+        raise HTTPException(status_code=400, detail="Slot number must be between 1 and 10")
+    chain = await storage.save_history.chain(user_id, game_id, slot_number, version)
+    if not chain:
+        raise HTTPException(status_code=404, detail=f"Version {version} of save slot {slot_number} not found")
+    return {**chain[-1], "game_data": reconstruct(chain)}
+
+@app.get("/api/game-states/{user_id}/{game_id}/{slot_number}/versions/{version}")
+async def get_save_version(user_id: str, game_id: str, slot_number: int, version: int):
+    """Load an earlier version of a save slot"""
+    entry = await load_save_version(user_id, game_id, slot_number, version)
+    return serialize_doc({
         "user_id": user_id,
         "game_id": game_id,
-        "slot_number": slot_number
+        "slot_number": slot_number,
+        "version": version,
+        "game_data": entry["game_data"],
+        "score": entry.get("score"),
+        "name": entry.get("name"),
+        "saved_at": entry.get("saved_at")
     })
+
+@app.post("/api/game-states/{user_id}/{game_id}/{slot_number}/versions/{version}/restore")
+async def restore_save_version(user_id: str, game_id: str, slot_number: int, version: int, response: Response,
+                               if_match: Optional[str] = Header(None)):
+    """Restore an earlier version; it is saved as a new version, so the restore can be undone too"""
+    entry = await load_save_version(user_id, game_id, slot_number, version)
+    restore_request = SaveGameRequest(
+        game_id=game_id,
+        slot_number=slot_number,
+        game_data=entry["game_data"],
+        score=entry.get("score") or 0,
+        name=entry.get("name")
+    )
+    result = await save_game_state(restore_request, response, user_id=user_id, if_match=if_match)
+    return {**result, "restored_version": version}
+
+@app.delete("/api/game-states/{user_id}/{game_id}/{slot_number}")
+async def delete_game_state(user_id: str, game_id: str, slot_number: int):
+    """Delete specific game state"""
+    if not 1 <= slot_number <= 10:
+        raise HTTPException(status_code=400, detail="Slot number must be between 1 and 10")
     
-    if result.deleted_count == 0:
+    deleted = await storage.saves.delete_slot(user_id, game_id, slot_number)
+    
+    if not deleted:
         raise HTTPException(status_code=404, detail="Save not found")
     
+    # A new save in this slot starts again at version 1
+    await storage.save_history.delete_slot(user_id, game_id, slot_number)
+    
     return {"message": f"Save slot {slot_number} deleted"}
 
 # ==================== SCORE ENDPOINTS ====================
+def score_event_id(payload: dict) -> str:
+    """Id a retried job uses to skip already logged events (derived for jobs spilled before ids existed)"""
+    return payload.get("event_id") or (
+        f"{payload['user_id']}:{payload['game_id']}:{payload['recorded_at'].isoformat()}:{payload['score']}"
+    )
+
+async def record_score_events(payloads: List[dict]):
+    """Background job: append scores to the event log and fold them into the windowed leaderboards
+
+    Safe to retry: events already logged are skipped by event_id, and window
+    scores are only ever raised with $max.
+    """
+    await storage.scores.record_events([
+        {
+            "event_id": score_event_id(payload),
+            "created_at": payload["recorded_at"],
+            "game_id": payload["game_id"],
+            "user_id": payload["user_id"],
+            "score": payload["score"]
+        }
+        for payload in payloads
+    ])
+    
+    # Collapse the batch to one upsert per user per window bucket
+    best = {}
+    for payload in payloads:
+        for window, (bucket, ends_at) in window_buckets(payload["recorded_at"]).items():
+            key = (payload["game_id"], window, bucket, payload["user_id"])
+            if key not in best or payload["score"] > best[key]["score"]:
+                best[key] = {
+                    "score": payload["score"],
+                    "username": payload["username"],
+                    "expires_at": ends_at + WINDOW_GRACE
+                }
+    if await storage.scores.raise_window_scores(best):
+        game_ids = {game_id for game_id, _, _, _ in best}
+        await invalidate_cache(*(f"leaderboard:{game_id}:{window}" for game_id in game_ids for window in WINDOWS))
+
+job_queue.register("score_event", record_score_events)
+
 @app.post("/api/scores/update")
 async def update_high_score(game_id: str, score: int, user_id: str = "demo-user"):
     """Update user's high score for a game"""
-    user = await users_collection.find_one({"id": user_id})
-    if not user:
+    if REQUIRE_VERIFIED_SCORES and game_id in REPLAY_GAMES:
+        raise HTTPException(status_code=403, detail="Scores for this game must be submitted with a replay")
+    return await record_score(game_id, score, user_id)
+
+@app.post("/api/scores/replay-seed")
+async def issue_replay_seed(game_id: str, user_id: str = "demo-user"):
+    """Start a verifiable Snake or Tetris game: a single-use seed for its replay"""
+    if game_id not in REPLAY_GAMES:
+        raise HTTPException(status_code=400, detail="Replays are only supported for Snake and Tetris")
+    now = datetime.utcnow()
+    seed = {
+        "user_id": user_id,
+        "game_id": game_id,
+        "seed": secrets.randbelow(2 ** 32),
+        "issued_at": now,
+        "expires_at": now + timedelta(seconds=REPLAY_SEED_TTL_SECONDS)
+    }
+    await storage.replay_seeds.issue(seed)
+    return {"game_id": game_id, "seed": seed["seed"], "expires_at": seed["expires_at"]}
+
+@app.post("/api/scores/verified")
+async def submit_verified_score(submission: VerifiedScoreRequest, user_id: str = "demo-user"):
+    """Submit a Snake or Tetris score with its replay; it is re-simulated before being accepted"""
+    if len(submission.inputs) > MAX_REPLAY_INPUT_LENGTH:
+        raise HTTPException(status_code=413, detail="Replay is too long")
+    # Consumed before simulating, so every attempt (even a malformed one) burns its seed
+    now = datetime.utcnow()
+    issued = await storage.replay_seeds.consume(user_id, submission.game_id, submission.seed, now)
+    if issued is None:
+        raise HTTPException(status_code=403, detail="Replay seed was not issued for this game, expired or was already used")
+    # A replay cannot hold more game time than has passed since its seed was issued
+    played_seconds = submission.ticks * REPLAY_GAMES[submission.game_id].TICK_SECONDS
+    if played_seconds > (now - issued["issued_at"]).total_seconds():
+        raise HTTPException(status_code=422, detail="Replay is longer than the time since its seed was issued")
+    simulated = await replay_verifier.verify(
+        submission.game_id, submission.seed, submission.inputs, submission.ticks
+    )
+    if simulated is None:
+        raise HTTPException(status_code=400, detail="Malformed replay")
+    if simulated != submission.score:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Replay reaches a score of {simulated}, not {submission.score}"
+        )
+    return {**await record_score(submission.game_id, simulated, user_id), "verified": True}
+
+async def record_score(game_id: str, score: int, user_id: str):
+    """Record an accepted score and raise the user's high score if it was beaten"""
+    recorded_at = datetime.utcnow()
+    # Raises the stored high score if beaten and returns the previous one
+    user = await storage.users.raise_high_score(
+        user_id, game_id, score,
         # Create demo user if doesn't exist
-        demo_user = {
-            "id": user_id,
+        defaults={
             "username": "Demo Player",
-            "email": "demo@nokia.com",
+            # Emails are unique, so each implicitly created player gets its own
+            "email": f"{user_id}@demo.nokia.com",
             "password_hash": "demo",
             "is_admin": False,
-            "created_at": datetime.utcnow(),
-            "high_scores": {}
+            "created_at": recorded_at
         }
-        await users_collection.insert_one(demo_user)
-        user = demo_user
+    )
+    username = user.get("username") if user else "Demo Player"
+    current_high = (user or {}).get("high_scores", {}).get(game_id, 0)
+    
+    # Event log and windowed leaderboards are updated off the request path
+    await job_queue.enqueue("score_event", {
+        "event_id": str(uuid.uuid4()),  # Lets a retried job skip events it already logged
+        "game_id": game_id,
+        "user_id": user_id,
+        "username": username,
+        "score": score,
+        "recorded_at": recorded_at
+    })
     
-    # Update high score if new score is higher
-    current_high = user.get("high_scores", {}).get(game_id, 0)
     if score > current_high:
-        await users_collection.update_one(
-            {"id": user_id},
-            {"$set": {f"high_scores.{game_id}": score}}
-        )
+        # Updates the rank index and evicts cached leaderboards on every worker
+        await invalidation_bus.publish({
+            "type": "score",
+            "game_id": game_id,
+            "user_id": user_id,
+            "username": username,
+            "score": score
+        })
         return {"message": "New high score!", "score": score, "previous_high": current_high}
     
     return {"message": "Score recorded", "score": score, "high_score": current_high}
 
+def encode_leaderboard_cursor(score: int, user_id: str) -> str:
+    """Opaque keyset cursor for the last (score, user_id) on a page"""
+    raw = json.dumps([score, user_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_leaderboard_cursor(cursor: str):
+    try:
+        score, user_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(score, int) or not isinstance(user_id, str):
+            raise ValueError(cursor)
+        return score, user_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid leaderboard cursor")
+
 @app.get("/api/scores/leaderboard/{game_id}")
-async def get_leaderboard(game_id: str, limit: int = 10):
-    """Get leaderboard for a specific game"""
-    # Aggregate users with high scores for the game
-    pipeline = [
-        {"$match": {f"high_scores.{game_id}": {"$exists": True}}},
-        {"$project": {
-            "username": 1,
-            "score": f"$high_scores.{game_id}"
-        }},
-        {"$sort": {"score": -1}},
-        {"$limit": limit}
-    ]
+async def get_leaderboard(game_id: str, limit: int = 10, window: str = "all", cursor: Optional[str] = None):
+    """Get leaderboard for a specific game
+
+    window is "all" (all-time high scores) or one of daily/weekly/monthly, which
+    are served from the precomputed per-window best scores for the current period.
+    Pages hold at most MAX_LEADERBOARD_PAGE entries; pass next_cursor back as
+    cursor to fetch the following page.
+    """
+    limit = max(1, min(limit, MAX_LEADERBOARD_PAGE))
+    if window != "all":
+        return await get_window_leaderboard(game_id, window, limit, cursor)
+
+    # Only first pages are cached; deep pages are cheap keyset reads anyway
+    if cursor is None:
+        cached = response_cache.get(f"leaderboard:{game_id}", str(limit))
+        if cached is not MISS:
+            return cached
+
+    after = decode_leaderboard_cursor(cursor) if cursor else None
+    leaderboard = await storage.users.high_score_page(game_id, limit, after)
+    response = {"leaderboard": leaderboard, "next_cursor": next_leaderboard_cursor(leaderboard, limit)}
+    if cursor is None:
+        response_cache.set(f"leaderboard:{game_id}", str(limit), response)
+    return response
+
+def next_leaderboard_cursor(leaderboard: List[dict], limit: int) -> Optional[str]:
+    if len(leaderboard) < limit:
+        return None
+    last = leaderboard[-1]
+    return encode_leaderboard_cursor(last["score"], last["user_id"])
+
+async def get_window_leaderboard(game_id: str, window: str, limit: int, cursor: Optional[str] = None):
+    """Top scores of the current daily/weekly/monthly window"""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of: all, {', '.join(WINDOWS)}")
+    
+    bucket = window_bucket(window, datetime.utcnow())
+    cache_key = f"{bucket}:{limit}"
+    if cursor is None:
+        cached = response_cache.get(f"leaderboard:{game_id}:{window}", cache_key)
+        if cached is not MISS:
+            return cached
+    
+    after = decode_leaderboard_cursor(cursor) if cursor else None
+    leaderboard = await storage.scores.window_page(game_id, window, bucket, limit, after)
+    response = {
+        "leaderboard": leaderboard,
+        "window": window,
+        "bucket": bucket,
+        "next_cursor": next_leaderboard_cursor(leaderboard, limit)
+    }
+    if cursor is None:
+        response_cache.set(f"leaderboard:{game_id}:{window}", cache_key, response)
+    return response
+
+@app.get("/api/scores/rank/{game_id}/{user_id}")
+async def get_player_rank(game_id: str, user_id: str, neighbours: int = 1):
+    """Get a player's rank for a game with the players just above and below"""
+    neighbours = max(0, min(neighbours, 10))
+    result = rank_index.rank(game_id, user_id, neighbours)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No score recorded for this player")
+    return {"game_id": game_id, **result}
+
+async def update_leaderboard_subscriptions(subscriber, subscribe, unsubscribe):
+    """Apply one subscription request; unknown games and requests over the limit are refused"""
+    for action, game_ids in (("subscribe", subscribe), ("unsubscribe", unsubscribe)):
+        if game_ids is None:
+            continue
+        if not isinstance(game_ids, list) or not all(isinstance(game_id, str) for game_id in game_ids):
+            leaderboard_hub.reject(subscriber, f"{action} must be a list of game ids")
+            continue
+        if len(game_ids) > leaderboard_hub.max_games:
+            leaderboard_hub.reject(subscriber, f"At most {leaderboard_hub.max_games} games per request")
+            continue
+        for game_id in game_ids:
+            if action == "unsubscribe":
+                leaderboard_hub.unsubscribe(subscriber, game_id)
+                continue
+            try:
+                await get_game(game_id)  # Served from the response cache
+            except HTTPException:
+                leaderboard_hub.reject(subscriber, f"Unknown game: {game_id}")
+                continue
+            if not leaderboard_hub.subscribe(subscriber, game_id):
+                leaderboard_hub.reject(subscriber, f"At most {leaderboard_hub.max_games} subscriptions per connection")
+
+@app.websocket("/api/ws/leaderboard")
+async def leaderboard_socket(websocket: WebSocket, games: Optional[str] = None):
+    """Live top-K leaderboards
+
+    Subscribe with ?games=snake-game,tetris-game or by sending
+    {"subscribe": [...]} / {"unsubscribe": [...]}. Each subscription starts
+    with a "snapshot" message followed by "delta" messages listing changed
+    entries and user_ids that dropped off the board. Refused requests
+    (unknown games, too many subscriptions) get an "error" message.
+    """
+    await websocket.accept()
+    subscriber = leaderboard_hub.connect(websocket)
+    try:
+        if games:
+            await update_leaderboard_subscriptions(subscriber, list(filter(None, games.split(","))), None)
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            await update_leaderboard_subscriptions(subscriber, message.get("subscribe"), message.get("unsubscribe"))
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        leaderboard_hub.disconnect(subscriber)
+        await subscriber.close()
+
+# ==================== MULTIPLAYER ENDPOINTS ====================
+@app.websocket("/api/ws/pong")
+async def pong_socket(websocket: WebSocket, user_id: str = "demo-user"):
+    """Head-to-head Pong match
+
+    The server pairs the next two players on this worker and runs the match,
+    so all players must reach the same process: workers started with
+    PONG_ENABLED=0 close the socket with 1013 (try again later).
+    JSON text messages report waiting/matched/finished, or full before the
+    socket is closed with 1013 when every room is in use; binary messages are
+    state snapshots (see pong_match.encode_snapshot). Clients send 3-byte
+    binary inputs: uint16 sequence number, int8 paddle direction.
+    """
+    await websocket.accept()
+    if not PONG_ENABLED:
+        await websocket.close(code=1013, reason="Pong is served by the dedicated match process")
+        return
+
+    async def sink(message):
+        if isinstance(message, bytes):
+            await websocket.send_bytes(message)
+        else:
+            await websocket.send_text(message)
+
+    async def close(code):
+        await websocket.close(code=code, reason="Every Pong room is in use")
+
+    player = PongPlayer(sink, user_id=user_id, closer=close)
+    pong_matchmaker.join(player)
+    try:
+        while True:
+            seq, direction = INPUT_MESSAGE.unpack(await websocket.receive_bytes())
+            player.push_input(seq, direction)
+    except (WebSocketDisconnect, struct.error, KeyError):
+        pass
+    finally:
+        pong_matchmaker.leave(player)
+
+@app.get("/api/multiplayer/pong/stats")
+async def get_pong_stats():
+    """Room count, tick jitter and tick cost of this worker's match scheduler"""
+    return pong_scheduler.stats()
+
+# ==================== TELEMETRY ENDPOINTS ====================
+@app.get("/api/telemetry/layout")
+async def get_telemetry_layout():
+    """Histogram bucket bounds clients must bucket their samples with"""
+    return {
+        "version": LAYOUT_VERSION,
+        "window_seconds": telemetry.window_seconds,
+        "metrics": {metric: list(bounds) for metric, bounds in METRIC_BOUNDS.items()}
+    }
+
+def read_telemetry_body(body: bytes, encoding: Optional[str]) -> dict:
+    """Decode a (possibly gzip/deflate compressed) JSON batch within the size limits"""
+    encoding = (encoding or "identity").lower()
+    if encoding in ("gzip", "deflate"):
+        # wbits 16+ expects a gzip header, 15 a zlib one; max_length guards against zip bombs
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_TELEMETRY_DECOMPRESSED)
+        except zlib.error:
+            raise HTTPException(status_code=400, detail="Invalid compressed body")
+        if decompressor.unconsumed_tail:
+            raise HTTPException(status_code=413, detail="Telemetry batch is too large")
+    elif encoding != "identity":
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    try:
+        batch = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Telemetry batch must be JSON")
+    if not isinstance(batch, dict):
+        raise HTTPException(status_code=400, detail="Telemetry batch must be a JSON object")
+    return batch
+
+@app.post("/api/telemetry", status_code=202)
+async def ingest_telemetry(request: Request):
+    """Accept a batch of client performance histograms
+
+    Body: {"layout": 1, "game_id": "snake-game", "metrics": {"frame_ms":
+    {"counts": [...], "sum": 1234.5}, ...}}, optionally gzip-compressed.
+    Counts follow the bucket bounds from /api/telemetry/layout.
+    """
+    body = await request.body()
+    if len(body) > MAX_TELEMETRY_BODY:
+        raise HTTPException(status_code=413, detail="Telemetry batch is too large")
+    batch = read_telemetry_body(body, request.headers.get("content-encoding"))
+    
+    if batch.get("layout") != LAYOUT_VERSION:
+        raise HTTPException(status_code=409, detail=f"Histogram layout {LAYOUT_VERSION} required")
+    game_id = batch.get("game_id")
+    metrics = batch.get("metrics")
+    if not isinstance(game_id, str) or not isinstance(metrics, dict):
+        raise HTTPException(status_code=400, detail="game_id and metrics are required")
+    await get_game(game_id)  # 404 for unknown games, served from the response cache
     
-    leaderboard = await users_collection.aggregate(pipeline).to_list(limit)
-    return {"leaderboard": serialize_doc(leaderboard)}
+    try:
+        samples = telemetry.ingest(game_id, metrics, datetime.utcnow())
+    except TelemetryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"accepted": samples}
 
 # ==================== ADMIN ENDPOINTS ====================
 @app.get("/api/admin/users")
 async def get_all_users():
     """Get all users (admin only)"""
-    users = await users_collection.find({}).to_list(100)
+    users = await storage.users.list(100)
     # Remove passwords from response
     users = serialize_doc(users)
     for user in users:
@@ -365,9 +1022,9 @@ async def get_all_users():
 @app.get("/api/admin/stats")
 async def get_platform_stats():
     """Get platform statistics (admin only)"""
-    total_users = await users_collection.count_documents({})
-    total_games = await games_collection.count_documents({"is_active": True})
-    total_saves = await game_states_collection.count_documents({})
+    total_users = await storage.users.count()
+    total_games = await storage.games.count_active()
+    total_saves = await storage.saves.count()
     
     return {
         "total_users": total_users,
@@ -376,5 +1033,63 @@ async def get_platform_stats():
         "platform_name": "Nokia Games Platform"
     }
 
+@app.get("/api/admin/analytics/scores")
+async def get_score_analytics(game_id: Optional[str] = None, days: int = 30, bins: int = 20):
+    """Score distribution, percentiles and daily activity from the daily score tallies (admin only)"""
+    days = max(1, min(days, SCORE_EVENT_RETENTION_SECONDS // 86400))
+    bins = max(1, min(bins, 200))
+    
+    # Results are shared by everyone asking within the same time bucket
+    now = datetime.utcnow()
+    time_bucket = int(now.timestamp()) // ANALYTICS_BUCKET_SECONDS
+    cache_key = f"{game_id}:{days}:{bins}:{time_bucket}"
+    cached = response_cache.get("analytics", cache_key)
+    if cached is not MISS:
+        return cached
+    
+    # Whole days: the first one is included from midnight
+    since = now - timedelta(days=days)
+    tallies = await storage.scores.daily_score_counts(since, game_id)
+    day_numbers, scores, counts = count_arrays(tallies)
+    summary = await asyncio.to_thread(summarize_score_counts, day_numbers, scores, counts, bins)
+    
+    response = {"game_id": game_id, "days": days, "generated_at": now, **summary}
+    response_cache.set("analytics", cache_key, response, ttl=ANALYTICS_BUCKET_SECONDS)
+    return response
+
+@app.get("/api/admin/telemetry")
+async def get_telemetry(metric: str = "frame_ms", game_id: Optional[str] = None, hours: int = 24):
+    """Client performance histograms per time window plus the merged distribution (admin only)"""
+    if metric not in METRIC_BOUNDS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(METRIC_BOUNDS)}")
+    hours = max(1, min(hours, TELEMETRY_RETENTION_SECONDS // 3600))
+    since = datetime.utcnow() - timedelta(hours=hours)
+    documents = await storage.telemetry.histograms(game_id, metric, since)
+    
+    # Without a game_id every game's histogram for a window is merged into one
+    by_window = {}
+    for document in documents:
+        by_window.setdefault(document["window_start"], []).append(document)
+    windows = []
+    for window_start, window_documents in sorted(by_window.items()):
+        summary = merge_stored(metric, window_documents)
+        windows.append({
+            "window_start": window_start,
+            "samples": summary["samples"],
+            "mean": summary["mean"],
+            "p50": summary["p50"],
+            "p95": summary["p95"],
+            "p99": summary["p99"]
+        })
+    
+    return {
+        "metric": metric,
+        "game_id": game_id,
+        "hours": hours,
+        "windows": windows,
+        "overall": merge_stored(metric, documents)
+    }
+
 if __name__ == "__main__":
+    # Single-process development server; see serve.py for the multi-worker entry point
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
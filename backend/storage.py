@@ -0,0 +1,405 @@
+"""Storage repositories for users, games, save slots, save history, scores and telemetry.
+
+Handlers talk to these instead of Motor collections, so the same code runs
+against MongoDB (mongo_storage.py) or the in-memory store below. The memory
+store mirrors the MongoDB semantics the handlers rely on: unique save slots,
+version-conditional replaces, $max score updates, and (score desc, id asc)
+keyset ordering. Documents are copied on the way in and out, like a BSON
+round trip. TTL expiry is not emulated.
+"""
+import copy
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+
+# (score, id) of the last entry on the previous page
+PageAfter = Optional[Tuple[int, str]]
+# (game_id, window, bucket, user_id) -> {"score", "username", "expires_at"}
+WindowBests = Dict[Tuple[str, str, str, str], dict]
+# (game_id, day at midnight) -> {score: number of logged events with that score}
+DayCounts = Dict[Tuple[str, datetime], Dict[int, int]]
+
+
+class StorageConflict(Exception):
+    """A write lost a race: unique key taken or version changed"""
+
+
+def _project(doc: dict, fields: Optional[Sequence[str]]) -> dict:
+    if fields is None:
+        return copy.deepcopy(doc)
+    return {field: copy.deepcopy(doc[field]) for field in fields if field in doc}
+
+
+def day_score_counts(events: List[dict]) -> DayCounts:
+    """Tally score events per game and day, for the analytics rollups"""
+    tallies: DayCounts = {}
+    for event in events:
+        day = event["created_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+        counts = tallies.setdefault((event["game_id"], day), {})
+        counts[event["score"]] = counts.get(event["score"], 0) + 1
+    return tallies
+
+
+def _keyset(entries: List[dict], score_field: str, id_field: str, limit: int, after: PageAfter) -> List[dict]:
+    """Sort by score desc, id asc and return the page that starts strictly after `after`"""
+    entries.sort(key=lambda entry: (-entry[score_field], entry[id_field]))
+    if after is not None:
+        last_score, last_id = after
+        entries = [
+            entry for entry in entries
+            if entry[score_field] < last_score or (entry[score_field] == last_score and entry[id_field] > last_id)
+        ]
+    return entries[:limit]
+
+
+class MemoryUserRepository:
+    def __init__(self):
+        self._users: Dict[str, dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def ensure_leaderboard_index(self, game_id: str):
+        pass
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        user = self._users.get(user_id)
+        return copy.deepcopy(user) if user else None
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        for user in self._users.values():
+            if user.get("email") == email:
+                return copy.deepcopy(user)
+        return None
+
+    def _check_email(self, email: Optional[str]):
+        # Unique like the MongoDB index; users without an email are exempt
+        if email is not None and any(user.get("email") == email for user in self._users.values()):
+            raise StorageConflict(f"Email {email} is already registered")
+
+    async def insert(self, user: dict):
+        if user["id"] in self._users:
+            raise StorageConflict(f"User {user['id']} already exists")
+        self._check_email(user.get("email"))
+        self._users[user["id"]] = copy.deepcopy(user)
+
+    async def list(self, limit: int) -> List[dict]:
+        return [copy.deepcopy(user) for user in list(self._users.values())[:limit]]
+
+    async def count(self) -> int:
+        return len(self._users)
+
+    async def raise_high_score(self, user_id: str, game_id: str, score: int, defaults: dict) -> Optional[dict]:
+        """Upsert the user and raise their high score; returns username and the previous high score"""
+        user = self._users.get(user_id)
+        previous = None
+        if user is None:
+            self._check_email(defaults.get("email"))
+            user = self._users[user_id] = {"id": user_id, **copy.deepcopy(defaults)}
+        else:
+            previous = {"username": user.get("username")}
+            if game_id in user.get("high_scores", {}):
+                previous["high_scores"] = {game_id: user["high_scores"][game_id]}
+        if score > 0:
+            high_scores = user.setdefault("high_scores", {})
+            if game_id not in high_scores or score > high_scores[game_id]:
+                high_scores[game_id] = score
+        return previous
+
+    async def high_score_page(self, game_id: str, limit: int, after: PageAfter = None) -> List[dict]:
+        """All-time leaderboard page: user_id, username and score"""
+        entries = [
+            {"user_id": user["id"], "username": user.get("username"), "score": user["high_scores"][game_id]}
+            for user in self._users.values()
+            if game_id in user.get("high_scores", {})
+        ]
+        return _keyset(entries, "score", "user_id", limit, after)
+
+    async def iter_high_scores(self) -> AsyncIterator[Tuple[str, Optional[str], dict]]:
+        for user in list(self._users.values()):
+            yield user["id"], user.get("username"), dict(user.get("high_scores") or {})
+
+
+class MemoryGameRepository:
+    def __init__(self):
+        self._games: Dict[str, dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, game_id: str) -> Optional[dict]:
+        game = self._games.get(game_id)
+        return copy.deepcopy(game) if game else None
+
+    async def insert(self, game: dict):
+        if game["id"] in self._games:
+            raise StorageConflict(f"Game {game['id']} already exists")
+        self._games[game["id"]] = copy.deepcopy(game)
+
+    async def list_active(self, limit: int) -> List[dict]:
+        return [copy.deepcopy(game) for game in self._games.values() if game.get("is_active")][:limit]
+
+    async def count_active(self) -> int:
+        return sum(1 for game in self._games.values() if game.get("is_active"))
+
+
+class MemorySaveRepository:
+    """Save slots, unique per (user_id, game_id, slot_number)"""
+
+    def __init__(self):
+        self._saves: Dict[Tuple[str, str, int], dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get_slot(self, user_id: str, game_id: str, slot_number: int,
+                       fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        save = self._saves.get((user_id, game_id, slot_number))
+        return _project(save, fields) if save else None
+
+    async def list_slots(self, user_id: str, game_id: str) -> List[dict]:
+        return [
+            copy.deepcopy(save)
+            for (save_user, save_game, _), save in sorted(self._saves.items(), key=lambda item: item[0][2])
+            if save_user == user_id and save_game == game_id
+        ]
+
+    async def insert(self, save: dict):
+        """Create a slot; StorageConflict if it already exists"""
+        key = (save["user_id"], save["game_id"], save["slot_number"])
+        if key in self._saves:
+            raise StorageConflict("Save slot already exists")
+        self._saves[key] = copy.deepcopy(save)
+
+    async def replace(self, save: dict, expected_version: Optional[int]) -> bool:
+        """Overwrite a slot only if it is still at expected_version (None matches unversioned saves)"""
+        key = (save["user_id"], save["game_id"], save["slot_number"])
+        current = self._saves.get(key)
+        if current is None or current.get("version") != expected_version:
+            return False
+        self._saves[key] = copy.deepcopy(save)
+        return True
+
+    async def delete_slot(self, user_id: str, game_id: str, slot_number: int) -> bool:
+        return self._saves.pop((user_id, game_id, slot_number), None) is not None
+
+    async def count(self) -> int:
+        return len(self._saves)
+
+
+class MemorySaveHistoryRepository:
+    """Snapshot and delta entries of every save slot version (see save_history.py)"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str, int], Dict[int, dict]] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def append(self, entries: List[dict]):
+        """Add entries; StorageConflict if a version is already recorded"""
+        for entry in entries:
+            versions = self._entries.setdefault((entry["user_id"], entry["game_id"], entry["slot_number"]), {})
+            if entry["version"] in versions:
+                raise StorageConflict(f"Save version {entry['version']} is already recorded")
+            versions[entry["version"]] = copy.deepcopy(entry)
+
+    async def latest(self, user_id: str, game_id: str, slot_number: int) -> Optional[dict]:
+        """Version and base_version of the newest entry"""
+        versions = self._entries.get((user_id, game_id, slot_number))
+        if not versions:
+            return None
+        return _project(versions[max(versions)], ("version", "base_version"))
+
+    async def list_versions(self, user_id: str, game_id: str, slot_number: int) -> List[dict]:
+        """Entries without their data, newest first"""
+        versions = self._entries.get((user_id, game_id, slot_number), {})
+        return [
+            {field: copy.deepcopy(value) for field, value in versions[version].items() if field != "data"}
+            for version in sorted(versions, reverse=True)
+        ]
+
+    async def chain(self, user_id: str, game_id: str, slot_number: int, version: int) -> List[dict]:
+        """The snapshot a version is built from and every entry up to the version, oldest first"""
+        versions = self._entries.get((user_id, game_id, slot_number), {})
+        entry = versions.get(version)
+        if entry is None:
+            return []
+        return [
+            copy.deepcopy(versions[number])
+            for number in range(entry["base_version"], version + 1) if number in versions
+        ]
+
+    async def prune(self, user_id: str, game_id: str, slot_number: int, oldest_kept: int) -> int:
+        """Drop entries older than oldest_kept, except those it is rebuilt from"""
+        versions = self._entries.get((user_id, game_id, slot_number), {})
+        entry = versions.get(oldest_kept)
+        floor = entry["base_version"] if entry else oldest_kept
+        stale = [number for number in versions if number < floor]
+        for number in stale:
+            del versions[number]
+        return len(stale)
+
+    async def delete_slot(self, user_id: str, game_id: str, slot_number: int) -> int:
+        return len(self._entries.pop((user_id, game_id, slot_number), {}))
+
+
+class MemoryScoreRepository:
+    """Score event log and per-window best scores"""
+
+    def __init__(self):
+        self._events: List[Tuple[datetime, str, str, int]] = []
+        self._event_ids = set()
+        self._window_scores: WindowBests = {}
+        self._day_counts: DayCounts = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def record_events(self, events: List[dict]):
+        """Append {"event_id", "created_at", "game_id", "user_id", "score"} events not already logged"""
+        logged = []
+        for event in events:
+            if event["event_id"] in self._event_ids:
+                continue
+            self._event_ids.add(event["event_id"])
+            self._events.append((event["created_at"], event["game_id"], event["user_id"], event["score"]))
+            logged.append(event)
+        for key, counts in day_score_counts(logged).items():
+            day_counts = self._day_counts.setdefault(key, {})
+            for score, count in counts.items():
+                day_counts[score] = day_counts.get(score, 0) + count
+
+    async def raise_window_scores(self, bests: WindowBests) -> bool:
+        """$max each window entry; True if any leaderboard changed"""
+        changed = False
+        for key, entry in bests.items():
+            current = self._window_scores.get(key)
+            if current is None:
+                self._window_scores[key] = dict(entry)
+                changed = True
+            elif entry["score"] > current["score"]:
+                current["score"] = entry["score"]
+                changed = True
+        return changed
+
+    async def window_page(self, game_id: str, window: str, bucket: str, limit: int,
+                          after: PageAfter = None) -> List[dict]:
+        entries = [
+            {"user_id": user_id, "username": entry["username"], "score": entry["score"]}
+            for (entry_game, entry_window, entry_bucket, user_id), entry in self._window_scores.items()
+            if (entry_game, entry_window, entry_bucket) == (game_id, window, bucket)
+        ]
+        return _keyset(entries, "score", "user_id", limit, after)
+
+    async def daily_score_counts(self, since: datetime, game_id: Optional[str] = None) -> DayCounts:
+        """Per-day score tallies from the day of `since` on, for one game or all of them"""
+        first_day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            (entry_game, day): dict(counts)
+            for (entry_game, day), counts in self._day_counts.items()
+            if day >= first_day and (game_id is None or entry_game == game_id)
+        }
+
+
+class MemoryTelemetryRepository:
+    """Flushed client performance histograms (see telemetry.py)"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str, datetime], dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def add_histograms(self, documents: List[dict]):
+        """Add sparse bucket counts and sums into the stored histogram for each window"""
+        for document in documents:
+            key = (document["game_id"], document["metric"], document["window_start"])
+            stored = self._histograms.get(key)
+            if stored is None:
+                stored = self._histograms[key] = {
+                    "game_id": document["game_id"],
+                    "metric": document["metric"],
+                    "window_start": document["window_start"],
+                    "window_seconds": document["window_seconds"],
+                    "counts": {},
+                    "sum": 0.0,
+                }
+            for index, count in document["counts"].items():
+                stored["counts"][index] = stored["counts"].get(index, 0) + count
+            stored["sum"] += document["sum"]
+
+    async def histograms(self, game_id: Optional[str], metric: str, since: datetime) -> List[dict]:
+        return [
+            copy.deepcopy(stored)
+            for (stored_game, stored_metric, window_start), stored in sorted(
+                self._histograms.items(), key=lambda item: item[0][2]
+            )
+            if stored_metric == metric and window_start >= since and (game_id is None or stored_game == game_id)
+        ]
+
+
+class MemoryReplaySeedRepository:
+    """Single-use seeds handed out for verified games"""
+
+    def __init__(self):
+        self._seeds: Dict[Tuple[str, str, int], dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def issue(self, seed: dict):
+        self._seeds[(seed["user_id"], seed["game_id"], seed["seed"])] = dict(seed)
+
+    async def consume(self, user_id: str, game_id: str, seed: int, now: datetime) -> Optional[dict]:
+        """Remove and return the issued seed; None if it was never issued, already used or expired"""
+        issued = self._seeds.pop((user_id, game_id, seed), None)
+        return issued if issued is not None and issued["expires_at"] > now else None
+
+
+class MemoryJobSpill:
+    """Stand-in for the pending_jobs collection: the insert_many/find_one_and_delete JobQueue uses"""
+
+    def __init__(self):
+        self._docs: List[dict] = []
+        self._next_id = 0
+
+    async def insert_many(self, docs: List[dict]):
+        for doc in docs:
+            self._docs.append({"_id": self._next_id, **copy.deepcopy(doc)})
+            self._next_id += 1
+
+    async def find_one_and_delete(self, query: dict) -> Optional[dict]:
+        return self._docs.pop(0) if self._docs else None
+
+
+class Storage:
+    """The repositories one process works with"""
+
+    def __init__(self, users, games, saves, save_history, scores, telemetry, replay_seeds, pending_jobs):
+        self.users = users
+        self.games = games
+        self.saves = saves
+        self.save_history = save_history
+        self.scores = scores
+        self.telemetry = telemetry
+        self.replay_seeds = replay_seeds
+        self.pending_jobs = pending_jobs  # Spill collection for the background job queue
+
+    async def ensure_indexes(self):
+        for repository in (self.users, self.games, self.saves, self.save_history, self.scores, self.telemetry,
+                           self.replay_seeds):
+            await repository.ensure_indexes()
+
+
+def create_memory_storage() -> Storage:
+    return Storage(
+        MemoryUserRepository(),
+        MemoryGameRepository(),
+        MemorySaveRepository(),
+        MemorySaveHistoryRepository(),
+        MemoryScoreRepository(),
+        MemoryTelemetryRepository(),
+        MemoryReplaySeedRepository(),
+        MemoryJobSpill(),
+    )
@@ -0,0 +1,174 @@
+"""Client performance telemetry folded into fixed-bucket histograms.
+
+Clients bucket their own samples with the shared layout below and send one
+batch of per-metric bucket counts every few seconds, so ingesting a batch
+costs O(buckets) however many samples it summarizes. Batches are merged in
+memory per (game, metric, time window) and flushed periodically; the flush
+adds counts into stored documents, so every worker can flush the same
+window without coordination.
+"""
+import asyncio
+import math
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Bump when bucket bounds change; batches built for another layout are rejected
+LAYOUT_VERSION = 1
+# Upper bucket bounds in milliseconds; each histogram has one extra overflow bucket
+METRIC_BOUNDS: Dict[str, Tuple[float, ...]] = {
+    "frame_ms": (4, 8, 12, 16, 17, 20, 25, 33, 50, 67, 100, 150, 250, 500, 1000),
+    "input_latency_ms": (8, 16, 24, 33, 50, 67, 83, 100, 150, 200, 300, 500, 1000),
+}
+# Most samples one histogram in a batch may claim (a minute of 240 Hz frames, with slack)
+MAX_BATCH_SAMPLES = 100_000
+
+HistogramKey = Tuple[str, str, datetime]  # (game_id, metric, window_start)
+FlushHandler = Callable[[List[dict]], Awaitable[None]]
+
+
+class TelemetryError(ValueError):
+    """Batch does not match the histogram layout"""
+
+
+class Histogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.total = 0.0  # Sum of sample values, for the mean
+
+    def merge(self, counts: List[int], total: float):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.total += total
+
+
+def validate_metric(metric: str, payload) -> Tuple[List[int], float]:
+    """Check one metric of a batch: {"counts": [...], "sum": ms}"""
+    bounds = METRIC_BOUNDS.get(metric)
+    if bounds is None:
+        raise TelemetryError(f"Unknown metric: {metric}")
+    if not isinstance(payload, dict):
+        raise TelemetryError(f"{metric} must be an object with counts and sum")
+    counts = payload.get("counts")
+    if (not isinstance(counts, list) or len(counts) != len(bounds) + 1
+            or not all(type(count) is int and count >= 0 for count in counts)):
+        raise TelemetryError(f"{metric}.counts must be {len(bounds) + 1} non-negative integers")
+    if sum(counts) > MAX_BATCH_SAMPLES:
+        raise TelemetryError(f"{metric} has more than {MAX_BATCH_SAMPLES} samples")
+    total = payload.get("sum", 0)
+    # NaN and Infinity parse from JSON but would poison every stored sum they are added to
+    if type(total) not in (int, float) or not math.isfinite(total) or total < 0:
+        raise TelemetryError(f"{metric}.sum must be a finite non-negative number")
+    return counts, float(total)
+
+
+def percentile_bound(counts: List[int], bounds: Tuple[float, ...], fraction: float) -> Optional[float]:
+    """Upper bound of the bucket holding the given percentile (None if it is the overflow bucket)"""
+    total = sum(counts)
+    if not total:
+        return None
+    target = fraction * total
+    running = 0
+    for index, count in enumerate(counts):
+        running += count
+        if running >= target:
+            return bounds[index] if index < len(bounds) else None
+    return None
+
+
+def summarize_histogram(metric: str, counts: List[int], total: float) -> dict:
+    bounds = METRIC_BOUNDS[metric]
+    samples = sum(counts)
+    return {
+        "bounds": list(bounds),
+        "counts": counts,
+        "samples": samples,
+        "mean": total / samples if samples else None,
+        "p50": percentile_bound(counts, bounds, 0.50),
+        "p95": percentile_bound(counts, bounds, 0.95),
+        "p99": percentile_bound(counts, bounds, 0.99),
+    }
+
+
+class TelemetryAggregator:
+    """In-memory histograms per game, metric and window, flushed every flush_interval seconds"""
+
+    def __init__(self, flush: FlushHandler, window_seconds: int = 60, flush_interval: float = 10.0):
+        self.flush_handler = flush
+        self.window_seconds = window_seconds
+        self.flush_interval = flush_interval
+        self._histograms: Dict[HistogramKey, Histogram] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def window_start(self, when: datetime) -> datetime:
+        epoch = datetime(1970, 1, 1)
+        seconds = int((when - epoch).total_seconds()) // self.window_seconds * self.window_seconds
+        return epoch + timedelta(seconds=seconds)
+
+    def ingest(self, game_id: str, metrics: dict, when: datetime) -> int:
+        """Merge one batch; validates every metric before touching any histogram. Returns samples accepted"""
+        validated = [(metric, *validate_metric(metric, payload)) for metric, payload in metrics.items()]
+        window = self.window_start(when)
+        samples = 0
+        for metric, counts, total in validated:
+            key = (game_id, metric, window)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(len(METRIC_BOUNDS[metric]) + 1)
+            histogram.merge(counts, total)
+            samples += sum(counts)
+        return samples
+
+    def drain(self) -> List[dict]:
+        """Take everything aggregated so far as documents, leaving the aggregator empty"""
+        histograms, self._histograms = self._histograms, {}
+        return [
+            {
+                "game_id": game_id,
+                "metric": metric,
+                "window_start": window,
+                "window_seconds": self.window_seconds,
+                # Only non-zero buckets, keyed by bucket index
+                "counts": {str(index): count for index, count in enumerate(histogram.counts) if count},
+                "sum": histogram.total,
+            }
+            for (game_id, metric, window), histogram in histograms.items()
+        ]
+
+    async def flush(self):
+        documents = self.drain()
+        if not documents:
+            return
+        try:
+            await self.flush_handler(documents)
+        except Exception as e:
+            print(f"⚠️ Telemetry flush failed, dropping {len(documents)} histograms: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def merge_stored(metric: str, documents: List[dict]) -> dict:
+    """Combine flushed documents (sparse counts) into one histogram summary"""
+    counts = [0] * (len(METRIC_BOUNDS[metric]) + 1)
+    total = 0.0
+    for document in documents:
+        for index, count in document.get("counts", {}).items():
+            counts[int(index)] += count
+        total += document.get("sum", 0.0)
+    return summarize_histogram(metric, counts, total)
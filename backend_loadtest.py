@@ -0,0 +1,275 @@
+"""Load generator and latency benchmark for the Nokia Games Platform API.
+
+Simulated players replay the traffic the frontend produces: they open the
+home page (platform stats), browse a game (leaderboard and save slot
+listing), post a score update for every point they earn, and now and then
+save to a slot with a realistic Snake or Tetris payload, then reload the
+slot listing. Each endpoint's throughput and p50/p95/p99 latency is reported.
+
+    python backend_loadtest.py --players 50 --duration 30
+    python backend_loadtest.py --save-baseline loadtest_baseline.json
+    python backend_loadtest.py --baseline loadtest_baseline.json --tolerance 0.25
+
+It targets a local server (http://localhost:8001) unless --base-url names
+another one, and refuses remote hosts without --allow-remote.
+
+With --baseline the run exits non-zero if any endpoint's p95/p99 is more than
+`tolerance` slower than the baseline, or if throughput or the error rate
+regresses by the same margin.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+import httpx
+
+# Save payloads come from the same generators as the synthetic data in backend/seed_data.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from seed_data import snake_state, tetris_state  # noqa: E402
+
+GAME_WEIGHTS = {"snake-game": 0.45, "tetris-game": 0.4, "pong-game": 0.15}
+# Share of sessions that visit the home page first, and that save at the end
+HOME_PAGE_RATE = 0.3
+SAVE_RATE = 0.3
+LOAD_RATE = 0.1
+
+DEFAULT_BASE_URL = "http://localhost:8001"
+# Anything else is a shared deployment and needs --allow-remote
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def is_local(base_url: str) -> bool:
+    return urlsplit(base_url).hostname in LOCAL_HOSTS
+
+
+def score_steps(game_id: str, rng: random.Random) -> List[int]:
+    """Successive scores of one play session; the frontend posts each of them"""
+    scores, score = [], 0
+    for _ in range(rng.randint(5, 40)):
+        if game_id == "tetris-game":
+            cleared = rng.choices([0, 1, 2, 3, 4], weights=[70, 18, 7, 3, 2])[0]
+            score += cleared * 100 + 10
+        else:
+            score += 10
+        scores.append(score)
+    return scores
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.recording = False
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 500 or response.status_code in (400, 404, 422)
+        except httpx.HTTPError:
+            response, failed = None, True
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.recording:
+            self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            if failed:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+
+async def player_session(client: httpx.AsyncClient, recorder: Recorder, user_id: str,
+                         rng: random.Random, think: float):
+    """One visit: browse a game, play it, maybe save"""
+    async def pause():
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+    if rng.random() < HOME_PAGE_RATE:
+        await recorder.call(client, "GET /api/admin/stats", "GET", "/api/admin/stats")
+        await pause()
+
+    game_id = rng.choices(list(GAME_WEIGHTS), weights=list(GAME_WEIGHTS.values()))[0]
+    await recorder.call(client, "GET /api/scores/leaderboard/{game_id}", "GET",
+                        f"/api/scores/leaderboard/{game_id}")
+    listing = await recorder.call(client, "GET /api/game-states/{user_id}/{game_id}", "GET",
+                                  f"/api/game-states/{user_id}/{game_id}")
+    saves = listing.json().get("saves", []) if listing is not None and listing.status_code == 200 else []
+    await pause()
+
+    if saves and rng.random() < LOAD_RATE:
+        slot = rng.choice(saves)["slot_number"]
+        await recorder.call(client, "GET /api/game-states/{user_id}/{game_id}/{slot}", "GET",
+                            f"/api/game-states/{user_id}/{game_id}/{slot}")
+
+    score = 0
+    for score in score_steps(game_id, rng):
+        await recorder.call(client, "POST /api/scores/update", "POST", "/api/scores/update",
+                            params={"game_id": game_id, "score": score, "user_id": user_id})
+        await pause()
+
+    if game_id != "pong-game" and rng.random() < SAVE_RATE:
+        slot = rng.randint(1, 10)
+        existing = next((save for save in saves if save["slot_number"] == slot), None)
+        state = snake_state(rng, score) if game_id == "snake-game" else tetris_state(rng, score)
+        await recorder.call(
+            client, "POST /api/game-states/save", "POST", "/api/game-states/save",
+            params={"user_id": user_id},
+            json={"game_id": game_id, "slot_number": slot, "game_data": state,
+                  "score": score, "name": f"Save Slot {slot}"},
+            headers={"If-Match": str(existing.get("version") or 1) if existing else "0"},
+        )
+        await recorder.call(client, "GET /api/game-states/{user_id}/{game_id}", "GET",
+                            f"/api/game-states/{user_id}/{game_id}")
+
+
+async def player(client: httpx.AsyncClient, recorder: Recorder, index: int, seed: int,
+                 think: float, stop_at: float):
+    rng = random.Random(seed * 100003 + index)
+    user_id = f"loadtest-{seed}-{index}"
+    while time.perf_counter() < stop_at:
+        await player_session(client, recorder, user_id, rng, think)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder: Recorder, seconds: float) -> dict:
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.latencies.items()):
+        samples = sorted(samples)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(endpoint, 0),
+            "throughput_rps": len(samples) / seconds,
+            "p50_ms": percentile(samples, 0.50),
+            "p95_ms": percentile(samples, 0.95),
+            "p99_ms": percentile(samples, 0.99),
+            "max_ms": samples[-1],
+        }
+    total = sum(entry["requests"] for entry in endpoints.values())
+    errors = sum(entry["errors"] for entry in endpoints.values())
+    return {
+        "seconds": seconds,
+        "requests": total,
+        "throughput_rps": total / seconds if seconds else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def compare_to_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Human-readable list of regressions; empty if the run is within tolerance"""
+    regressions = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {result['throughput_rps']:.1f} rps < baseline {baseline['throughput_rps']:.1f} rps"
+        )
+    # 0.1% absolute slack so a zero-error baseline does not fail on one stray timeout
+    if result["error_rate"] > baseline["error_rate"] * (1 + tolerance) + 0.001:
+        regressions.append(f"error rate {result['error_rate']:.2%} > baseline {baseline['error_rate']:.2%}")
+    for endpoint, expected in baseline["endpoints"].items():
+        actual = result["endpoints"].get(endpoint)
+        if actual is None:
+            regressions.append(f"{endpoint}: no requests recorded")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if actual[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{endpoint}: {metric} {actual[metric]:.1f} ms > baseline {expected[metric]:.1f} ms"
+                )
+    return regressions
+
+
+async def run_load(base_url: str, players: int, duration: float, warmup: float,
+                   think: float, seed: int) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=players, max_keepalive_connections=players)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        response = await client.get("/api/health")
+        response.raise_for_status()
+
+        stop_at = time.perf_counter() + warmup + duration
+        tasks = [
+            asyncio.create_task(player(client, recorder, index, seed, think, stop_at))
+            for index in range(players)
+        ]
+        # Samples from the warm-up period (cold caches, connection setup) are discarded
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return summarize(recorder, elapsed)
+
+
+def print_report(result: dict):
+    print(f"\n{'endpoint':<46}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, entry in result["endpoints"].items():
+        print(f"{endpoint:<46}{entry['requests']:>8}{entry['errors']:>6}{entry['throughput_rps']:>9.1f}"
+              f"{entry['p50_ms']:>9.1f}{entry['p95_ms']:>9.1f}{entry['p99_ms']:>9.1f}")
+    print(f"\nTotal: {result['requests']} requests, {result['throughput_rps']:.1f} rps, "
+          f"error rate {result['error_rate']:.2%}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the Nokia Games Platform API")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"Backend URL (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--allow-remote", action="store_true",
+                        help="Allow a --base-url that is not this machine (never point this at production)")
+    parser.add_argument("--players", type=int, default=20, help="Concurrent simulated players")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before recording")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="Mean seconds between a player's actions (0 = as fast as possible)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the traffic mix")
+    parser.add_argument("--output", help="Write the full result as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Store this run as the baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Fail if this run regresses against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if not is_local(base_url) and not args.allow_remote:
+        parser.error(f"{base_url} is not a local server; pass --allow-remote to load test it anyway")
+    print(f"🔍 Load testing {base_url} with {args.players} players for {args.duration:.0f}s...")
+    result = asyncio.run(run_load(base_url, args.players, args.duration, args.warmup, args.think, args.seed))
+    result["config"] = {"players": args.players, "think": args.think, "seed": args.seed}
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print(f"⚠️ Baseline was recorded with {baseline.get('config')}, this run used {result['config']}")
+        regressions = compare_to_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(f"✅ Within {args.tolerance:.0%} of baseline {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -409,6 +409,122 @@ class NokiaGamesAPITest(unittest.TestCase):
         
         print("✅ Admin endpoints test passed")
 
+    def test_11_save_dedup_and_if_match(self):
+        """Test that identical saves skip the write and stale versions are rejected"""
+        print("\n🔍 Testing save deduplication and If-Match...")
+        
+        save_data = {
+            "game_id": self.snake_game_id,
+            "slot_number": 9,
+            "game_data": {"snake": [{"x": 3, "y": 4}], "food": {"x": 1, "y": 1}},
+            "score": 42,
+            "name": "Dedup Test"
+        }
+        save_url = f"{self.base_url}/api/game-states/save?user_id={self.test_user_id}"
+        
+        first = requests.post(save_url, json=save_data)
+        self.assertEqual(first.status_code, 200, f"Expected status code 200, got {first.status_code}")
+        version = first.json()["save_data"]["version"]
+        
+        # Same content with keys in a different order is a no-op
+        save_data["game_data"] = {"food": {"x": 1, "y": 1}, "snake": [{"x": 3, "y": 4}]}
+        repeat = requests.post(save_url, json=save_data)
+        self.assertEqual(repeat.status_code, 200, f"Expected status code 200, got {repeat.status_code}")
+        self.assertTrue(repeat.json()["unchanged"], "Identical save should be reported as unchanged")
+        self.assertEqual(repeat.json()["save_data"]["version"], version, "Version should not change")
+        
+        # A changed save with the current version succeeds and bumps the version
+        save_data["score"] = 43
+        changed = requests.post(save_url, json=save_data, headers={"If-Match": f'"{version}"'})
+        self.assertEqual(changed.status_code, 200, f"Expected status code 200, got {changed.status_code}")
+        self.assertEqual(changed.json()["save_data"]["version"], version + 1, "Version should be bumped")
+        
+        # Writing again with the old version is a conflict
+        save_data["score"] = 44
+        stale = requests.post(save_url, json=save_data, headers={"If-Match": f'"{version}"'})
+        self.assertEqual(stale.status_code, 412, f"Expected status code 412, got {stale.status_code}")
+        
+        requests.delete(f"{self.base_url}/api/game-states/{self.test_user_id}/{self.snake_game_id}/9")
+        print("✅ Save deduplication and If-Match test passed")
+
+    def test_12_player_rank(self):
+        """Test player rank lookup with neighbours"""
+        print("\n🔍 Testing player rank endpoint...")
+        
+        requests.post(
+            f"{self.base_url}/api/scores/update?game_id={self.snake_game_id}&score={self.test_score}&user_id={self.test_user_id}"
+        )
+        response = requests.get(f"{self.base_url}/api/scores/rank/{self.snake_game_id}/{self.test_user_id}?neighbours=2")
+        
+        self.assertEqual(response.status_code, 200, f"Expected status code 200, got {response.status_code}")
+        data = response.json()
+        self.assertEqual(data["user_id"], self.test_user_id, "User ID mismatch")
+        self.assertGreaterEqual(data["rank"], 1, "Rank should be 1-based")
+        self.assertLessEqual(data["rank"], data["total_players"], "Rank should not exceed player count")
+        self.assertLessEqual(len(data["above"]), 2, "At most two players above")
+        self.assertLessEqual(len(data["below"]), 2, "At most two players below")
+        for entry in data["above"]:
+            self.assertGreaterEqual(entry["score"], data["score"], "Players above should not score lower")
+        
+        missing = requests.get(f"{self.base_url}/api/scores/rank/{self.snake_game_id}/nonexistent-user")
+        self.assertEqual(missing.status_code, 404, f"Expected status code 404, got {missing.status_code}")
+        
+        print("✅ Player rank endpoint test passed")
+
+    def test_13_window_leaderboards(self):
+        """Test daily, weekly and monthly leaderboards"""
+        print("\n🔍 Testing windowed leaderboards...")
+        
+        requests.post(
+            f"{self.base_url}/api/scores/update?game_id={self.tetris_game_id}&score={self.test_score}&user_id={self.test_user_id}"
+        )
+        for window in ["daily", "weekly", "monthly"]:
+            response = requests.get(f"{self.base_url}/api/scores/leaderboard/{self.tetris_game_id}?window={window}")
+            
+            self.assertEqual(response.status_code, 200, f"Expected status code 200, got {response.status_code}")
+            data = response.json()
+            self.assertEqual(data["window"], window, "Window mismatch")
+            self.assertIn("bucket", data, "Response should contain 'bucket' key")
+            user_ids = [entry["user_id"] for entry in data["leaderboard"]]
+            self.assertIn(self.test_user_id, user_ids, f"Test user should be on the {window} leaderboard")
+            scores = [entry["score"] for entry in data["leaderboard"]]
+            self.assertEqual(scores, sorted(scores, reverse=True), "Leaderboard should be sorted by score")
+        
+        invalid = requests.get(f"{self.base_url}/api/scores/leaderboard/{self.tetris_game_id}?window=yearly")
+        self.assertEqual(invalid.status_code, 400, f"Expected status code 400, got {invalid.status_code}")
+        
+        print("✅ Windowed leaderboards test passed")
+
+    def test_14_leaderboard_pagination(self):
+        """Test keyset pagination and page size capping on leaderboards"""
+        print("\n🔍 Testing leaderboard pagination...")
+        
+        url = f"{self.base_url}/api/scores/leaderboard/{self.snake_game_id}"
+        seen = []
+        cursor = None
+        for _ in range(3):
+            params = {"limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(url, params=params)
+            self.assertEqual(response.status_code, 200, f"Expected status code 200, got {response.status_code}")
+            data = response.json()
+            self.assertLessEqual(len(data["leaderboard"]), 1, "Page should respect the limit")
+            seen.extend(entry["user_id"] for entry in data["leaderboard"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), len(set(seen)), "Pages should not overlap")
+        
+        huge = requests.get(url, params={"limit": 1000000})
+        self.assertEqual(huge.status_code, 200, f"Expected status code 200, got {huge.status_code}")
+        self.assertLessEqual(len(huge.json()["leaderboard"]), 100, "Oversized limits should be capped")
+        
+        invalid = requests.get(url, params={"cursor": "not-a-cursor"})
+        self.assertEqual(invalid.status_code, 400, f"Expected status code 400, got {invalid.status_code}")
+        
+        print("✅ Leaderboard pagination test passed")
+
 def run_tests():
     """Run all tests and return results"""
     test_suite = unittest.TestSuite()
@@ -422,6 +538,10 @@ def run_tests():
     test_suite.addTest(NokiaGamesAPITest('test_08_leaderboard'))
     test_suite.addTest(NokiaGamesAPITest('test_09_game_state_save_and_load'))
     test_suite.addTest(NokiaGamesAPITest('test_10_admin_endpoints'))
+    test_suite.addTest(NokiaGamesAPITest('test_11_save_dedup_and_if_match'))
+    test_suite.addTest(NokiaGamesAPITest('test_12_player_rank'))
+    test_suite.addTest(NokiaGamesAPITest('test_13_window_leaderboards'))
+    test_suite.addTest(NokiaGamesAPITest('test_14_leaderboard_pagination'))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(test_suite)
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import { useGame } from '../contexts/GameContext';
+import useGameTelemetry from '../hooks/useGameTelemetry';
 
 const GameWrapper = ({ gameId, gameName, GameComponent }) => {
   const { user } = useAuth();
@@ -15,6 +16,8 @@ const GameWrapper = ({ gameId, gameName, GameComponent }) => {
   const [saveName, setSaveName] = useState('');
   const [loading, setLoading] = useState(false);
 
+  useGameTelemetry(gameId);
+
   useEffect(() => {
     if (user) {
       fetchSavedSlots();
@@ -49,12 +52,14 @@ const GameWrapper = ({ gameId, gameName, GameComponent }) => {
 
     setLoading(true);
     try {
+      const existingSave = savedSlots.find(save => save.slot_number === saveSlot);
       const result = await saveGameState(
         gameId, 
         saveSlot, 
         gameState, 
         currentScore, 
-        saveName || `Save Slot ${saveSlot}`
+        saveName || `Save Slot ${saveSlot}`,
+        existingSave ? (existingSave.version || 1) : 0
       );
       
       if (result.success) {
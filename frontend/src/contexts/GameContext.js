@@ -15,7 +15,7 @@ export const GameProvider = ({ children }) => {
   const { user } = useAuth();
   const [gameStates, setGameStates] = useState({});
 
-  const saveGameState = async (gameId, slotNumber, gameData, score, name = null) => {
+  const saveGameState = async (gameId, slotNumber, gameData, score, name = null, expectedVersion = null) => {
     if (!user) {
       throw new Error('User must be logged in to save game state');
     }
@@ -25,6 +25,8 @@ export const GameProvider = ({ children }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          // Slot version this client last saw; the backend rejects the save if it moved on
+          ...(expectedVersion !== null && { 'If-Match': `"${expectedVersion}"` }),
         },
         body: JSON.stringify({
           game_id: gameId,
@@ -144,6 +146,49 @@ export const GameProvider = ({ children }) => {
     }
   };
 
+  // Live top-K leaderboards over WebSocket: a snapshot per game, then deltas.
+  // Calls onChange(gameId, entries) with the full board after every message and
+  // returns a function that closes the connection.
+  const subscribeLeaderboards = (gameIds, onChange) => {
+    const wsUrl = `${process.env.REACT_APP_BACKEND_URL.replace(/^http/, 'ws')}/api/ws/leaderboard?games=${gameIds.join(',')}`;
+    const boards = {};
+    let socket = null;
+    let closed = false;
+    let retryTimer = null;
+
+    const connect = () => {
+      socket = new WebSocket(wsUrl);
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'snapshot') {
+          boards[message.game_id] = message.leaderboard;
+        } else if (message.type === 'delta') {
+          const byUser = {};
+          (boards[message.game_id] || []).forEach(entry => { byUser[entry.user_id] = entry; });
+          message.removed.forEach(userId => { delete byUser[userId]; });
+          message.changes.forEach(entry => { byUser[entry.user_id] = entry; });
+          boards[message.game_id] = Object.values(byUser).sort((a, b) => a.rank - b.rank);
+        } else {
+          return; // Refused requests ("error") carry no board
+        }
+        onChange(message.game_id, boards[message.game_id]);
+      };
+      socket.onclose = () => {
+        // Reconnecting resubscribes and starts again from a fresh snapshot
+        if (!closed) {
+          retryTimer = setTimeout(connect, 3000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (socket) socket.close();
+    };
+  };
+
   const value = {
     saveGameState,
     loadGameState,
@@ -151,6 +196,7 @@ export const GameProvider = ({ children }) => {
     deleteGameState,
     updateHighScore,
     getLeaderboard,
+    subscribeLeaderboards,
     gameStates,
     setGameStates,
   };
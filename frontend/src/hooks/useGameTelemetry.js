@@ -0,0 +1,91 @@
+import { useEffect } from 'react';
+
+// Must match LAYOUT_VERSION and METRIC_BOUNDS in backend/telemetry.py
+const LAYOUT_VERSION = 1;
+const BOUNDS = {
+  frame_ms: [4, 8, 12, 16, 17, 20, 25, 33, 50, 67, 100, 150, 250, 500, 1000],
+  input_latency_ms: [8, 16, 24, 33, 50, 67, 83, 100, 150, 200, 300, 500, 1000]
+};
+const FLUSH_INTERVAL_MS = 15000;
+
+const emptyHistograms = () => Object.fromEntries(
+  Object.entries(BOUNDS).map(([metric, bounds]) => [metric, { counts: new Array(bounds.length + 1).fill(0), sum: 0 }])
+);
+
+const record = (histograms, metric, value) => {
+  const bounds = BOUNDS[metric];
+  let index = bounds.findIndex((bound) => value <= bound);
+  if (index === -1) index = bounds.length;
+  histograms[metric].counts[index] += 1;
+  histograms[metric].sum += value;
+};
+
+const gzip = async (text) => {
+  if (typeof CompressionStream === 'undefined') {
+    return { body: text, encoding: null };
+  }
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+  return { body: await new Response(stream).blob(), encoding: 'gzip' };
+};
+
+// Samples frame times and keydown-to-next-frame latency while a game is mounted,
+// buckets them locally and posts one small batch every FLUSH_INTERVAL_MS
+const useGameTelemetry = (gameId) => {
+  useEffect(() => {
+    let histograms = emptyHistograms();
+    let samples = 0;
+    let lastFrame = null;
+    let pendingInputs = [];
+    let frameHandle;
+
+    const onFrame = (now) => {
+      if (lastFrame !== null) {
+        record(histograms, 'frame_ms', now - lastFrame);
+        samples += 1;
+      }
+      for (const inputTime of pendingInputs) {
+        record(histograms, 'input_latency_ms', now - inputTime);
+      }
+      pendingInputs = [];
+      lastFrame = now;
+      frameHandle = requestAnimationFrame(onFrame);
+    };
+    const onKeyDown = (event) => pendingInputs.push(event.timeStamp);
+    // Frames stop while the tab is hidden; do not count that gap as one long frame
+    const onVisibilityChange = () => { lastFrame = null; };
+
+    const flush = async (unloading = false) => {
+      if (!samples) return;
+      const batch = JSON.stringify({ layout: LAYOUT_VERSION, game_id: gameId, metrics: histograms });
+      histograms = emptyHistograms();
+      samples = 0;
+      try {
+        // Compression is async, so the final flush on unmount goes out uncompressed
+        const { body, encoding } = unloading ? { body: batch, encoding: null } : await gzip(batch);
+        await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/telemetry`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', ...(encoding ? { 'Content-Encoding': encoding } : {}) },
+          body,
+          keepalive: unloading
+        });
+      } catch (error) {
+        // Telemetry is best effort
+      }
+    };
+
+    frameHandle = requestAnimationFrame(onFrame);
+    window.addEventListener('keydown', onKeyDown);
+    document.addEventListener('visibilitychange', onVisibilityChange);
+    const flushTimer = setInterval(() => flush(), FLUSH_INTERVAL_MS);
+
+    return () => {
+      cancelAnimationFrame(frameHandle);
+      window.removeEventListener('keydown', onKeyDown);
+      document.removeEventListener('visibilitychange', onVisibilityChange);
+      clearInterval(flushTimer);
+      flush(true);
+    };
+  }, [gameId]);
+};
+
+export default useGameTelemetry;
@@ -5,9 +5,9 @@ import { useGame } from '../contexts/GameContext';
 
 const GamesPage = () => {
   const { user } = useAuth();
-  const { getLeaderboard } = useGame();
+  const { subscribeLeaderboards } = useGame();
+  // Filled from the socket: every subscription starts with a snapshot
   const [leaderboards, setLeaderboards] = useState({});
-  const [loading, setLoading] = useState(true);
 
   const games = [
     {
@@ -43,27 +43,12 @@ const GamesPage = () => {
   ];
 
   useEffect(() => {
-    fetchAllLeaderboards();
+    // Keep the boards live instead of re-fetching them
+    return subscribeLeaderboards(games.map(game => game.id), (gameId, entries) => {
+      setLeaderboards(previous => ({ ...previous, [gameId]: entries.slice(0, 5) }));
+    });
   }, []);
 
-  const fetchAllLeaderboards = async () => {
-    const leaderboardData = {};
-    
-    for (const game of games) {
-      try {
-        const result = await getLeaderboard(game.id);
-        if (result.success) {
-          leaderboardData[game.id] = result.leaderboard.slice(0, 5); // Top 5
-        }
-      } catch (error) {
-        console.error(`Failed to fetch leaderboard for ${game.id}:`, error);
-      }
-    }
-    
-    setLeaderboards(leaderboardData);
-    setLoading(false);
-  };
-
   const getDifficultyColor = (difficulty) => {
     switch (difficulty) {
       case 'Easy': return 'text-green-400';
@@ -116,7 +101,7 @@ const GamesPage = () => {
                 <div className="mb-4">
                   <h3 className="font-mono text-sm font-bold mb-2">TOP SCORES</h3>
                   <div className="bg-gray-700 rounded p-2">
-                    {loading ? (
+                    {!(game.id in leaderboards) ? (
                       <div className="text-xs font-mono opacity-60">Loading...</div>
                     ) : leaderboards[game.id] && leaderboards[game.id].length > 0 ? (
                       <div className="space-y-1">
@@ -173,7 +158,7 @@ const GamesPage = () => {
                   {game.icon} {game.name}
                 </h3>
                 <div className="bg-gray-700 rounded p-4">
-                  {loading ? (
+                  {!(game.id in leaderboards) ? (
                     <div className="text-center font-mono text-sm opacity-60">Loading...</div>
                   ) : leaderboards[game.id] && leaderboards[game.id].length > 0 ? (
                     <div className="space-y-2">
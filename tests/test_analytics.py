@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analytics import PERCENTILES, count_arrays, summarize_score_counts  # noqa: E402
+from storage import create_memory_storage, day_score_counts  # noqa: E402
+
+
+def events(rows):
+    return [
+        {"event_id": str(n), "created_at": created_at, "game_id": game_id, "user_id": f"user-{n}", "score": score}
+        for n, (created_at, game_id, score) in enumerate(rows)
+    ]
+
+
+def test_summary_percentiles_histogram_and_days():
+    day_0, day_2 = datetime(2030, 1, 1, 8), datetime(2030, 1, 3, 23, 59)
+    tallies = day_score_counts(events([
+        (day_0, "snake-game", 10), (day_0, "snake-game", 20),
+        (day_2, "snake-game", 30), (day_2, "snake-game", 40), (day_2, "snake-game", 100),
+    ]))
+
+    summary = summarize_score_counts(*count_arrays(tallies), bins=3)
+    assert summary["total_scores"] == 5
+    assert (summary["min"], summary["max"], summary["mean"]) == (10, 100, 40.0)
+    assert summary["percentiles"] == pytest.approx({"p50": 30.0, "p75": 40.0, "p90": 76.0, "p95": 88.0, "p99": 97.6})
+    assert summary["histogram"] == {"counts": [3, 1, 1], "edges": [10.0, 40.0, 70.0, 100.0]}
+    assert summary["daily_activity"] == [
+        {"day": "2030-01-01", "scores": 2, "mean_score": 15.0, "max_score": 20},
+        {"day": "2030-01-03", "scores": 3, "mean_score": pytest.approx(170 / 3), "max_score": 100},
+    ]
+
+
+def test_tallies_summarize_like_the_expanded_events():
+    rng = np.random.default_rng(3)
+    scores = rng.integers(0, 40, 5000) * 10  # Few distinct scores, many repeats
+    start = datetime(2030, 1, 1)
+    tallies = day_score_counts(events(
+        (start + timedelta(hours=int(hour)), "tetris-game", int(score))
+        for hour, score in zip(rng.integers(0, 24 * 7, scores.size), scores)
+    ))
+
+    summary = summarize_score_counts(*count_arrays(tallies), bins=7)
+    expected_counts, expected_edges = np.histogram(scores, bins=7)
+    assert summary["histogram"] == {"counts": expected_counts.tolist(), "edges": expected_edges.tolist()}
+    assert list(summary["percentiles"].values()) == pytest.approx(np.percentile(scores, PERCENTILES).tolist())
+    assert summary["mean"] == pytest.approx(scores.mean())
+    assert sum(day["scores"] for day in summary["daily_activity"]) == scores.size
+
+
+def test_empty_summary():
+    assert summarize_score_counts(*count_arrays({}))["total_scores"] == 0
+
+
+def test_summaries_group_by_game():
+    async def scenario():
+        scores = create_memory_storage().scores
+        start = datetime(2030, 1, 1)
+        await scores.record_events(events([
+            (start + timedelta(hours=n), game_id, score)
+            for n, (game_id, score) in enumerate([("snake-game", 50), ("tetris-game", 900),
+                                                  ("snake-game", 150), ("tetris-game", 300)])
+        ]))
+        return [await scores.daily_score_counts(start, game_id) for game_id in ("snake-game", "tetris-game", None)]
+
+    snake, tetris, every_game = asyncio.run(scenario())
+    assert summarize_score_counts(*count_arrays(snake))["mean"] == 100.0
+    assert summarize_score_counts(*count_arrays(tetris))["percentiles"]["p50"] == 600.0
+    assert summarize_score_counts(*count_arrays(every_game))["total_scores"] == 4
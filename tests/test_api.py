@@ -0,0 +1,129 @@
+"""Endpoint tests against the in-memory storage backend (no MongoDB needed)"""
+import os
+
+import pytest
+
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["CACHE_BUS"] = "local"
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("motor")
+pytest.importorskip("numpy")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from starlette.websockets import WebSocketDisconnect  # noqa: E402
+
+import server  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def test_seeded_games_are_listed(client):
+    games = client.get("/api/games").json()["games"]
+    assert {game["id"] for game in games} >= {"snake-game", "tetris-game", "pong-game"}
+
+
+def test_save_versions_and_conflicts(client):
+    payload = {"game_id": "tetris-game", "slot_number": 3, "game_data": {"board": [1, 2]}, "score": 5}
+    first = client.post("/api/game-states/save?user_id=api-user", json=payload, headers={"If-Match": "0"})
+    assert first.status_code == 200
+    assert first.headers["ETag"] == '"1"'
+
+    repeat = client.post("/api/game-states/save?user_id=api-user", json=payload)
+    assert repeat.json()["unchanged"] is True
+
+    stale = client.post("/api/game-states/save?user_id=api-user",
+                        json={**payload, "score": 9}, headers={"If-Match": "0"})
+    assert stale.status_code == 412
+
+    loaded = client.get("/api/game-states/api-user/tetris-game/3")
+    assert loaded.json()["game_data"] == {"board": [1, 2]}
+    assert client.delete("/api/game-states/api-user/tetris-game/3").status_code == 200
+    assert client.get("/api/game-states/api-user/tetris-game/3").status_code == 404
+
+
+def test_scores_feed_leaderboard_pages_and_rank(client):
+    for user_id, score in [("api-a", 300), ("api-b", 200), ("api-c", 200)]:
+        assert client.post(f"/api/scores/update?game_id=pong-game&score={score}&user_id={user_id}").status_code == 200
+
+    first = client.get("/api/scores/leaderboard/pong-game?limit=2").json()
+    assert [entry["user_id"] for entry in first["leaderboard"]] == ["api-a", "api-b"]
+    second = client.get(f"/api/scores/leaderboard/pong-game?limit=2&cursor={first['next_cursor']}").json()
+    assert [entry["user_id"] for entry in second["leaderboard"]] == ["api-c"]
+
+    rank = client.get("/api/scores/rank/pong-game/api-c").json()
+    assert rank["rank"] == 3
+
+
+def test_save_history_lists_and_restores_versions(client):
+    url = "/api/game-states/save?user_id=history-user"
+    for score in (10, 20, 30):
+        payload = {"game_id": "snake-game", "slot_number": 2, "score": score,
+                   "game_data": {"snake": [{"x": score, "y": 0}, {"x": 0, "y": 0}], "score": score}}
+        assert client.post(url, json=payload).status_code == 200
+
+    versions = client.get("/api/game-states/history-user/snake-game/2/versions").json()["versions"]
+    assert [(entry["version"], entry["kind"]) for entry in versions] == [(3, "delta"), (2, "delta"), (1, "snapshot")]
+    assert client.get("/api/game-states/history-user/snake-game/2/versions/2").json()["score"] == 20
+
+    restored = client.post("/api/game-states/history-user/snake-game/2/versions/1/restore",
+                           headers={"If-Match": "3"})
+    assert restored.status_code == 200
+    assert restored.headers["ETag"] == '"4"'
+    assert client.get("/api/game-states/history-user/snake-game/2").json()["game_data"]["score"] == 10
+    assert client.post("/api/game-states/history-user/snake-game/2/versions/9/restore").status_code == 404
+
+
+def test_telemetry_rejects_non_finite_sums(client):
+    layout = client.get("/api/telemetry/layout").json()
+    counts = [0] * (len(layout["metrics"]["frame_ms"]) + 1)
+    counts[3] = 5
+    body = ('{"layout": %d, "game_id": "snake-game", "metrics": {"frame_ms": {"counts": %s, "sum": NaN}}}'
+            % (layout["version"], counts))
+    response = client.post("/api/telemetry", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert client.get("/api/admin/telemetry?metric=frame_ms").status_code == 200
+
+
+def test_pong_socket_is_refused_outside_the_match_process(client, monkeypatch):
+    monkeypatch.setattr(server, "PONG_ENABLED", False)
+    with client.websocket_connect("/api/ws/pong") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+    assert closed.value.code == 1013
+
+
+def test_leaderboard_socket_validates_subscriptions(client):
+    with client.websocket_connect("/api/ws/leaderboard?games=snake-game,no-such-game") as websocket:
+        assert websocket.receive_json()["type"] == "snapshot"
+        assert websocket.receive_json() == {"type": "error", "detail": "Unknown game: no-such-game"}
+        websocket.send_json({"subscribe": "tetris-game"})
+        assert websocket.receive_json() == {"type": "error", "detail": "subscribe must be a list of game ids"}
+        websocket.send_json({"subscribe": ["tetris-game"]})
+        snapshot = websocket.receive_json()
+        assert (snapshot["type"], snapshot["game_id"]) == ("snapshot", "tetris-game")
+
+
+def test_verified_scores_need_a_fresh_server_seed(client):
+    replay = {"game_id": "snake-game", "score": 0, "inputs": "", "ticks": 0}
+    forged = client.post("/api/scores/verified", params={"user_id": "api-v"}, json={**replay, "seed": 12345})
+    assert forged.status_code == 403
+
+    seed = client.post("/api/scores/replay-seed", params={"game_id": "snake-game", "user_id": "api-v"}).json()["seed"]
+    assert client.post("/api/scores/verified", params={"user_id": "api-w"}, json={**replay, "seed": seed}).status_code == 403
+    seed = client.post("/api/scores/replay-seed", params={"game_id": "snake-game", "user_id": "api-v"}).json()["seed"]
+    accepted = client.post("/api/scores/verified", params={"user_id": "api-v"}, json={**replay, "seed": seed})
+    assert accepted.status_code == 200 and accepted.json()["verified"]
+    # Single use
+    assert client.post("/api/scores/verified", params={"user_id": "api-v"}, json={**replay, "seed": seed}).status_code == 403
+
+    # A bot replay of minutes of play submitted right after the seed was issued
+    seed = client.post("/api/scores/replay-seed", params={"game_id": "snake-game", "user_id": "api-v"}).json()["seed"]
+    too_fast = client.post("/api/scores/verified", params={"user_id": "api-v"},
+                           json={**replay, "seed": seed, "inputs": "1U", "ticks": 2000})
+    assert too_fast.status_code == 422
+    assert client.post("/api/scores/replay-seed", params={"game_id": "pong-game"}).status_code == 400
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from bson import ObjectId  # noqa: E402
+from pymongo.errors import AutoReconnect  # noqa: E402
+
+from cache import MISS, RESYNC, LocalInvalidationBus, MongoInvalidationBus, ResponseCache  # noqa: E402
+
+
+def test_cache_hit_and_miss():
+    cache = ResponseCache(ttl=30)
+    assert cache.get("games", "active") is MISS
+    cache.set("games", "active", {"games": []})
+    assert cache.get("games", "active") == {"games": []}
+    # None is a valid cached value, distinct from a miss
+    cache.set("games", "missing", None)
+    assert cache.get("games", "missing") is None
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=30)
+    cache.set("games", "active", "fresh")
+    cache.set("games", "short", "brief", ttl=1)
+    now[0] += 2
+    assert cache.get("games", "short") is MISS
+    assert cache.get("games", "active") == "fresh"
+    now[0] += 30
+    assert cache.get("games", "active") is MISS
+
+
+def test_invalidate_by_tag_and_lru_bound():
+    cache = ResponseCache(max_entries=2)
+    cache.set("leaderboard:snake-game:all", "10", "page")
+    cache.set("games", "active", "list")
+    cache.invalidate("leaderboard:snake-game:all")
+    assert cache.get("leaderboard:snake-game:all", "10") is MISS
+    assert cache.get("games", "active") == "list"
+
+    cache.set("games", "snake-game", "snake")
+    cache.set("games", "tetris-game", "tetris")
+    assert cache.get("games", "active") is MISS  # Least recently used entry evicted
+    assert cache.get("games", "tetris-game") == "tetris"
+
+
+def test_local_bus_delivers_invalidations_to_every_subscriber():
+    first, second = ResponseCache(), ResponseCache()
+    bus = LocalInvalidationBus()
+    for cache in (first, second):
+        cache.set("games", "active", "list")
+        bus.subscribe(lambda message, cache=cache: cache.invalidate(*message["tags"]))
+
+    asyncio.run(bus.publish({"type": "invalidate", "tags": ["games"]}))
+    assert first.get("games", "active") is MISS
+    assert second.get("games", "active") is MISS
+
+
+def test_failing_subscriber_does_not_stop_delivery():
+    received = []
+    bus = LocalInvalidationBus()
+
+    def broken(message):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken)
+    bus.subscribe(received.append)
+    asyncio.run(bus.publish({"type": "invalidate", "tags": ["games"]}))
+    assert received == [{"type": "invalidate", "tags": ["games"]}]
+
+
+class ScriptedCursor:
+    """Tailable cursor stand-in: yields its documents, then idles or dies"""
+
+    def __init__(self, docs, idle_rounds=0):
+        self.docs = list(docs)
+        self.idle_rounds = idle_rounds
+        self.alive = True
+
+    async def try_next(self):
+        if self.docs:
+            return self.docs.pop(0)
+        if self.idle_rounds:
+            self.idle_rounds -= 1
+            return None  # An awaitData wait that found nothing
+        self.alive = False
+        return None
+
+
+class ScriptedCollection:
+    def __init__(self, cursors):
+        self.cursors = cursors
+        self.finds = 0
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        if not self.cursors:
+            raise asyncio.CancelledError  # Script exhausted: end the tail loop
+        return self.cursors.pop(0)
+
+
+def test_mongo_bus_survives_idle_rounds_and_reopened_cursors(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr("cache.asyncio.sleep", no_sleep)
+    now = datetime.utcnow()
+    # Two workers' ids from the same second: the later insert has the lower _id
+    first = ObjectId.from_datetime(now)
+    early, late = ObjectId(str(first)[:8] + "ff" * 8), ObjectId(str(first)[:8] + "00" * 8)
+
+    def doc(doc_id, tag, origin="other-worker"):
+        return {"_id": doc_id, "origin": origin, "message": {"type": "invalidate", "tags": [tag]}}
+
+    collection = ScriptedCollection([
+        ScriptedCursor([doc(early, "a")], idle_rounds=3),
+        # Reopened after the first cursor died: re-reads early, then finds late
+        ScriptedCursor([doc(early, "a"), doc(late, "b"), doc(ObjectId(), "mine", origin="me")]),
+    ])
+    bus = MongoInvalidationBus({"cache_invalidations": collection})
+    bus.worker_id = "me"
+    received = []
+    bus.subscribe(received.append)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(bus._tail())
+    assert [message["tags"] for message in received] == [["a"], ["b"]]
+    assert collection.finds == 3
+
+
+class BrokenCursor:
+    alive = True
+
+    async def try_next(self):
+        raise AutoReconnect("connection closed")
+
+
+def test_mongo_bus_asks_for_a_resync_after_reconnecting(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr("cache.asyncio.sleep", no_sleep)
+    collection = ScriptedCollection([BrokenCursor(), ScriptedCursor([], idle_rounds=1)])
+    bus = MongoInvalidationBus({"cache_invalidations": collection})
+    received = []
+    bus.subscribe(received.append)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(bus._tail())
+    assert received == [RESYNC]
@@ -0,0 +1,87 @@
+import asyncio
+import gzip
+import json
+
+from compression import CompressionMiddleware, negotiate
+
+
+def json_app(payload, status=200, content_type=b"application/json", chunks=1):
+    body = json.dumps(payload).encode()
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        size = -(-len(body) // chunks)
+        for index in range(chunks):
+            await send({"type": "http.response.body", "body": body[index * size:(index + 1) * size],
+                        "more_body": index < chunks - 1})
+
+    return app, body
+
+
+def request(middleware, path, accept_encoding="gzip"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "path": path, "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(middleware(scope, receive, send))
+    headers = dict(messages[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return headers, body
+
+
+def test_negotiate_respects_q_values_and_server_preference():
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("*", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate("br, *;q=0", ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+
+
+def test_large_json_is_compressed_and_small_json_is_not():
+    app, body = json_app({"saves": [{"slot_number": n, "game_data": {"board": [[0] * 10] * 20}} for n in range(5)]},
+                         chunks=3)
+    middleware = CompressionMiddleware(app, route_thresholds={"/api/game-states/": 256})
+    headers, compressed = request(middleware, "/api/game-states/u/snake-game")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(compressed) < len(body)
+    assert gzip.decompress(compressed) == body
+
+    small_app, small_body = json_app({"status": "healthy"})
+    headers, sent = request(CompressionMiddleware(small_app), "/api/health")
+    assert b"content-encoding" not in headers
+    assert sent == small_body
+
+
+def test_disabled_routes_and_other_content_types_pass_through():
+    app, body = json_app({"x": "y" * 5000})
+    middleware = CompressionMiddleware(app, route_thresholds={"/api/health": None})
+    headers, sent = request(middleware, "/api/health")
+    assert b"content-encoding" not in headers and sent == body
+
+    image_app, image_body = json_app({"x": "y" * 5000}, content_type=b"image/png")
+    headers, sent = request(CompressionMiddleware(image_app), "/logo.png")
+    assert b"content-encoding" not in headers and sent == image_body
+
+    headers, sent = request(CompressionMiddleware(app), "/api/games", accept_encoding="identity")
+    assert b"content-encoding" not in headers and sent == body
+
+
+def test_cacheable_routes_reuse_compressed_bodies():
+    app, body = json_app({"games": [{"id": f"game-{n}", "description": "Classic Nokia game"} for n in range(100)]})
+    middleware = CompressionMiddleware(app, cacheable_prefixes=("/api/games",), thread_threshold=1024)
+    calls = []
+    encoder = middleware.encoders["gzip"]
+    middleware.encoders["gzip"] = lambda data: calls.append(len(data)) or encoder(data)
+
+    first = request(middleware, "/api/games")[1]
+    second = request(middleware, "/api/games")[1]
+    assert first == second and gzip.decompress(first) == body
+    assert len(calls) == 1
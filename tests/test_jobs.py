@@ -0,0 +1,108 @@
+import asyncio
+
+from jobs import JobQueue
+
+
+class FakeSpillCollection:
+    """Just enough of a Motor collection for JobQueue's spill/restore"""
+
+    def __init__(self):
+        self.docs = []
+
+    async def insert_many(self, docs):
+        for i, doc in enumerate(docs):
+            self.docs.append({"_id": len(self.docs) + i, **doc})
+
+    async def find_one_and_delete(self, query):
+        await asyncio.sleep(0)  # Let other starting queues interleave, like a round trip
+        return self.docs.pop(0) if self.docs else None
+
+
+def test_jobs_are_batched():
+    batches = []
+
+    async def handler(payloads):
+        batches.append(list(payloads))
+
+    async def scenario():
+        queue = JobQueue(FakeSpillCollection(), batch_size=50)
+        queue.register("count", handler)
+        for i in range(10):
+            await queue.enqueue("count", {"n": i})
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert sorted(p["n"] for batch in batches for p in batch) == list(range(10))
+    assert len(batches) < 10
+
+
+def test_failed_batches_are_retried():
+    calls = []
+
+    async def flaky(payloads):
+        calls.append(len(payloads))
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    async def scenario():
+        queue = JobQueue(FakeSpillCollection(), base_delay=0.01)
+        queue.register("flaky", flaky)
+        await queue.start()
+        await queue.enqueue("flaky", {"n": 1})
+        await asyncio.sleep(0.2)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert calls == [1, 1]
+
+
+def test_unfinished_jobs_spill_and_resume():
+    spill = FakeSpillCollection()
+    done = []
+
+    async def slow(payloads):
+        await asyncio.sleep(10)
+
+    async def fast(payloads):
+        done.extend(p["n"] for p in payloads)
+
+    async def first_run():
+        queue = JobQueue(spill, drain_timeout=0.05, workers=1, batch_size=1)
+        queue.register("work", slow)
+        await queue.start()
+        for i in range(3):
+            await queue.enqueue("work", {"n": i})
+        await queue.stop()
+
+    async def second_run():
+        queue = JobQueue(spill)
+        queue.register("work", fast)
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(first_run())
+    assert len(spill.docs) == 3
+    asyncio.run(second_run())
+    assert sorted(done) == [0, 1, 2]
+    assert spill.docs == []
+
+
+def test_spilled_jobs_are_claimed_by_one_starting_worker():
+    spill = FakeSpillCollection()
+    done = []
+
+    async def handler(payloads):
+        done.extend(p["n"] for p in payloads)
+
+    async def scenario():
+        await spill.insert_many([{"name": "work", "payload": {"n": i}, "attempt": 0} for i in range(20)])
+        queues = [JobQueue(spill) for _ in range(3)]
+        for queue in queues:
+            queue.register("work", handler)
+        await asyncio.gather(*(queue.start() for queue in queues))
+        await asyncio.gather(*(queue.stop() for queue in queues))
+
+    asyncio.run(scenario())
+    assert sorted(done) == list(range(20))
+    assert spill.docs == []
@@ -0,0 +1,120 @@
+import asyncio
+
+from pong_match import (
+    FINISHED,
+    KEYFRAME_EVERY,
+    SNAPSHOT_EVERY,
+    PongMatchmaker,
+    PongPlayer,
+    PongRoom,
+    RoomScheduler,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+
+class RecordingPlayer(PongPlayer):
+    def __init__(self):
+        super().__init__(None)
+        self.received = []
+
+    def send(self, message):
+        self.received.append(message)
+        return True
+
+
+def test_delta_snapshots_round_trip():
+    previous = (100, 100, 1600, 1200, 768, 768, 0, 0, 1, 0, 0)
+    current = (120, 100, 1624, 1224, 768, -768, 0, 0, 1, 5, 0)
+
+    full = encode_snapshot(7, previous, None)
+    delta = encode_snapshot(8, current, previous)
+
+    assert decode_snapshot(full, None) == (7, previous)
+    assert decode_snapshot(delta, previous) == (8, current)
+    assert len(delta) < len(full)
+
+
+def test_players_reconstruct_room_state_from_broadcasts():
+    async def scenario():
+        left, right = RecordingPlayer(), RecordingPlayer()
+        room = PongRoom(left, right, seed=3)
+        scheduler = RoomScheduler()
+        scheduler.add_room(room)
+        for tick in range(SNAPSHOT_EVERY * KEYFRAME_EVERY * 2):
+            left.push_input(tick, 1)
+            scheduler.run_tick()
+        return room, left, right
+
+    room, left, right = asyncio.run(scenario())
+    assert left.received == right.received
+    values = None
+    for message in left.received:
+        _, values = decode_snapshot(message, values)
+    assert values == room.quantized()
+    assert room.paddle_y[0] > room.paddle_y[1]
+
+
+def test_match_ends_at_winning_score_and_leaves_scheduler():
+    async def scenario():
+        finished = []
+        scheduler = RoomScheduler(on_finished=finished.append)
+        room = PongRoom(RecordingPlayer(), RecordingPlayer(), seed=1)
+        scheduler.add_room(room)
+        # Nobody moves, so points are scored until one side wins
+        for _ in range(60 * 300):
+            scheduler.run_tick()
+            if finished:
+                break
+        return room, finished, scheduler
+
+    room, finished, scheduler = asyncio.run(scenario())
+    assert finished == [room]
+    assert room.status == FINISHED
+    assert max(room.scores) == 10
+    assert scheduler.rooms == {}
+
+
+def test_players_only_meet_on_the_same_matchmaker():
+    """Why serve.py routes every Pong socket to one process: matchmakers do not share their queue"""
+    async def scenario():
+        workers = [PongMatchmaker(RoomScheduler()), PongMatchmaker(RoomScheduler())]
+        first, second = RecordingPlayer(), RecordingPlayer()
+        assert workers[0].join(first) is None
+        assert workers[1].join(second) is None
+        assert first.room is None and second.room is None
+
+        workers[1].leave(second)
+        room = workers[0].join(second)
+        return room, first, second
+
+    room, first, second = asyncio.run(scenario())
+    assert room is not None
+    assert first.room is room and second.room is room
+    assert '"matched"' in first.received[-1] and '"matched"' in second.received[-1]
+
+
+def test_players_are_disconnected_when_every_room_is_in_use():
+    async def scenario():
+        delivered, closed = [], []
+
+        async def sink(message):
+            delivered.append(message)
+
+        async def close(code):
+            closed.append(code)
+
+        matchmaker = PongMatchmaker(RoomScheduler(max_rooms=0))
+        first, second = PongPlayer(sink, closer=close), PongPlayer(sink, closer=close)
+        matchmaker.join(first)
+        assert matchmaker.join(second) is None
+        for _ in range(5):
+            await asyncio.sleep(0)
+        first.close()
+        second.close()
+        return delivered, closed
+
+    delivered, closed = asyncio.run(scenario())
+    assert closed == [1013, 1013]
+    # "full" reaches each client before its socket is closed
+    assert [message for message in delivered if '"full"' in message] == ['{"type": "full"}'] * 2
@@ -0,0 +1,85 @@
+import random
+
+from ranking import FenwickTree, RankIndex, ScoreBoard
+
+
+def test_fenwick_prefix_and_find():
+    counts = [3, 0, 2, 5, 0, 1]
+    tree = FenwickTree.from_counts(counts)
+    for slot in range(len(counts) + 1):
+        assert tree.prefix(slot) == sum(counts[:slot])
+    assert [tree.find(position) for position in range(11)] == [0, 0, 0, 2, 2, 3, 3, 3, 3, 3, 5]
+    tree.add(1, 4)
+    assert tree.prefix(2) == 7
+    assert tree.find(3) == 1
+
+
+def test_score_board_matches_sorted_list():
+    rng = random.Random(7)
+    board = ScoreBoard()
+    best = {}
+    for _ in range(3000):
+        user_id = f"user-{rng.randint(0, 400)}"
+        # Wide scores spread over many buckets, small ones pile up in a few; some overflow
+        score = rng.choice([rng.randint(0, 50), rng.randint(0, 5000), rng.randint(0, 10 ** 7)])
+        assert board.update(user_id, score, user_id.upper()) == (score > best.get(user_id, -1))
+        best[user_id] = max(score, best.get(user_id, -1))
+    reference = sorted((-score, user_id, user_id.upper()) for user_id, score in best.items())
+
+    assert len(board) == len(reference)
+    for index, entry in enumerate(reference):
+        assert board.position(entry[1]) == index
+    assert board.slice(0, len(reference)) == reference
+    assert board.slice(95, 130) == reference[95:130]
+    assert board.position("nobody") is None
+
+    rebuilt = ScoreBoard.from_entries(list(reversed(reference)))
+    assert rebuilt.slice(0, len(reference)) == reference
+
+
+def test_rank_index_orders_by_score_then_user_id():
+    index = RankIndex()
+    index.update("snake-game", "carol", 50, "Carol")
+    index.update("snake-game", "alice", 80, "Alice")
+    index.update("snake-game", "bob", 50, "Bob")
+    index.update("snake-game", "dave", 10, "Dave")
+
+    assert [entry["user_id"] for entry in index.top("snake-game", 10)] == ["alice", "bob", "carol", "dave"]
+
+    result = index.rank("snake-game", "bob", neighbours=1)
+    assert result["rank"] == 2
+    assert result["total_players"] == 4
+    assert [entry["user_id"] for entry in result["above"]] == ["alice"]
+    assert [entry["user_id"] for entry in result["below"]] == ["carol"]
+
+
+def test_rank_index_ignores_lower_scores_and_moves_on_improvement():
+    index = RankIndex()
+    index.update("tetris-game", "alice", 100)
+    index.update("tetris-game", "bob", 200)
+
+    assert not index.update("tetris-game", "alice", 90)
+    assert index.rank("tetris-game", "alice")["rank"] == 2
+
+    assert index.update("tetris-game", "alice", 300)
+    result = index.rank("tetris-game", "alice")
+    assert result["rank"] == 1
+    assert result["above"] == []
+    assert index.total("tetris-game") == 2
+    assert index.rank("tetris-game", "nobody") is None
+
+
+def test_reload_replaces_boards_and_keeps_updates_made_meanwhile():
+    index = RankIndex()
+    index.update("snake-game", "alice", 100)
+    index.update("snake-game", "ghost", 900)  # Stale: not in the database
+
+    index.begin_reload()
+    stored = [("snake-game", "alice", 100, "Alice"), ("snake-game", "bob", 300, "Bob")]
+    index.update("snake-game", "alice", 500, "Alice")  # Arrives while the rows are being read
+    index.finish_reload(RankIndex.build(stored))
+
+    assert [(entry["user_id"], entry["score"]) for entry in index.top("snake-game", 10)] == [
+        ("alice", 500), ("bob", 300)
+    ]
+    assert index.rank("snake-game", "ghost") is None
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from ranking import RankIndex
+from realtime import LeaderboardHub
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_subscribers_get_a_snapshot_then_deltas_until_they_unsubscribe():
+    async def scenario():
+        index = RankIndex()
+        index.update("snake-game", "alice", 80, "Alice")
+        hub = LeaderboardHub(index, top_k=2)
+        websocket = FakeWebSocket()
+        subscriber = hub.connect(websocket)
+
+        assert hub.subscribe(subscriber, "snake-game")
+        await settle()
+        assert websocket.sent == [{"type": "snapshot", "game_id": "snake-game",
+                                   "leaderboard": index.top("snake-game", 2)}]
+
+        index.update("snake-game", "bob", 90, "Bob")
+        hub.notify("snake-game", "bob")
+        index.update("snake-game", "carol", 85, "Carol")
+        hub.notify("snake-game", "carol")
+        # Below the visible board: nothing to send
+        index.update("snake-game", "dave", 10, "Dave")
+        hub.notify("snake-game", "dave")
+        await settle()
+        deltas = websocket.sent[1:]
+        assert [delta["type"] for delta in deltas] == ["delta", "delta"]
+        assert [entry["user_id"] for entry in deltas[0]["changes"]] == ["bob", "alice"]
+        assert deltas[1]["removed"] == ["alice"]
+        assert [entry["user_id"] for entry in deltas[1]["changes"]] == ["carol"]
+
+        hub.unsubscribe(subscriber, "snake-game")
+        index.update("snake-game", "erin", 100, "Erin")
+        hub.notify("snake-game", "erin")
+        await settle()
+        assert len(websocket.sent) == 3
+        await subscriber.close()
+
+    asyncio.run(scenario())
+
+
+def test_subscriptions_per_connection_are_capped():
+    async def scenario():
+        hub = LeaderboardHub(RankIndex(), max_games=2)
+        websocket = FakeWebSocket()
+        subscriber = hub.connect(websocket)
+        assert hub.subscribe(subscriber, "snake-game")
+        assert hub.subscribe(subscriber, "tetris-game")
+        assert hub.subscribe(subscriber, "snake-game")  # Already subscribed
+        assert not hub.subscribe(subscriber, "pong-game")
+        hub.reject(subscriber, "too many")
+        await settle()
+        assert [message["type"] for message in websocket.sent] == ["snapshot", "snapshot", "error"]
+        assert subscriber.game_ids == {"snake-game", "tetris-game"}
+
+        hub.disconnect(subscriber)
+        assert subscriber.game_ids == set()
+        await subscriber.close()
+
+    asyncio.run(scenario())
+
+
+def test_reloaded_index_resends_changed_boards_as_snapshots():
+    async def scenario():
+        index = RankIndex()
+        index.update("snake-game", "alice", 80, "Alice")
+        hub = LeaderboardHub(index, top_k=2)
+        websocket = FakeWebSocket()
+        subscriber = hub.connect(websocket)
+        hub.subscribe(subscriber, "snake-game")
+
+        # A score this worker never heard about is in the database
+        index.begin_reload()
+        index.finish_reload(RankIndex.build([("snake-game", "alice", 80, "Alice"), ("snake-game", "bob", 90, "Bob")]))
+        hub.resync()
+        hub.resync()  # Nothing changed since: nothing sent
+        await settle()
+        assert [message["type"] for message in websocket.sent] == ["snapshot", "snapshot"]
+        assert [entry["user_id"] for entry in websocket.sent[1]["leaderboard"]] == ["bob", "alice"]
+        await subscriber.close()
+
+    asyncio.run(scenario())
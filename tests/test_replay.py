@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from replay import SnakeGame, encode_inputs, mulberry32, parse_inputs, simulate
+from replay_bench import play_snake, play_tetris
+
+
+def test_mulberry32_matches_javascript_sequence():
+    random_float = mulberry32(1)
+    assert random_float() == 0.6270739405881613
+    assert random_float() == 0.002735721180215478
+
+
+def test_snake_food_follows_the_browser_sequence():
+    # Food positions of SnakeGame.js for seed 42, computed with the JavaScript mulberry32
+    game = SnakeGame(42)
+    assert game.food == (12, 6)
+    for code, steps, eaten_at, next_food in (("U", 4, None, None), ("R", 2, (12, 6), (17, 10)),
+                                             ("R", 5, None, None), ("D", 4, (17, 10), (3, 7))):
+        game.apply(code)
+        for _ in range(steps):
+            game.tick()
+        if eaten_at is not None:
+            assert game.snake[0] == eaten_at
+            assert game.food == next_food
+    assert game.score == 20
+    assert not game.game_over
+
+
+def test_inputs_round_trip():
+    events = [(0, "U"), (12, "L"), (12, "R"), (40, "D")]
+    assert encode_inputs(events) == "0U,12L,0R,28D"
+    assert parse_inputs(encode_inputs(events), "UDLR") == events
+
+
+@pytest.mark.parametrize("player", [play_snake, play_tetris])
+def test_replays_reproduce_bot_scores(player):
+    rng = random.Random(3)
+    for _ in range(5):
+        replay, score = player(rng.randrange(2 ** 32), 2000, rng)
+        assert simulate(*replay) == score
+
+
+def test_malformed_replays_are_rejected():
+    with pytest.raises(ValueError):
+        simulate("snake-game", 1, "3X", 10)
+    with pytest.raises(ValueError):
+        simulate("snake-game", 1, "U3", 10)
+    with pytest.raises(ValueError):
+        simulate("pong-game", 1, "", 10)
+    with pytest.raises(ValueError):
+        simulate("tetris-game", 1, "", -1)
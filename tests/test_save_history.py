@@ -0,0 +1,98 @@
+import random
+import time
+
+import pytest
+
+from save_history import apply_delta, diff, encoded_size, history_entries, reconstruct
+
+
+def snake_state(rng, score):
+    head = {"x": rng.randrange(20), "y": rng.randrange(15)}
+    body = [{"x": (head["x"] - index) % 20, "y": head["y"]} for index in range(score // 10 + 1)]
+    return {"snake": body, "food": {"x": rng.randrange(20), "y": rng.randrange(15)},
+            "direction": {"x": 1, "y": 0}, "score": score, "gameRunning": False, "gameOver": False}
+
+
+def tetris_state(rng, score):
+    board = [[1 if row > 12 and rng.random() < 0.7 else 0 for _ in range(10)] for row in range(20)]
+    return {"board": board, "currentPiece": {"shape": [[1, 1], [1, 1]], "type": "O"},
+            "currentPosition": {"x": rng.randrange(8), "y": 0}, "score": score, "lines": score // 150,
+            "gameRunning": False, "gameOver": False}
+
+
+def test_snake_moves_are_one_shift():
+    before = {"snake": [{"x": 5, "y": 5}, {"x": 4, "y": 5}, {"x": 3, "y": 5}], "score": 20}
+    moved = {"snake": [{"x": 7, "y": 5}, {"x": 6, "y": 5}, {"x": 5, "y": 5}], "score": 20}
+    assert diff(before, moved) == [["shift", ["snake"], [{"x": 7, "y": 5}, {"x": 6, "y": 5}], 2]]
+    assert apply_delta(before, diff(before, moved)) == moved
+
+    grown = {"snake": [{"x": 6, "y": 5}] + before["snake"], "score": 30}
+    assert diff(before, grown) == [["shift", ["snake"], [{"x": 6, "y": 5}], 0], ["set", ["score"], 30]]
+
+
+def test_tetris_lock_is_a_few_cell_sets():
+    rng = random.Random(7)
+    before = tetris_state(rng, 1500)
+    after = apply_delta(before, [["set", ["board", 19, 0], 1], ["set", ["board", 18, 0], 1], ["set", ["score"], 1510]])
+    delta = diff(before, after)
+    assert apply_delta(before, delta) == after
+    assert len(delta) == 3
+    assert encoded_size(delta) < encoded_size(after) // 5
+
+
+def test_diff_round_trips_arbitrary_changes():
+    rng = random.Random(3)
+    for _ in range(50):
+        old, new = snake_state(rng, rng.randrange(0, 500, 10)), tetris_state(rng, rng.randrange(0, 5000, 10))
+        assert apply_delta(old, diff(old, new)) == new
+        assert apply_delta(new, diff(new, old)) == old
+    assert diff({"flag": 1}, {"flag": True}) == [["set", ["flag"], True]]
+    assert apply_delta({"a": 1}, diff({"a": 1}, {"b": 2})) == {"b": 2}
+
+
+def saves(count):
+    rng = random.Random(11)
+    state = snake_state(rng, 200)
+    for version in range(1, count + 1):
+        state = {**state, "snake": [{"x": version % 20, "y": version % 15}] + state["snake"][:-1], "score": version}
+        yield {"user_id": "u", "game_id": "snake-game", "slot_number": 1, "version": version,
+               "game_data": state, "score": version, "name": "Save Slot 1"}
+
+
+def test_snapshot_every_interval_and_every_version_rebuilds():
+    history, previous = {}, None
+    for save in saves(25):
+        latest = history[max(history)] if history else None
+        for entry in history_entries(save, previous, latest, snapshot_interval=10):
+            history[entry["version"]] = entry
+        previous = save
+
+    assert [version for version, entry in history.items() if entry["kind"] == "snapshot"] == [1, 11, 21]
+    for version, save in enumerate(saves(25), 1):
+        chain = [history[number] for number in range(history[version]["base_version"], version + 1)]
+        assert len(chain) <= 10
+        assert reconstruct(chain) == save["game_data"]
+    delta_bytes = sum(entry["size"] for entry in history.values())
+    assert delta_bytes < sum(encoded_size(save["game_data"]) for save in saves(25)) / 2
+
+
+def test_previous_save_without_history_is_snapshotted_first():
+    first, second = list(saves(3))[1:]
+    entries = history_entries(second, first, None, snapshot_interval=10)
+    assert [(entry["version"], entry["kind"]) for entry in entries] == [(2, "snapshot"), (3, "delta")]
+    assert reconstruct(entries) == second["game_data"]
+    with pytest.raises(ValueError):
+        reconstruct(entries[1:])
+
+
+def test_shift_search_is_linear_for_repeated_items():
+    old, new = [0] * 20000, [0] * 19999 + [1]
+    started = time.perf_counter()
+    delta = diff({"cells": old}, {"cells": new})
+    assert time.perf_counter() - started < 1.0
+    assert delta == [["set", ["cells", 19999], 1]]
+
+    # A shift whose first candidate offset is not the real one is still found
+    before = [1, 2, 1, 2, 3]
+    after = [9, 1, 2, 1, 2]
+    assert diff(before, after) == [["shift", [], [9], 1]]
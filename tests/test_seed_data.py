@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+from seed_data import generate_batch, insert_new  # noqa: E402
+
+
+class FakeCollection:
+    """insert_many with a unique "id", like MongoDB's ordered=False bulk insert"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def insert_many(self, docs, ordered=True):
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            else:
+                self.docs[doc["id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+        class Result:
+            inserted_ids = [doc["id"] for doc in docs]
+        return Result()
+
+
+def test_batches_are_reproducible_per_seed():
+    now = datetime(2030, 1, 1)
+    first = generate_batch(7, 3, 50, 1000, 1.5, now)
+    assert first == generate_batch(7, 3, 50, 1000, 1.5, now)
+    assert first != generate_batch(8, 3, 50, 1000, 1.5, now)
+    users, saves = first
+    assert len(users) == 50
+    assert len({(save["user_id"], save["game_id"], save["slot_number"]) for save in saves}) == len(saves)
+
+
+def test_rerun_skips_documents_already_inserted():
+    users, _ = generate_batch(7, 0, 20, 1000, 1.5, datetime(2030, 1, 1))
+    collection = FakeCollection()
+    assert insert_new(collection, users[:12]) == 12
+    assert insert_new(collection, users) == 8
+    assert len(collection.docs) == 20
+    assert insert_new(collection, []) == 0
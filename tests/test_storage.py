@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from storage import StorageConflict, create_memory_storage
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def save(slot_number, version=1, **fields):
+    return {
+        "id": f"save-{slot_number}",
+        "user_id": "alice",
+        "game_id": "snake-game",
+        "slot_number": slot_number,
+        "game_data": {"snake": [[1, 2]]},
+        "score": 10,
+        "version": version,
+        **fields,
+    }
+
+
+def test_save_slots_are_unique_and_replaced_by_version():
+    async def scenario():
+        saves = create_memory_storage().saves
+        await saves.insert(save(2))
+        await saves.insert(save(1))
+        with pytest.raises(StorageConflict):
+            await saves.insert(save(1))
+
+        assert not await saves.replace(save(1, version=3), expected_version=2)
+        assert await saves.replace(save(1, version=2, score=20), expected_version=1)
+        stored = await saves.get_slot("alice", "snake-game", 1, fields=("version", "score"))
+        assert stored == {"version": 2, "score": 20}
+
+        assert [entry["slot_number"] for entry in await saves.list_slots("alice", "snake-game")] == [1, 2]
+        assert await saves.delete_slot("alice", "snake-game", 2)
+        assert not await saves.delete_slot("alice", "snake-game", 2)
+        assert await saves.count() == 1
+
+    run(scenario())
+
+
+def test_stored_documents_are_copies():
+    async def scenario():
+        saves = create_memory_storage().saves
+        document = save(1)
+        await saves.insert(document)
+        document["game_data"]["snake"].append([3, 4])
+        loaded = await saves.get_slot("alice", "snake-game", 1)
+        loaded["score"] = 99
+        assert (await saves.get_slot("alice", "snake-game", 1))["game_data"] == {"snake": [[1, 2]]}
+        assert (await saves.get_slot("alice", "snake-game", 1))["score"] == 10
+
+    run(scenario())
+
+
+def test_user_ids_emails_and_game_ids_are_unique():
+    async def scenario():
+        storage = create_memory_storage()
+        await storage.users.insert({"id": "alice", "email": "alice@example.com"})
+        with pytest.raises(StorageConflict):
+            await storage.users.insert({"id": "alice", "email": "other@example.com"})
+        with pytest.raises(StorageConflict):
+            await storage.users.insert({"id": "alice-2", "email": "alice@example.com"})
+        with pytest.raises(StorageConflict):
+            await storage.users.raise_high_score("alice-3", "snake-game", 10, {"email": "alice@example.com"})
+        # Users without an email do not collide
+        await storage.users.raise_high_score("bob", "snake-game", 10, {"username": "Bob"})
+        await storage.users.raise_high_score("carol", "snake-game", 10, {"username": "Carol"})
+        assert await storage.users.count() == 3
+
+        await storage.games.insert({"id": "snake-game", "is_active": True})
+        with pytest.raises(StorageConflict):
+            await storage.games.insert({"id": "snake-game", "is_active": False})
+
+    run(scenario())
+
+def test_high_scores_only_rise_and_page_by_score_then_user_id():
+    async def scenario():
+        users = create_memory_storage().users
+        defaults = {"username": "Demo Player"}
+        assert await users.raise_high_score("carol", "snake-game", 50, defaults) is None
+        await users.raise_high_score("alice", "snake-game", 80, defaults)
+        await users.raise_high_score("bob", "snake-game", 50, defaults)
+        await users.raise_high_score("dave", "snake-game", 10, defaults)
+
+        previous = await users.raise_high_score("alice", "snake-game", 30, defaults)
+        assert previous == {"username": "Demo Player", "high_scores": {"snake-game": 80}}
+        await users.raise_high_score("erin", "snake-game", 0, defaults)
+
+        first = await users.high_score_page("snake-game", 2)
+        assert [entry["user_id"] for entry in first] == ["alice", "bob"]
+        second = await users.high_score_page("snake-game", 2, after=(first[-1]["score"], first[-1]["user_id"]))
+        assert [entry["user_id"] for entry in second] == ["carol", "dave"]
+        assert await users.high_score_page("snake-game", 2, after=(10, "dave")) == []
+
+    run(scenario())
+
+
+def test_window_scores_keep_the_best_per_user():
+    async def scenario():
+        scores = create_memory_storage().scores
+        expires = datetime(2030, 1, 2)
+        key = ("snake-game", "daily", "2030-01-01")
+        assert await scores.raise_window_scores({(*key, "alice"): {"score": 40, "username": "A", "expires_at": expires}})
+        assert not await scores.raise_window_scores({(*key, "alice"): {"score": 20, "username": "A", "expires_at": expires}})
+        assert await scores.raise_window_scores({(*key, "bob"): {"score": 60, "username": "B", "expires_at": expires}})
+
+        page = await scores.window_page(*key, limit=10)
+        assert page == [
+            {"user_id": "bob", "username": "B", "score": 60},
+            {"user_id": "alice", "username": "A", "score": 40},
+        ]
+        assert await scores.window_page("snake-game", "weekly", "2030-W01", limit=10) == []
+
+    run(scenario())
+
+
+def test_retried_score_events_are_logged_once():
+    def event(event_id, score):
+        return {"event_id": event_id, "created_at": datetime(2030, 1, 1), "game_id": "snake-game",
+                "user_id": "alice", "score": score}
+
+    async def scenario():
+        scores = create_memory_storage().scores
+        await scores.record_events([event("a", 10), event("b", 20)])
+        await scores.record_events([event("a", 10), event("b", 20), event("c", 30)])
+        assert await scores.daily_score_counts(datetime(2029, 1, 1)) == {
+            ("snake-game", datetime(2030, 1, 1)): {10: 1, 20: 1, 30: 1}
+        }
+
+    run(scenario())
+
+def test_save_history_chains_and_pruning():
+    def entry(version, base_version):
+        return {"user_id": "alice", "game_id": "snake-game", "slot_number": 1, "version": version,
+                "base_version": base_version, "kind": "snapshot" if version == base_version else "delta",
+                "data": {}, "size": 2}
+
+    async def scenario():
+        history = create_memory_storage().save_history
+        assert await history.latest("alice", "snake-game", 1) is None
+        await history.append([entry(version, 1 if version < 4 else 4) for version in range(1, 7)])
+        with pytest.raises(StorageConflict):
+            await history.append([entry(6, 4)])
+
+        assert await history.latest("alice", "snake-game", 1) == {"version": 6, "base_version": 4}
+        assert [item["version"] for item in await history.chain("alice", "snake-game", 1, 5)] == [4, 5]
+        assert await history.chain("alice", "snake-game", 1, 9) == []
+        assert "data" not in (await history.list_versions("alice", "snake-game", 1))[0]
+
+        # Version 3 is kept, so the chain it is rebuilt from is too
+        assert await history.prune("alice", "snake-game", 1, oldest_kept=3) == 0
+        assert await history.prune("alice", "snake-game", 1, oldest_kept=5) == 3
+        assert [item["version"] for item in await history.list_versions("alice", "snake-game", 1)] == [6, 5, 4]
+        assert await history.delete_slot("alice", "snake-game", 1) == 3
+
+    run(scenario())
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import MemoryTelemetryRepository
+from telemetry import METRIC_BOUNDS, TelemetryAggregator, TelemetryError, merge_stored, percentile_bound
+
+
+def frame_counts(**buckets):
+    counts = [0] * (len(METRIC_BOUNDS["frame_ms"]) + 1)
+    for index, count in buckets.items():
+        counts[int(index[1:])] = count
+    return counts
+
+
+def test_batches_merge_per_game_metric_and_window():
+    async def noop(documents):
+        pass
+
+    aggregator = TelemetryAggregator(noop, window_seconds=60)
+    start = datetime(2030, 1, 1, 12, 0, 5)
+    assert aggregator.ingest("snake-game", {"frame_ms": {"counts": frame_counts(b4=90, b7=10), "sum": 1800}}, start) == 100
+    aggregator.ingest("snake-game", {"frame_ms": {"counts": frame_counts(b4=50), "sum": 850}}, start + timedelta(seconds=30))
+    aggregator.ingest("snake-game", {"frame_ms": {"counts": frame_counts(b4=5), "sum": 85}}, start + timedelta(seconds=60))
+
+    documents = sorted(aggregator.drain(), key=lambda document: document["window_start"])
+    assert [document["window_start"] for document in documents] == [datetime(2030, 1, 1, 12, 0), datetime(2030, 1, 1, 12, 1)]
+    assert documents[0]["counts"] == {"4": 140, "7": 10}
+    assert documents[0]["sum"] == 2650
+    assert aggregator.drain() == []
+
+
+def test_invalid_batches_are_rejected_whole():
+    async def noop(documents):
+        pass
+
+    aggregator = TelemetryAggregator(noop)
+    now = datetime(2030, 1, 1)
+    with pytest.raises(TelemetryError):
+        aggregator.ingest("pong-game", {"frame_ms": {"counts": [1, 2, 3]}}, now)
+    with pytest.raises(TelemetryError):
+        aggregator.ingest("pong-game", {"cpu": {"counts": frame_counts()}}, now)
+    with pytest.raises(TelemetryError):
+        aggregator.ingest("pong-game", {
+            "frame_ms": {"counts": frame_counts(b3=1), "sum": 16},
+            "input_latency_ms": {"counts": [-1] * (len(METRIC_BOUNDS["input_latency_ms"]) + 1)},
+        }, now)
+    assert aggregator.drain() == []
+
+
+@pytest.mark.parametrize("payload", [
+    {"counts": frame_counts(b3=1), "sum": float("nan")},
+    {"counts": frame_counts(b3=1), "sum": float("inf")},
+    {"counts": frame_counts(b3=1), "sum": True},
+    {"counts": [True] + frame_counts()[1:], "sum": 4},
+    {"counts": [1.5] + frame_counts()[1:], "sum": 4},
+])
+def test_non_finite_and_non_integer_values_are_rejected(payload):
+    async def noop(documents):
+        pass
+
+    aggregator = TelemetryAggregator(noop)
+    with pytest.raises(TelemetryError):
+        aggregator.ingest("pong-game", {"frame_ms": payload}, datetime(2030, 1, 1))
+    assert aggregator.drain() == []
+
+def test_flushed_histograms_add_up_in_storage():
+    async def scenario():
+        repository = MemoryTelemetryRepository()
+        aggregator = TelemetryAggregator(repository.add_histograms, window_seconds=60)
+        aggregator.start()
+        now = datetime(2030, 1, 1, 8, 30)
+        for _ in range(2):
+            aggregator.ingest("tetris-game", {"frame_ms": {"counts": frame_counts(b4=95, b15=5), "sum": 6000}}, now)
+            await aggregator.flush()
+        aggregator.ingest("tetris-game", {"frame_ms": {"counts": frame_counts(b4=10), "sum": 170}}, now)
+        await aggregator.stop()  # Flushes what is left
+
+        documents = await repository.histograms("tetris-game", "frame_ms", now - timedelta(hours=1))
+        assert len(documents) == 1
+        summary = merge_stored("frame_ms", documents)
+        assert summary["samples"] == 210
+        assert summary["p50"] == METRIC_BOUNDS["frame_ms"][4]
+        assert summary["p99"] is None  # Overflow bucket (> 1000 ms)
+        assert await repository.histograms("snake-game", "frame_ms", now - timedelta(hours=1)) == []
+
+    asyncio.run(scenario())
+
+
+def test_percentile_bound():
+    bounds = (10, 20, 30)
+    assert percentile_bound([0, 0, 0, 0], bounds, 0.5) is None
+    assert percentile_bound([5, 5, 0, 0], bounds, 0.5) == 10
+    assert percentile_bound([5, 5, 0, 0], bounds, 0.51) == 20